@@ -1,12 +1,14 @@
 """历史记录API路由"""
 from fastapi import APIRouter, Query, HTTPException
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from datetime import datetime
 import json
 import math
 
 from app.services.history_service import HistoryService
-from app.models.history import HistorySearchRequest, SessionDetail
+from app.services.bigquery_service import decode_conversation_cursor
+from app.models.history import HistorySearchRequest, SamplingStrategy, SessionDetail
 from app.models.common import ApiResponse, HealthCheck
 from app.utils.logger import logger
 
@@ -44,10 +46,25 @@ async def search_history(
     ratingRange: Optional[str] = Query(None, alias="ratingRange", description="评分范围，格式: '1,3'"),
     keywords: Optional[str] = Query(None, description="关键词搜索"),
     page: int = Query(1, ge=1, description="页码"),
-    pageSize: int = Query(20, ge=1, le=100, alias="pageSize", description="每页大小")
+    pageSize: int = Query(20, ge=1, le=100, alias="pageSize", description="每页大小"),
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页结果的next_cursor"),
+    sample: Optional[int] = Query(None, ge=1, le=100, description="抽样会话数，设置后返回代表性样本而不是分页结果"),
+    sampleStrategy: SamplingStrategy = Query(SamplingStrategy.STRATIFIED, alias="sampleStrategy", description="抽样策略：stratified | diverse"),
+    seed: int = Query(0, description="抽样随机种子"),
+    excludeNearDuplicates: bool = Query(False, alias="excludeNearDuplicates", description="去除与已有测试用例或其他结果内容近似的会话，total为过滤前的会话数（上限），本页去掉的会话数见filtered_count")
 ):
-    """搜索历史记录"""
+    """搜索历史记录，指定sample时返回按模型、评分、主题分层（可选多样性选择）的代表性会话样本"""
     try:
+        # 校验分页游标
+        if cursor:
+            try:
+                decode_conversation_cursor(cursor)
+            except ValueError:
+                raise HTTPException(
+                    status_code=400,
+                    detail="分页游标无效，请使用上一页返回的next_cursor"
+                )
+
         # 解析时间
         start_dt = datetime.fromisoformat(startTime.replace('Z', '+00:00'))
         end_dt = datetime.fromisoformat(endTime.replace('Z', '+00:00'))
@@ -72,7 +89,12 @@ async def search_history(
             rating_range=parsed_rating_range,
             keywords=keywords,
             page=page,
-            page_size=pageSize
+            page_size=pageSize,
+            cursor=cursor,
+            sample_size=sample,
+            sampling_strategy=sampleStrategy,
+            sample_seed=seed,
+            exclude_near_duplicates=excludeNearDuplicates
         )
 
         # 执行搜索
@@ -88,6 +110,8 @@ async def search_history(
 
         return ApiResponse(success=True, data=cleaned_result)
 
+    except HTTPException:
+        raise
     except ValueError as e:
         logger.error("Invalid datetime format", error=str(e))
         raise HTTPException(
@@ -101,6 +125,102 @@ async def search_history(
             detail="搜索历史记录失败"
         )
 
+@router.get("/export")
+async def export_history(
+    startTime: str = Query(..., description="开始时间 (ISO格式)"),
+    endTime: str = Query(..., description="结束时间 (ISO格式)"),
+    modelIds: Optional[List[str]] = Query(None, alias="modelIds", description="模型ID列表"),
+    ratingRange: Optional[str] = Query(None, alias="ratingRange", description="评分范围，格式: '1,3'"),
+    keywords: Optional[str] = Query(None, description="关键词搜索"),
+    limit: int = Query(100000, ge=1, le=1000000, description="最大导出条数")
+):
+    """以NDJSON格式流式导出时间范围内的对话记录"""
+    # 参数须在开始输出前校验，响应开始后无法再返回错误状态码
+    try:
+        start_dt = datetime.fromisoformat(startTime.replace('Z', '+00:00'))
+        end_dt = datetime.fromisoformat(endTime.replace('Z', '+00:00'))
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="时间格式错误，请使用ISO格式，例如: 2024-01-15T10:00:00Z"
+        )
+
+    parsed_rating_range = None
+    if ratingRange:
+        try:
+            min_rating, max_rating = map(int, ratingRange.split(','))
+            parsed_rating_range = (min_rating, max_rating)
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail="评分范围格式错误，应为 'min,max' 格式，例如 '1,3'"
+            )
+
+    logger.info("History export API called",
+               start_time=start_dt,
+               end_time=end_dt,
+               limit=limit)
+
+    # 第一块在响应开始前取出，查询失败时仍可返回错误状态码
+    try:
+        chunks = await history_service.export_conversations(
+            start_time=start_dt,
+            end_time=end_dt,
+            model_ids=modelIds,
+            keywords=keywords,
+            rating_range=parsed_rating_range,
+            limit=limit
+        )
+    except ValueError as e:
+        logger.warning("Invalid history export request", error=str(e))
+        raise HTTPException(
+            status_code=400,
+            detail=f"导出条件无效: {e}"
+        )
+    except Exception as e:
+        logger.error("History export failed", error=str(e))
+        raise HTTPException(
+            status_code=500,
+            detail="导出历史记录失败"
+        )
+
+    filename = f"conversations_{start_dt:%Y%m%d}_{end_dt:%Y%m%d}.ndjson"
+    return StreamingResponse(
+        chunks,
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/similar", response_model=ApiResponse[List[dict]])
+async def find_similar_sessions(
+    sessionId: str = Query(..., alias="sessionId", description="会话ID"),
+    limit: int = Query(10, ge=1, le=100, description="返回的相似会话数")
+):
+    """按检索片段embedding查找语义相似的会话"""
+    try:
+        similar = await history_service.find_similar_sessions(sessionId, limit)
+
+        logger.info("Similar sessions retrieved",
+                   session_id=sessionId,
+                   result_count=len(similar))
+
+        return ApiResponse(success=True, data=similar)
+
+    except ValueError:
+        logger.warning("Session has no embeddings", session_id=sessionId)
+        raise HTTPException(
+            status_code=404,
+            detail=f"会话 {sessionId} 未找到或没有向量数据"
+        )
+    except Exception as e:
+        logger.error("Find similar sessions failed",
+                    session_id=sessionId,
+                    error=str(e))
+        raise HTTPException(
+            status_code=500,
+            detail="查找相似会话失败"
+        )
+
 @router.get("/sessions/{session_id}", response_model=ApiResponse[List[SessionDetail]])
 async def get_session_details(session_id: str):
     """获取指定会话的详细信息"""
@@ -147,6 +267,19 @@ async def get_models():
             detail="获取模型列表失败"
         )
 
+@router.get("/cache/stats", response_model=ApiResponse[dict])
+async def get_cache_stats():
+    """获取查询缓存统计信息"""
+    stats = history_service.get_cache_stats()
+    return ApiResponse(success=True, data={"enabled": stats is not None, "stats": stats})
+
+@router.delete("/cache", response_model=ApiResponse[dict])
+async def invalidate_cache():
+    """清空查询缓存"""
+    removed = history_service.invalidate_cache()
+    logger.info("Query cache invalidated via API", removed_count=removed)
+    return ApiResponse(success=True, data={"removed": removed})
+
 @router.get("/health", response_model=ApiResponse[HealthCheck])
 async def health_check():
     """检查历史记录服务健康状态"""
@@ -1,5 +1,6 @@
 """导入API路由"""
 from fastapi import APIRouter, Query, HTTPException
+from fastapi.responses import StreamingResponse
 from typing import Optional
 
 from app.services.import_service import ImportService
@@ -108,6 +109,28 @@ async def get_import_progress(task_id: str):
             detail="获取导入进度失败"
         )
 
+@router.get("/progress/{task_id}/stream")
+async def stream_import_progress(task_id: str):
+    """以Server-Sent Events推送导入进度，任务结束后关闭连接"""
+    if await import_service.get_import_progress(task_id) is None:
+        logger.warning("Import task not found", task_id=task_id)
+        raise HTTPException(
+            status_code=404,
+            detail=f"导入任务 {task_id} 未找到"
+        )
+
+    async def event_stream():
+        async for progress in import_service.watch_import_progress(task_id):
+            yield f"event: progress\ndata: {progress.model_dump_json()}\n\n"
+        yield "event: end\ndata: {}\n\n"
+
+    logger.info("Import progress stream opened", task_id=task_id)
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/tasks", response_model=ApiResponse[dict])
 async def get_import_tasks(
     page: int = Query(1, ge=1, description="页码"),
@@ -23,11 +23,38 @@ class Settings(BaseSettings):
 
     # BigQuery Configuration
     bigquery_use_mock: bool = True  # 默认使用Mock服务
+    mock_data_dir: Optional[str] = None  # Mock服务加载的合成数据目录，为空时生成少量演示数据
     gcp_project_id: Optional[str] = None
     gcp_dataset_id: Optional[str] = None
     gcp_table_id: str = "conversations"
     google_application_credentials: Optional[str] = None
     bigquery_use_real_test_cases: bool = False
+    test_case_id_counter_path: str = "data/test_case_id.counter"  # 测试用例ID计数器文件，多个worker进程共享
+    test_case_id_block_size: int = 1000  # 每次预留的测试用例ID数
+    near_duplicate_threshold: float = 0.8  # 问题+回答的估计Jaccard相似度不低于该值时视为近似重复
+    near_duplicate_num_perm: int = 128  # MinHash签名长度，越长估计越准、索引越大
+    bigquery_max_concurrent_queries: int = 8  # 同时在线程池中运行的最大BigQuery作业数
+    bigquery_fetch_mode: str = "arrow"  # 对话结果下载方式："arrow"（需要pyarrow）| "rows"
+    bigquery_stream_page_size: int = 1000  # 流式查询每页行数
+    bigquery_stream_prefetch_pages: int = 2  # 流式查询后台预取的最大页数
+    bigquery_use_search_index: bool = False  # 关键词搜索使用SEARCH函数（表上需建立搜索索引），按完整词元而非子串匹配
+    similarity_index_ttl_seconds: int = 3600  # 相似会话检索使用的会话向量索引刷新周期
+
+    # 查询结果缓存配置（历史搜索路径）
+    bigquery_cache_enabled: bool = True
+    bigquery_cache_ttl_seconds: int = 300
+    bigquery_cache_max_bytes: int = 64 * 1024 * 1024
+
+    # 历史记录代表性抽样配置
+    history_sample_max_messages: int = 1000000  # 单次抽样最多扫描的AI回复数，超过时按会话哈希抽取部分会话
+    history_sample_pool_factor: int = 5  # 多样性抽样或去除近似重复时，每个分层保留的候选会话数为样本数的倍数
+
+    # 导入任务配置
+    import_concurrency: int = 8  # 默认并发处理的会话数
+    import_max_sessions_per_second: float = 50.0  # 会话处理速率上限，<=0时不限流
+    import_flush_batch_size: int = 50  # 转换结果批量创建测试用例的批大小
+    import_task_db_path: str = "data/import_tasks.db"  # 导入任务和检查点的SQLite文件，多个worker进程共享
+    import_task_lease_seconds: int = 60  # 任务执行租约时长，进程退出后超过该时长的任务由其他进程接管
 
     # CORS
     allowed_origins: List[str] = ["http://localhost:3000", "http://localhost:8080"]
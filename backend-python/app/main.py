@@ -8,6 +8,7 @@ import os
 from app.config import settings
 from app.utils.logger import logger
 from app.services.history_service import HistoryService
+from app.services.import_service import ImportService
 from app.api.v1 import history, test_cases, import_data, analytics
 
 # 创建FastAPI应用实例
@@ -201,6 +202,9 @@ async def startup_event():
             exc_info=True
         )
 
+    # 恢复因进程重启而中断的导入任务
+    ImportService().start_recovery()
+
 # 关闭事件
 @app.on_event("shutdown")
 async def shutdown_event():
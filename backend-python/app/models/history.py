@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+from enum import Enum
 
 class RetrievalChunk(BaseModel):
     """检索片段模型"""
@@ -20,6 +21,11 @@ class HistoryRecord(BaseModel):
     created_at: datetime
     retrieval_chunks: List[RetrievalChunk] = []
 
+class SamplingStrategy(str, Enum):
+    """代表性抽样策略"""
+    STRATIFIED = "stratified"  # 按模型、评分、主题分层抽样
+    DIVERSE = "diverse"        # 分层抽取候选后按检索片段向量做k-center多样性选择
+
 class HistorySearchRequest(BaseModel):
     """历史记录搜索请求模型"""
     model_config = {"protected_namespaces": ()}
@@ -30,6 +36,11 @@ class HistorySearchRequest(BaseModel):
     keywords: Optional[str] = Field(None, description="关键词搜索")
     page: int = Field(1, ge=1, description="页码")
     page_size: int = Field(20, ge=1, le=100, description="每页大小")
+    cursor: Optional[str] = Field(None, description="游标分页，取自上一页结果的next_cursor，设置后忽略page")
+    sample_size: Optional[int] = Field(None, ge=1, le=100, description="抽样会话数，设置后返回代表性样本而不是分页结果")
+    sampling_strategy: SamplingStrategy = Field(SamplingStrategy.STRATIFIED, description="抽样策略")
+    sample_seed: int = Field(0, description="抽样随机种子，相同条件和种子得到相同样本")
+    exclude_near_duplicates: bool = Field(False, description="去除与已有测试用例或结果中其他会话内容近似的会话，分页结果的total为过滤前的会话数（上限），本页去掉的会话数见filtered_count")
 
 class SessionDetail(BaseModel):
     """会话详情模型"""
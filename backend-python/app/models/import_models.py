@@ -18,6 +18,14 @@ class DuplicateSessionInfo(BaseModel):
     import_date: str = Field(..., description="原导入时间")
     owner: str = Field(..., description="原测试用例负责人")
 
+class NearDuplicateSessionInfo(BaseModel):
+    """近似重复会话信息模型"""
+    session_id: str = Field(..., description="会话ID")
+    similarity: float = Field(..., description="问题和回答的估计相似度（Jaccard）")
+    existing_test_case_id: Optional[str] = Field(None, description="内容近似的已有测试用例ID")
+    existing_test_case_name: Optional[str] = Field(None, description="内容近似的已有测试用例名称")
+    similar_session_id: Optional[str] = Field(None, description="本次导入中内容近似的先前会话ID")
+
 class ImportValidationResult(BaseModel):
     """导入验证结果模型"""
     valid_sessions: List[str] = Field(..., description="有效会话ID列表")
@@ -35,6 +43,7 @@ class ImportRequest(BaseModel):
     default_difficulty: Optional[str] = Field(None, description="默认难度", alias="defaultDifficulty")
     include_analysis: Optional[bool] = Field(False, description="是否包含分析数据", alias="includeAnalysis")
     skip_duplicates: Optional[bool] = Field(True, description="是否跳过重复会话", alias="skipDuplicates")
+    concurrency: Optional[int] = Field(None, ge=1, le=64, description="并发处理的会话数，为空时使用服务默认值", alias="concurrency")
 
     model_config = {"populate_by_name": True}
 
@@ -46,6 +55,7 @@ class ImportPreview(BaseModel):
     message: str = Field(..., description="预览消息")
     preview_data: Optional[List[dict]] = Field(None, description="预览的会话数据")
     duplicate_sessions: Optional[List[DuplicateSessionInfo]] = Field(None, description="重复会话信息")
+    near_duplicate_sessions: Optional[List[NearDuplicateSessionInfo]] = Field(None, description="内容近似重复的会话信息")
     validation_result: Optional[ImportValidationResult] = Field(None, description="验证结果")
 
 class ImportTask(BaseModel):
@@ -0,0 +1,174 @@
+"""Arrow结果集的列式转换"""
+import json
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from app.services.bigquery_service import ConversationRow, RetrievalChunkRow, SessionSummaryRow
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pyarrow为可选依赖，缺失时退回逐行转换
+    pa = None
+    pc = None
+
+ARROW_AVAILABLE = pa is not None
+
+def _normalize_metadata(values: Sequence[Any]) -> List[Dict[str, Any]]:
+    """JSON列在Arrow中为字符串，STRUCT列为字典"""
+    normalized = []
+    for value in values:
+        if value is None:
+            normalized.append({})
+        elif isinstance(value, str):
+            try:
+                normalized.append(json.loads(value))
+            except json.JSONDecodeError:
+                normalized.append({})
+        else:
+            normalized.append(dict(value))
+    return normalized
+
+def _normalize_chunk_ids(values: Sequence[Any]) -> List[List[str]]:
+    """retrieval_chunk_ids可能是REPEATED列或JSON字符串"""
+    normalized = []
+    for value in values:
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except json.JSONDecodeError:
+                value = []
+        normalized.append(list(value or []))
+    return normalized
+
+def conversations_from_arrow(data: Any) -> List[ConversationRow]:
+    """
+    将Arrow Table或RecordBatch按列转换为ConversationRow列表
+
+    列值一次性转换为Python对象后按列规范化，最后用model_construct组装，
+    跳过逐字段校验（类型已由BigQuery表结构保证）。
+    """
+    if data.num_rows == 0:
+        return []
+
+    columns = data.to_pydict()
+    # 窗口计数等附加列不属于ConversationRow
+    columns.pop("total_count", None)
+
+    if "metadata" in columns:
+        columns["metadata"] = _normalize_metadata(columns["metadata"])
+    if "retrieval_chunk_ids" in columns:
+        columns["retrieval_chunk_ids"] = _normalize_chunk_ids(columns["retrieval_chunk_ids"])
+
+    names = tuple(columns)
+    construct = ConversationRow.model_construct
+    return [construct(**dict(zip(names, values))) for values in zip(*columns.values())]
+
+def chunks_from_arrow(data: Any) -> List[RetrievalChunkRow]:
+    """将Arrow Table或RecordBatch按列转换为RetrievalChunkRow列表"""
+    if data.num_rows == 0:
+        return []
+
+    columns = data.to_pydict()
+    if "metadata" in columns:
+        columns["metadata"] = _normalize_metadata(columns["metadata"])
+
+    names = tuple(columns)
+    construct = RetrievalChunkRow.model_construct
+    return [construct(**dict(zip(names, values))) for values in zip(*columns.values())]
+
+def _first_positions(codes: np.ndarray, positions: np.ndarray, n_groups: int) -> np.ndarray:
+    """每组最小的行位置，没有行的组为-1"""
+    missing = np.iinfo(np.int64).max
+    first = np.full(n_groups, missing, dtype=np.int64)
+    np.minimum.at(first, codes, positions)
+    first[first == missing] = -1
+    return first
+
+def _last_positions(codes: np.ndarray, positions: np.ndarray, n_groups: int) -> np.ndarray:
+    """每组最大的行位置，没有行的组为-1"""
+    last = np.full(n_groups, -1, dtype=np.int64)
+    np.maximum.at(last, codes, positions)
+    return last
+
+def _take_values(column: Any, rows: np.ndarray) -> List[Any]:
+    """取出指定行的值，行号为-1的位置为None"""
+    values = column.take(pa.array(np.maximum(rows, 0))).to_pylist()
+    return [value if row >= 0 else None for value, row in zip(values, rows)]
+
+def session_summaries_from_arrow(data: Any, session_ids: Sequence[str]) -> List[SessionSummaryRow]:
+    """
+    将一批会话的消息按会话汇总为SessionSummaryRow
+
+    消息须在各自会话内按时间升序排列（会话之间可以交错）。分组以及第一条用户提问、
+    最后一条AI回复的定位都在列上完成，只取出被选中行的文本，每个会话构建一个对象，
+    消息本身不转换为ConversationRow。
+    """
+    if data.num_rows == 0 or not session_ids:
+        return []
+
+    n_sessions = len(session_ids)
+    codes = pc.index_in(data.column("session_id"), value_set=pa.array(list(session_ids), type=pa.string()))
+    codes = codes.fill_null(-1).to_numpy(zero_copy_only=False).astype(np.int64)
+    positions = np.arange(data.num_rows, dtype=np.int64)
+    member = codes >= 0
+    codes, positions = codes[member], positions[member]
+
+    message_type = data.column("message_type")
+    is_user = pc.equal(message_type, "user").fill_null(False).to_numpy(zero_copy_only=False)[member]
+    is_assistant = pc.equal(message_type, "assistant").fill_null(False).to_numpy(zero_copy_only=False)[member]
+
+    first = _first_positions(codes, positions, n_sessions)
+    last = _last_positions(codes, positions, n_sessions)
+    first_user = _first_positions(codes[is_user], positions[is_user], n_sessions)
+    last_response = _last_positions(codes[is_assistant], positions[is_assistant], n_sessions)
+    counts = np.bincount(codes, minlength=n_sessions)
+
+    # 最后一条AI回复的模型，没有回复时取第一条消息的模型
+    model_rows = np.where(last_response >= 0, last_response, first)
+    user_queries = _take_values(data.column("content"), first_user)
+    responses = _take_values(data.column("content"), last_response)
+    ratings = _take_values(data.column("user_rating"), last_response)
+    model_ids = _take_values(data.column("model_id"), model_rows)
+    created = _take_values(data.column("timestamp"), first)
+    last_message = _take_values(data.column("timestamp"), last)
+
+    # 片段ID按 (会话, 行位置) 排序后逐会话去重，保持首次引用顺序
+    chunk_ids: List[List[str]] = [[] for _ in range(n_sessions)]
+    column = data.column("retrieval_chunk_ids").combine_chunks()
+    if pa.types.is_list(column.type) or pa.types.is_large_list(column.type):
+        parents = pc.list_parent_indices(column).to_numpy()
+        values = pc.list_flatten(column).to_pylist()
+        parent_codes = np.full(data.num_rows, -1, dtype=np.int64)
+        parent_codes[positions] = codes
+        parent_codes = parent_codes[parents]
+        for index in np.argsort(parent_codes, kind="stable"):
+            if parent_codes[index] >= 0:
+                chunk_ids[parent_codes[index]].append(values[index])
+    else:
+        for code, row in zip(codes, positions):
+            chunk_ids[code].extend(_normalize_chunk_ids([column[int(row)].as_py()])[0])
+
+    summaries = []
+    for code, session_id in enumerate(session_ids):
+        if counts[code] == 0:
+            continue
+        summaries.append(SessionSummaryRow.model_construct(
+            session_id=session_id,
+            model_id=model_ids[code],
+            user_query=user_queries[code] or "",
+            ai_response=responses[code] or "",
+            user_rating=ratings[code],
+            created_at=created[code],
+            last_message_at=last_message[code],
+            message_count=int(counts[code]),
+            retrieval_chunk_ids=list(dict.fromkeys(chunk_ids[code]))
+        ))
+    return summaries
+
+def arrow_total_count(table: Any) -> int:
+    """读取窗口计数列的值，无结果时返回0"""
+    if table.num_rows == 0 or "total_count" not in table.column_names:
+        return 0
+    return table.column("total_count")[0].as_py()
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Union
 
 from app.models.test_case import TestCase, TestCaseCreate
 
@@ -15,4 +15,22 @@ class BaseTestCaseService(ABC):
 
     @abstractmethod
     async def create_test_case(self, test_case: TestCaseCreate) -> TestCase:
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    async def create_test_cases_bulk(self, test_cases: List[TestCaseCreate]) -> List[Union[TestCase, Exception]]:
+        """批量创建测试用例，结果与输入一一对应，单条失败时对应位置为异常"""
+        pass
+
+    @abstractmethod
+    async def find_near_duplicates(self, texts: Dict[str, str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        查找内容近似重复的已有测试用例
+
+        Args:
+            texts: 键（如会话ID） -> 问题 + 回答文本（near_duplicate_text）
+
+        Returns:
+            有近似重复的键 -> [{"test_case_id", "test_case_name", "similarity"}]，按相似度降序
+        """
+        pass
@@ -0,0 +1,120 @@
+"""BigQuery作业执行层"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Iterable, List, Optional, TypeVar
+
+from app.utils.logger import logger
+
+T = TypeVar('T')
+
+# 迭代结束标记
+_DONE = object()
+
+class _ProducerError:
+    """后台预取过程中的异常，交由消费者抛出"""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+class BigQueryExecutor:
+    """在有界线程池中执行BigQuery作业，避免阻塞事件循环"""
+
+    def __init__(self, client: Any, max_concurrency: int = 8):
+        """
+        初始化执行器
+
+        Args:
+            client: BigQuery客户端
+            max_concurrency: 同时运行的最大作业数
+        """
+        self.client = client
+        self.max_concurrency = max(1, max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="bigquery"
+        )
+        # 信号量在首次使用时创建，确保绑定到运行中的事件循环
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        logger.info("BigQueryExecutor initialized", max_concurrency=self.max_concurrency)
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """在线程池中执行阻塞调用，超出并发上限的调用在事件循环内排队等待"""
+        loop = asyncio.get_running_loop()
+        async with self._get_semaphore():
+            return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def query(self, query: str, job_config: Any = None, timeout: float = 30) -> List[Any]:
+        """提交查询作业并等待全部结果行"""
+        def _execute() -> List[Any]:
+            query_job = self.client.query(query, job_config=job_config)
+            return list(query_job.result(timeout=timeout))
+
+        return await self.run(_execute)
+
+    async def query_arrow(
+        self,
+        query: str,
+        job_config: Any = None,
+        timeout: float = 30,
+        bqstorage_client: Any = None
+    ) -> Any:
+        """提交查询作业并以Arrow Table下载结果，提供bqstorage_client时经由Storage Read API并行下载"""
+        def _execute() -> Any:
+            query_job = self.client.query(query, job_config=job_config)
+            return query_job.result(timeout=timeout).to_arrow(
+                bqstorage_client=bqstorage_client,
+                create_bqstorage_client=False,
+                progress_bar_type=None
+            )
+
+        return await self.run(_execute)
+
+    async def iterate(self, iterable: Iterable[T], prefetch: int = 2) -> AsyncIterator[T]:
+        """
+        在后台任务中预取阻塞迭代器的元素（如结果页），放入有界队列供消费者读取
+
+        队列满时后台任务暂停拉取，消费者的处理速度决定下载速度；
+        消费者提前退出时后台任务随之取消。
+        """
+        queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=max(1, prefetch))
+        iterator = iter(iterable)
+
+        async def produce():
+            try:
+                while True:
+                    item = await self.run(next, iterator, _DONE)
+                    await queue.put(item)
+                    if item is _DONE:
+                        return
+            except asyncio.CancelledError:
+                raise
+            except BaseException as e:
+                await queue.put(_ProducerError(e))
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, _ProducerError):
+                    raise item.error
+                yield item
+        finally:
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
+
+    def shutdown(self, wait: bool = False):
+        """关闭线程池"""
+        self._executor.shutdown(wait=wait)
+        logger.info("BigQueryExecutor shut down")
@@ -4,6 +4,8 @@ from app.config import settings
 from app.services.bigquery_service import BigQueryService
 from app.services.mock_bigquery_service import MockBigQueryService
 from app.services.real_bigquery_service import RealBigQueryService
+from app.services.cached_bigquery_service import CachedBigQueryService
+from app.services.query_cache import QueryCache
 from app.utils.logger import logger
 
 class BigQueryServiceFactory:
@@ -26,24 +28,53 @@ class BigQueryServiceFactory:
     @classmethod
     def _create_service(cls) -> BigQueryService:
         """根据配置创建相应的服务实例"""
+        service = cls._create_backend_service()
+
+        if settings.bigquery_cache_enabled:
+            cache = QueryCache(
+                ttl_seconds=settings.bigquery_cache_ttl_seconds,
+                max_bytes=settings.bigquery_cache_max_bytes
+            )
+            service = CachedBigQueryService(service, cache)
+
+        return service
+
+    @classmethod
+    def _create_backend_service(cls) -> BigQueryService:
+        """根据配置创建底层的真实或Mock服务实例"""
         if settings.use_real_bigquery:
             logger.info(
                 "Creating real BigQuery service",
                 project_id=settings.gcp_project_id,
                 dataset_id=settings.gcp_dataset_id,
                 table_id=settings.gcp_table_id,
-                credentials_path=settings.google_application_credentials
+                credentials_path=settings.google_application_credentials,
+                max_concurrent_queries=settings.bigquery_max_concurrent_queries,
+                fetch_mode=settings.bigquery_fetch_mode,
+                stream_page_size=settings.bigquery_stream_page_size,
+                stream_prefetch_pages=settings.bigquery_stream_prefetch_pages,
+                use_search_index=settings.bigquery_use_search_index,
+                similarity_index_ttl_seconds=settings.similarity_index_ttl_seconds
             )
 
             return RealBigQueryService(
                 project_id=settings.gcp_project_id,
                 dataset_id=settings.gcp_dataset_id,
                 table_id=settings.gcp_table_id,
-                credentials_path=settings.google_application_credentials
+                credentials_path=settings.google_application_credentials,
+                max_concurrent_queries=settings.bigquery_max_concurrent_queries,
+                fetch_mode=settings.bigquery_fetch_mode,
+                stream_page_size=settings.bigquery_stream_page_size,
+                stream_prefetch_pages=settings.bigquery_stream_prefetch_pages,
+                use_search_index=settings.bigquery_use_search_index,
+                similarity_index_ttl_seconds=settings.similarity_index_ttl_seconds
             )
         else:
-            logger.info("Creating mock BigQuery service")
-            return MockBigQueryService()
+            logger.info("Creating mock BigQuery service", data_dir=settings.mock_data_dir)
+            return MockBigQueryService(
+                stream_page_size=settings.bigquery_stream_page_size,
+                data_dir=settings.mock_data_dir
+            )
 
     @classmethod
     def reset_instance(cls):
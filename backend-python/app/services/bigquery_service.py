@@ -1,7 +1,11 @@
 """BigQuery服务抽象接口"""
+import base64
+import json
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, AsyncIterator
+from enum import Enum
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from datetime import datetime
+import numpy as np
 from pydantic import BaseModel
 
 class ConversationRow(BaseModel):
@@ -27,6 +31,27 @@ class ConversationRow(BaseModel):
     # 检索相关
     retrieval_chunk_ids: List[str] = []
 
+class SessionSummaryRow(BaseModel):
+    """会话汇总（每个会话一行，在查询层按会话聚合得到）"""
+    model_config = {"protected_namespaces": ()}
+
+    session_id: str
+    model_id: str  # 最后一条AI回复的模型
+    user_query: str = ""  # 第一条用户提问
+    ai_response: str = ""  # 最后一条AI回复
+    user_rating: Optional[int] = None  # 最后一条AI回复的评分
+    created_at: datetime  # 会话第一条消息的时间，会话按此排序
+    last_message_at: datetime
+    message_count: int = 0
+
+    # 会话内全部消息引用的检索片段ID（去重，保持首次引用顺序）
+    retrieval_chunk_ids: List[str] = []
+
+class ChunkProjection(str, Enum):
+    """检索片段字段投影"""
+    LIGHT = "light"  # 不含embedding_vector，用于历史和导入等展示路径
+    FULL = "full"    # 全部字段
+
 class RetrievalChunkRow(BaseModel):
     """检索片段模型（对应BigQuery retrieval_chunks表）"""
     model_config = {"protected_namespaces": ()}
@@ -65,14 +90,33 @@ class ConversationQueryRequest(BaseModel):
     min_rating: Optional[int] = None
     max_rating: Optional[int] = None
 
+    # 会话抽样：按会话ID哈希保留约该比例（0~1）的会话，同一会话的消息同时保留或丢弃
+    session_sample_rate: Optional[float] = None
+    session_sample_seed: int = 0
+
     # 分页
     limit: int = 100
     offset: int = 0
+    # 游标分页：基于 (timestamp, conversation_id) 的不透明游标，设置后忽略offset
+    cursor: Optional[str] = None
 
     # 排序
     order_by: str = "timestamp"
     order_direction: str = "desc"  # "asc" | "desc"
 
+def encode_conversation_cursor(timestamp: datetime, conversation_id: str) -> str:
+    """将页尾记录的 (timestamp, conversation_id) 编码为不透明游标"""
+    payload = json.dumps({"ts": timestamp.isoformat(), "id": conversation_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def decode_conversation_cursor(cursor: str) -> Tuple[datetime, str]:
+    """解码游标，格式无效时抛出ValueError"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+        return datetime.fromisoformat(payload["ts"]), str(payload["id"])
+    except Exception as e:
+        raise ValueError(f"Invalid conversation cursor: {cursor}") from e
+
 class RetrievalChunkQueryRequest(BaseModel):
     """检索片段查询请求"""
     model_config = {"protected_namespaces": ()}
@@ -95,6 +139,9 @@ class RetrievalChunkQueryRequest(BaseModel):
     order_by: str = "created_at"
     order_direction: str = "desc"
 
+    # 字段投影
+    projection: ChunkProjection = ChunkProjection.LIGHT
+
 class BigQueryService(ABC):
     """BigQuery服务抽象基类"""
 
@@ -113,6 +160,22 @@ class BigQueryService(ABC):
         """统计对话记录数量"""
         pass
 
+    @abstractmethod
+    async def query_conversations_with_total(self, request: ConversationQueryRequest) -> Tuple[List[ConversationRow], int]:
+        """一次往返查询当前页对话记录及过滤后的总数"""
+        pass
+
+    @abstractmethod
+    async def query_sessions_with_total(self, request: ConversationQueryRequest) -> Tuple[List[SessionSummaryRow], int]:
+        """
+        按会话分页查询
+
+        至少有一条消息满足过滤条件的会话参与结果，汇总字段取自会话的全部消息；
+        会话按起始时间排序（order_by被忽略，方向取order_direction），游标为页尾会话的
+        (created_at, session_id)。返回 (当前页会话汇总, 符合条件的会话总数)。
+        """
+        pass
+
     @abstractmethod
     async def get_conversation_by_id(self, conversation_id: str) -> Optional[ConversationRow]:
         """根据ID获取对话记录"""
@@ -123,6 +186,11 @@ class BigQueryService(ABC):
         """获取会话的所有对话"""
         pass
 
+    @abstractmethod
+    async def get_sessions_conversations(self, session_ids: List[str]) -> Dict[str, List[ConversationRow]]:
+        """批量获取多个会话的对话，按会话分组并按时间排序；不存在的会话对应空列表"""
+        pass
+
     @abstractmethod
     async def query_retrieval_chunks(self, request: RetrievalChunkQueryRequest) -> List[RetrievalChunkRow]:
         """查询检索片段"""
@@ -134,15 +202,28 @@ class BigQueryService(ABC):
         pass
 
     @abstractmethod
-    async def get_chunk_by_id(self, chunk_id: str) -> Optional[RetrievalChunkRow]:
+    async def get_chunk_by_id(
+        self,
+        chunk_id: str,
+        projection: ChunkProjection = ChunkProjection.LIGHT
+    ) -> Optional[RetrievalChunkRow]:
         """根据ID获取检索片段"""
         pass
 
     @abstractmethod
-    async def get_chunks_by_ids(self, chunk_ids: List[str]) -> List[RetrievalChunkRow]:
+    async def get_chunks_by_ids(
+        self,
+        chunk_ids: List[str],
+        projection: ChunkProjection = ChunkProjection.LIGHT
+    ) -> List[RetrievalChunkRow]:
         """根据ID列表批量获取检索片段"""
         pass
 
+    @abstractmethod
+    async def get_chunk_embeddings(self, chunk_ids: List[str]) -> Tuple[List[str], np.ndarray]:
+        """批量获取片段向量，返回 (有向量的片段ID, 对应的 (n, d) float32矩阵)"""
+        pass
+
     @abstractmethod
     async def get_available_model_ids(self) -> List[str]:
         """获取所有可用的模型ID"""
@@ -154,6 +235,20 @@ class BigQueryService(ABC):
         pass
 
     @abstractmethod
-    async def stream_conversations(self, request: ConversationQueryRequest) -> AsyncIterator[ConversationRow]:
-        """流式查询对话记录（用于大数据量查询）"""
+    async def find_similar_sessions(self, session_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        查找语义相似的会话
+
+        会话向量为其对话引用的检索片段embedding的均值，按余弦相似度降序返回
+        [{"session_id", "score"}]（不含自身）；会话不存在或没有embedding时抛出ValueError
+        """
+        pass
+
+    @abstractmethod
+    async def stream_conversations(
+        self,
+        request: ConversationQueryRequest,
+        page_size: Optional[int] = None
+    ) -> AsyncIterator[ConversationRow]:
+        """流式查询对话记录（用于大数据量查询），page_size为空时使用服务默认页大小"""
         pass
\ No newline at end of file
@@ -2,14 +2,111 @@
 from google.cloud import bigquery
 from app.config import settings
 from app.services.base_service import BaseTestCaseService
-from app.models.test_case import TestCase, TestCaseCreate, TestCaseStatus, TestCaseMetadata
+from app.services.id_allocator import IdAllocator
+from app.services.test_case_store import near_duplicate_text
+from app.utils.minhash import MinHashLSH
+from app.models.test_case import TestCase, TestCaseCreate, TestCaseStatus, TestCaseMetadata, TestCaseUpdate
 from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+import asyncio
+import functools
+import json
 import uuid
 
+# Streaming insert requests are capped in size, so bulk inserts are sent in chunks
+INSERT_CHUNK_SIZE = 500
+
+# Legacy schema type names -> GoogleSQL type names used in parameters and casts
+_SQL_TYPES = {"INTEGER": "INT64", "FLOAT": "FLOAT64", "BOOLEAN": "BOOL", "RECORD": "STRUCT"}
+
+def _element_type(field: bigquery.SchemaField) -> str:
+    """GoogleSQL type of one value of the column (the element type for REPEATED columns)"""
+    if field.field_type in ("RECORD", "STRUCT"):
+        return "STRUCT<" + ", ".join(f"{sub.name} {_column_type(sub)}" for sub in field.fields) + ">"
+    return _SQL_TYPES.get(field.field_type, field.field_type)
+
+def _column_type(field: bigquery.SchemaField) -> str:
+    element_type = _element_type(field)
+    return f"ARRAY<{element_type}>" if field.mode == "REPEATED" else element_type
+
+def _column_value(field: bigquery.SchemaField, value: Any, query_parameters: List[Any]) -> str:
+    """
+    SQL expression for a column value, appending the parameters it references.
+
+    STRUCT columns are rebuilt with STRUCT(...) from one bound parameter per leaf field,
+    since a nested STRUCT cannot be passed reliably as a single parameter.
+    """
+    if field.mode == "REPEATED":
+        if field.field_type not in ("RECORD", "STRUCT"):
+            name = f"p{len(query_parameters)}"
+            query_parameters.append(bigquery.ArrayQueryParameter(name, _element_type(field), value or []))
+            return f"@{name}"
+        elements = ", ".join(_element_value(field, item, query_parameters) for item in value or [])
+        return f"ARRAY<{_element_type(field)}>[{elements}]"
+    return _element_value(field, value, query_parameters)
+
+def _element_value(field: bigquery.SchemaField, value: Any, query_parameters: List[Any]) -> str:
+    if value is None:
+        return f"CAST(NULL AS {_element_type(field)})"
+    if field.field_type in ("RECORD", "STRUCT"):
+        if isinstance(value, str) and any(sub.name == "id" for sub in field.fields):
+            # Retrieved chunks may be referenced by ID only (TurnRecord.retrieved_chunks)
+            value = {"id": value}
+        return "STRUCT(" + ", ".join(
+            f"{_column_value(sub, value.get(sub.name), query_parameters)} AS {sub.name}" for sub in field.fields
+        ) + ")"
+
+    name = f"p{len(query_parameters)}"
+    if field.field_type == "JSON":
+        query_parameters.append(bigquery.ScalarQueryParameter(name, "STRING", json.dumps(value)))
+        return f"PARSE_JSON(@{name})"
+    query_parameters.append(bigquery.ScalarQueryParameter(name, _element_type(field), value))
+    return f"@{name}"
+
 class BigQueryTestCaseService(BaseTestCaseService):
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        # Singleton: API routes, imports and history search share one ID allocator per process,
+        # so every caller draws from the same reserved block
+        if cls._instance is None:
+            cls._instance = super(BigQueryTestCaseService, cls).__new__(cls)
+        return cls._instance
+
     def __init__(self):
+        if self._initialized:
+            return
+
         self.client = bigquery.Client(project=settings.gcp_project_id)
         self.table_id = f"{settings.gcp_project_id}.{settings.gcp_dataset_id}.{settings.gcp_table_id}"
+        # IDs are reserved in blocks from a local counter file shared by all worker processes;
+        # the table is only queried once, to seed the counter when the file does not exist yet
+        self.id_allocator = IdAllocator(
+            prefix="TC",
+            block_size=settings.test_case_id_block_size,
+            counter_path=settings.test_case_id_counter_path,
+            seed=self._max_test_case_number,
+        )
+        # Near-duplicate index over query + response, loaded on first use and
+        # then kept up to date by the create/update/delete methods of this process
+        self._near_duplicates: Optional[MinHashLSH] = None
+        self._test_case_names: Dict[str, str] = {}
+        self._near_duplicates_lock: Optional[asyncio.Lock] = None
+        # Changes made while the initial load is running, replayed once it finishes
+        # (None: no load in progress)
+        self._pending_near_duplicates: Optional[List[Tuple[str, Optional[TestCase]]]] = None
+        # Table schema, fetched on the first update to bind nested columns field by field
+        self._schema: Optional[List[bigquery.SchemaField]] = None
+        self._initialized = True
+
+    def _max_test_case_number(self) -> int:
+        query = (
+            f"SELECT MAX(SAFE_CAST(REGEXP_EXTRACT(id, r'^TC-(\\d+)$') AS INT64)) AS max_number "
+            f"FROM `{self.table_id}`"
+        )
+        row = next(self.client.query(query).result())
+        return row['max_number'] or 0
 
     async def get_test_cases(self, page: int, page_size: int, status: str, domain: str, priority: str, search: str):
         # Build a flattened projection so the frontend receives top-level fields
@@ -88,15 +185,8 @@ class BigQueryTestCaseService(BaseTestCaseService):
         return dict(rows[0])
 
     async def create_test_case(self, test_case: TestCaseCreate) -> TestCase:
-        # Generate a new test case ID
-        # For simplicity, we'll use a similar format to the mock service, but with a UUID to ensure uniqueness
-        # In a real-world scenario, you might have a more robust ID generation strategy
-        query = f"SELECT COUNT(*) as count FROM `{self.table_id}`"
-        query_job = self.client.query(query)
-        result = query_job.result()
-        row = next(result)
-        count = row['count']
-        new_id = f"TC-{count + 1:04d}"
+        # Take the next ID from the reserved block, no query per insert
+        new_id = await self.id_allocator.next_id()
 
         # Create the full TestCase object
         new_test_case = TestCase(
@@ -133,4 +223,250 @@ class BigQueryTestCaseService(BaseTestCaseService):
             # In a real-world scenario, you might want to log the errors and handle them more gracefully
             raise Exception(f"Failed to insert row into BigQuery: {errors}")
 
-        return new_test_case
\ No newline at end of file
+        self._index_near_duplicate(new_test_case)
+        return new_test_case
+
+    async def create_test_cases_bulk(self, test_cases: List[TestCaseCreate]) -> List[Union[TestCase, Exception]]:
+        if not test_cases:
+            return []
+
+        loop = asyncio.get_running_loop()
+        source_sessions = [
+            test_case.metadata.source_session if test_case.metadata else None
+            for test_case in test_cases
+        ]
+        # A resumed import may replay a batch that was already written, so sessions that
+        # already have a test case (or appear twice in this batch) are rejected, as in the mock service
+        existing = await loop.run_in_executor(
+            None, self._existing_source_sessions, [session for session in source_sessions if session]
+        )
+
+        results: List[Union[TestCase, Exception, None]] = [None] * len(test_cases)
+        to_create = []
+        batch_sessions = set()
+        for position, source_session in enumerate(source_sessions):
+            if source_session in existing:
+                results[position] = ValueError(
+                    f"Test case already exists for source session '{source_session}' (ID: {existing[source_session]})"
+                )
+            elif source_session in batch_sessions:
+                results[position] = ValueError(f"Source session '{source_session}' appears more than once in the batch")
+            else:
+                to_create.append(position)
+                if source_session:
+                    batch_sessions.add(source_session)
+
+        new_ids = await self.id_allocator.allocate(len(to_create)) if to_create else []
+
+        now = datetime.now().isoformat()
+        new_test_cases = []
+        for new_id, position in zip(new_ids, to_create):
+            test_case = test_cases[position]
+            new_test_cases.append(TestCase(
+                id=new_id,
+                name=test_case.name,
+                description=test_case.description,
+                metadata=TestCaseMetadata(
+                    status=TestCaseStatus.DRAFT,
+                    owner=test_case.owner,
+                    priority=test_case.priority,
+                    tags=test_case.tags,
+                    version="1.0.0",
+                    created_date=now,
+                    source_session=source_sessions[position] or "manual",
+                ),
+                domain=test_case.domain,
+                difficulty=test_case.difficulty,
+                test_config=test_case.test_config,
+                input=test_case.input,
+                execution=test_case.execution,
+                analysis=test_case.analysis,
+            ))
+            results[position] = new_test_cases[-1]
+
+        for start in range(0, len(new_test_cases), INSERT_CHUNK_SIZE):
+            chunk = new_test_cases[start:start + INSERT_CHUNK_SIZE]
+            rows_to_insert = [tc.model_dump(by_alias=True) for tc in chunk]
+
+            # Row IDs let BigQuery de-duplicate retried chunks on a best-effort basis;
+            # each streaming insert is a blocking request, so it runs in a worker thread
+            errors = await loop.run_in_executor(
+                None,
+                functools.partial(
+                    self.client.insert_rows_json,
+                    self.table_id,
+                    rows_to_insert,
+                    row_ids=[tc.id for tc in chunk],
+                ),
+            )
+
+            # insert_rows_json reports failures per row index within the chunk
+            for error in errors:
+                results[to_create[start + error["index"]]] = Exception(
+                    f"Failed to insert row into BigQuery: {error['errors']}"
+                )
+
+        for result in results:
+            if isinstance(result, TestCase):
+                self._index_near_duplicate(result)
+        return results
+
+    def _existing_source_sessions(self, source_sessions: List[str]) -> Dict[str, str]:
+        """Map source sessions that already have a test case to its ID; blocking, runs in a worker thread"""
+        if not source_sessions:
+            return {}
+        query = (
+            f"SELECT metadata.source_session AS source_session, ANY_VALUE(id) AS id "
+            f"FROM `{self.table_id}` "
+            f"WHERE metadata.source_session IN UNNEST(@source_sessions) "
+            f"GROUP BY source_session"
+        )
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter("source_sessions", "STRING", list(dict.fromkeys(source_sessions))),
+            ]
+        )
+        return {row["source_session"]: row["id"] for row in self.client.query(query, job_config=job_config).result()}
+
+    async def update_test_case(self, test_case_id: str, request: TestCaseUpdate) -> Optional[TestCase]:
+        existing = await self.get_test_case_by_id(test_case_id)
+        if existing is None:
+            return None
+
+        # TIMESTAMP columns come back as datetime objects, the model keeps ISO strings
+        metadata = dict(existing.get("metadata") or {})
+        for key in ("created_date", "updated_date"):
+            if isinstance(metadata.get(key), datetime):
+                metadata[key] = metadata[key].isoformat()
+
+        updated = dict(existing, metadata=metadata)
+        updated.update(request.model_dump(mode="json", exclude_unset=True))
+        test_case = TestCase.model_validate(updated)
+        test_case.metadata.updated_date = datetime.now().isoformat()
+
+        # One UPDATE rewrites the row in place, so a failed statement leaves the old version untouched
+        loop = asyncio.get_running_loop()
+        updated_row = await loop.run_in_executor(None, self._update_row, test_case)
+        if not updated_row:
+            return None
+
+        self._index_near_duplicate(test_case)
+        return test_case
+
+    async def delete_test_case(self, test_case_id: str) -> bool:
+        loop = asyncio.get_running_loop()
+        deleted = await loop.run_in_executor(None, self._delete_row, test_case_id)
+        if deleted:
+            self._unindex_near_duplicate(test_case_id)
+        return deleted
+
+    def _table_schema(self) -> List[bigquery.SchemaField]:
+        """Column definitions of the table, fetched once; blocking"""
+        if self._schema is None:
+            self._schema = list(self.client.get_table(self.table_id).schema)
+        return self._schema
+
+    def _update_row(self, test_case: TestCase) -> bool:
+        """
+        Overwrite every column of the row with a single parameterized UPDATE; blocking, runs in a worker thread.
+
+        DML cannot modify rows still in the streaming buffer, so a case inserted in the last
+        few minutes fails to update (the statement raises and the row is unchanged).
+        """
+        row = test_case.model_dump(mode="json", by_alias=True)
+        query_parameters = [bigquery.ScalarQueryParameter("test_case_id", "STRING", test_case.id)]
+        assignments = [
+            f"{field.name} = {_column_value(field, row[field.name], query_parameters)}"
+            for field in self._table_schema()
+            if field.name != "id" and field.name in row
+        ]
+        query = f"UPDATE `{self.table_id}` SET {', '.join(assignments)} WHERE id = @test_case_id"
+        query_job = self.client.query(query, job_config=bigquery.QueryJobConfig(query_parameters=query_parameters))
+        query_job.result()
+        return bool(query_job.num_dml_affected_rows)
+
+    def _delete_row(self, test_case_id: str) -> bool:
+        """Delete the row with DML; blocking, runs in a worker thread"""
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("test_case_id", "STRING", test_case_id),
+            ]
+        )
+        query_job = self.client.query(f"DELETE FROM `{self.table_id}` WHERE id = @test_case_id", job_config=job_config)
+        query_job.result()
+        return bool(query_job.num_dml_affected_rows)
+
+    def _load_near_duplicate_index(self) -> Tuple[MinHashLSH, Dict[str, str]]:
+        """Scan the table and build the index; blocking, runs in a worker thread"""
+        index = MinHashLSH(
+            threshold=settings.near_duplicate_threshold,
+            num_perm=settings.near_duplicate_num_perm,
+        )
+        names = {}
+        query = (
+            f"SELECT id, name, input.current_query.text AS query, execution.actual.response AS response "
+            f"FROM `{self.table_id}`"
+        )
+        for row in self.client.query(query).result():
+            index.add(row["id"], near_duplicate_text(row["query"], row["response"]))
+            names[row["id"]] = row["name"]
+        return index, names
+
+    async def _near_duplicate_index(self) -> MinHashLSH:
+        """Build the index from the table once per process; later changes are applied incrementally"""
+        if self._near_duplicates is not None:
+            return self._near_duplicates
+
+        if self._near_duplicates_lock is None:
+            self._near_duplicates_lock = asyncio.Lock()
+        async with self._near_duplicates_lock:
+            if self._near_duplicates is None:
+                self._pending_near_duplicates = []
+                try:
+                    loop = asyncio.get_running_loop()
+                    index, names = await loop.run_in_executor(None, self._load_near_duplicate_index)
+                    self._near_duplicates = index
+                    self._test_case_names.update(names)
+                    for test_case_id, test_case in self._pending_near_duplicates:
+                        if test_case is None:
+                            self._unindex_near_duplicate(test_case_id)
+                        else:
+                            self._index_near_duplicate(test_case)
+                finally:
+                    self._pending_near_duplicates = None
+        return self._near_duplicates
+
+    def _index_near_duplicate(self, test_case: TestCase):
+        if self._near_duplicates is None:
+            if self._pending_near_duplicates is not None:
+                self._pending_near_duplicates.append((test_case.id, test_case))
+            return
+        self._near_duplicates.add(
+            test_case.id,
+            near_duplicate_text(test_case.input.current_query.text, test_case.execution.actual.response),
+        )
+        self._test_case_names[test_case.id] = test_case.name
+
+    def _unindex_near_duplicate(self, test_case_id: str):
+        if self._near_duplicates is None:
+            if self._pending_near_duplicates is not None:
+                self._pending_near_duplicates.append((test_case_id, None))
+            return
+        self._near_duplicates.remove(test_case_id)
+        self._test_case_names.pop(test_case_id, None)
+
+    async def find_near_duplicates(self, texts: Dict[str, str]) -> Dict[str, List[Dict[str, Any]]]:
+        index = await self._near_duplicate_index()
+        matches = {}
+        for key, text in texts.items():
+            similar = index.query(text)
+            if similar:
+                matches[key] = [
+                    {
+                        "test_case_id": test_case_id,
+                        "test_case_name": self._test_case_names.get(test_case_id, ""),
+                        "similarity": similarity,
+                    }
+                    for test_case_id, similarity in similar
+                ]
+        return matches
@@ -0,0 +1,190 @@
+"""带查询结果缓存的BigQuery服务"""
+import asyncio
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.bigquery_service import (
+    BigQueryService,
+    ChunkProjection,
+    ConversationRow,
+    RetrievalChunkRow,
+    ConversationQueryRequest,
+    RetrievalChunkQueryRequest,
+    SessionSummaryRow
+)
+from app.services.embedding_store import EmbeddingStore
+from app.services.query_cache import QueryCache
+from app.utils.logger import logger
+
+def normalize_conversation_request(request: ConversationQueryRequest) -> str:
+    """将查询请求规范化为稳定的缓存键"""
+    data = request.model_dump(mode="json")
+    for field in ("model_ids", "session_ids", "message_types"):
+        if data.get(field):
+            data[field] = sorted(set(data[field]))
+    if data.get("keywords") is not None:
+        data["keywords"] = data["keywords"].strip() or None
+    return json.dumps(data, sort_keys=True, ensure_ascii=False)
+
+class CachedBigQueryService(BigQueryService):
+    """在BigQuery服务前增加结果缓存，缓存历史搜索路径上的重复查询"""
+
+    def __init__(self, service: BigQueryService, cache: QueryCache):
+        """
+        初始化缓存服务
+
+        Args:
+            service: 被包装的BigQuery服务
+            cache: 查询结果缓存
+        """
+        self.service = service
+        self.cache = cache
+        # 正在执行的查询，相同请求并发到达时共享同一个作业
+        self._inflight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        # 片段向量不随查询条件变化，按片段ID缓存在连续矩阵中，占用上限与结果缓存相同
+        self.embeddings = EmbeddingStore()
+
+        logger.info(
+            "CachedBigQueryService initialized",
+            wrapped_service=type(service).__name__,
+            ttl_seconds=cache.ttl_seconds,
+            max_bytes=cache.max_bytes
+        )
+
+    async def _cached(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        hit, value = self.cache.get(key)
+        if hit:
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except BaseException as e:
+            future.set_exception(e)
+            # 避免无人等待时出现未获取异常的警告
+            future.exception()
+            raise
+        else:
+            self.cache.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate(self, method: Optional[str] = None) -> int:
+        """失效缓存，method为空时清空全部缓存"""
+        if method is None:
+            self.embeddings.clear()
+            return self.cache.invalidate()
+        return self.cache.invalidate(lambda key: key[0] == method)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        return {
+            **self.cache.stats(),
+            "embedding_rows": len(self.embeddings),
+            "embedding_bytes": self.embeddings.nbytes
+        }
+
+    async def test_connection(self) -> bool:
+        """测试连接状态"""
+        return await self.service.test_connection()
+
+    async def query_conversations(self, request: ConversationQueryRequest) -> List[ConversationRow]:
+        """查询对话记录（带缓存）"""
+        key = ("query_conversations", normalize_conversation_request(request))
+        return list(await self._cached(key, lambda: self.service.query_conversations(request)))
+
+    async def count_conversations(self, request: ConversationQueryRequest) -> int:
+        """统计对话记录数量（带缓存，忽略分页和游标参数）"""
+        count_request = request.model_copy(update={"limit": 0, "offset": 0, "cursor": None})
+        key = ("count_conversations", normalize_conversation_request(count_request))
+        return await self._cached(key, lambda: self.service.count_conversations(request))
+
+    async def query_conversations_with_total(self, request: ConversationQueryRequest) -> Tuple[List[ConversationRow], int]:
+        """查询当前页对话记录及总数（带缓存）"""
+        key = ("query_conversations_with_total", normalize_conversation_request(request))
+        rows, total = await self._cached(key, lambda: self.service.query_conversations_with_total(request))
+        return list(rows), total
+
+    async def query_sessions_with_total(self, request: ConversationQueryRequest) -> Tuple[List[SessionSummaryRow], int]:
+        """按会话分页查询及会话总数（带缓存）"""
+        key = ("query_sessions_with_total", normalize_conversation_request(request))
+        rows, total = await self._cached(key, lambda: self.service.query_sessions_with_total(request))
+        return list(rows), total
+
+    async def get_conversation_by_id(self, conversation_id: str) -> Optional[ConversationRow]:
+        """根据ID获取对话记录"""
+        return await self.service.get_conversation_by_id(conversation_id)
+
+    async def get_session_conversations(self, session_id: str) -> List[ConversationRow]:
+        """获取会话的所有对话"""
+        return await self.service.get_session_conversations(session_id)
+
+    async def get_sessions_conversations(self, session_ids: List[str]) -> Dict[str, List[ConversationRow]]:
+        """批量获取多个会话的对话"""
+        return await self.service.get_sessions_conversations(session_ids)
+
+    async def query_retrieval_chunks(self, request: RetrievalChunkQueryRequest) -> List[RetrievalChunkRow]:
+        """查询检索片段"""
+        return await self.service.query_retrieval_chunks(request)
+
+    async def count_retrieval_chunks(self, request: RetrievalChunkQueryRequest) -> int:
+        """统计检索片段数量"""
+        return await self.service.count_retrieval_chunks(request)
+
+    async def get_chunk_by_id(
+        self,
+        chunk_id: str,
+        projection: ChunkProjection = ChunkProjection.LIGHT
+    ) -> Optional[RetrievalChunkRow]:
+        """根据ID获取检索片段"""
+        return await self.service.get_chunk_by_id(chunk_id, projection=projection)
+
+    async def get_chunks_by_ids(
+        self,
+        chunk_ids: List[str],
+        projection: ChunkProjection = ChunkProjection.LIGHT
+    ) -> List[RetrievalChunkRow]:
+        """根据ID列表批量获取检索片段"""
+        return await self.service.get_chunks_by_ids(chunk_ids, projection=projection)
+
+    async def get_chunk_embeddings(self, chunk_ids: List[str]) -> Tuple[List[str], np.ndarray]:
+        """批量获取片段向量（按片段缓存，只查询未命中的片段）"""
+        missing = [chunk_id for chunk_id in dict.fromkeys(chunk_ids) if chunk_id not in self.embeddings]
+        if missing:
+            fetched_ids, vectors = await self.service.get_chunk_embeddings(missing)
+            if self.embeddings.nbytes + vectors.nbytes > self.cache.max_bytes:
+                self.embeddings.clear()
+            self.embeddings.add(fetched_ids, vectors)
+        return self.embeddings.take(dict.fromkeys(chunk_ids))
+
+    async def get_available_model_ids(self) -> List[str]:
+        """获取所有可用的模型ID（带缓存）"""
+        key = ("get_available_model_ids",)
+        return list(await self._cached(key, self.service.get_available_model_ids))
+
+    async def get_session_statistics(self, session_id: str) -> Dict[str, Any]:
+        """获取会话统计信息"""
+        return await self.service.get_session_statistics(session_id)
+
+    async def find_similar_sessions(self, session_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """查找语义相似的会话（带缓存）"""
+        key = ("find_similar_sessions", session_id, limit)
+        return list(await self._cached(key, lambda: self.service.find_similar_sessions(session_id, limit)))
+
+    async def stream_conversations(
+        self,
+        request: ConversationQueryRequest,
+        page_size: Optional[int] = None
+    ) -> AsyncIterator[ConversationRow]:
+        """流式查询对话记录（不缓存）"""
+        async for conversation in self.service.stream_conversations(request, page_size=page_size):
+            yield conversation
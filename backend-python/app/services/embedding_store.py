@@ -0,0 +1,117 @@
+"""按ID存放向量的连续float32矩阵"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+class EmbeddingStore:
+    """
+    向量存储
+
+    全部向量按行存放在一个float32矩阵中，ID -> 行号的字典记录每个向量的行偏移。
+    768维向量占3KB，而Python float列表约需25KB（每个元素为独立对象）；
+    get/matrix返回只读视图，不复制数据，相似度等计算可直接在矩阵上向量化完成。
+    """
+
+    def __init__(self, dim: int = 0, capacity: int = 0):
+        """
+        初始化空存储
+
+        Args:
+            dim: 向量维度，为0时由第一次写入确定
+            capacity: 预分配的行数
+        """
+        self._matrix = np.empty((capacity, dim), dtype=np.float32)
+        self._rows: Dict[str, int] = {}
+        self._ids: List[str] = []
+
+    @classmethod
+    def from_matrix(cls, ids: Sequence[str], matrix: np.ndarray) -> "EmbeddingStore":
+        """以现有矩阵构建存储，矩阵已是连续的float32时不复制（如内存映射的Arrow数据）"""
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        if len(ids) != len(matrix):
+            raise ValueError("ids and matrix must have the same length")
+
+        store = cls()
+        store._matrix = matrix.reshape(len(ids), -1) if len(ids) else np.empty((0, 0), dtype=np.float32)
+        store._ids = list(ids)
+        store._rows = {item_id: row for row, item_id in enumerate(store._ids)}
+        return store
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._rows
+
+    @property
+    def dim(self) -> int:
+        return self._matrix.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        """已存放向量占用的字节数"""
+        return len(self._ids) * self.dim * self._matrix.itemsize
+
+    @property
+    def ids(self) -> List[str]:
+        return self._ids
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """(N, d) 只读视图，第i行对应ids[i]"""
+        return _readonly(self._matrix[:len(self._ids)])
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray):
+        """写入向量，已存在的ID原地覆盖，新ID追加（容量按倍数扩展）"""
+        if len(ids) == 0:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        if not self._ids and self.dim != vectors.shape[1]:
+            self._matrix = np.empty((len(self._matrix), vectors.shape[1]), dtype=np.float32)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dimensional vectors, got {vectors.shape[1]}")
+
+        new_ids = [item_id for item_id in dict.fromkeys(ids) if item_id not in self._rows]
+        needed = len(self._ids) + len(new_ids)
+        if needed > len(self._matrix) or not self._matrix.flags.writeable:
+            grown = np.empty((max(needed, 2 * len(self._matrix)), self.dim), dtype=np.float32)
+            grown[:len(self._ids)] = self._matrix[:len(self._ids)]
+            self._matrix = grown
+        for item_id in new_ids:
+            self._rows[item_id] = len(self._ids)
+            self._ids.append(item_id)
+
+        self._matrix[self.rows(ids)] = vectors
+
+    def rows(self, ids: Iterable[str]) -> np.ndarray:
+        """ID对应的行号，不存在的为-1"""
+        rows = self._rows
+        return np.fromiter((rows.get(item_id, -1) for item_id in ids), dtype=np.int64)
+
+    def get(self, item_id: str) -> Optional[np.ndarray]:
+        """单个向量的只读视图"""
+        row = self._rows.get(item_id)
+        return _readonly(self._matrix[row]) if row is not None else None
+
+    def take(self, ids: Iterable[str]) -> Tuple[List[str], np.ndarray]:
+        """
+        批量取出向量
+
+        Returns:
+            (存在的ID, 对应的 (n, d) 矩阵)；不存在的ID被跳过
+        """
+        ids = list(ids)
+        rows = self.rows(ids)
+        found = rows >= 0
+        return [item_id for item_id, hit in zip(ids, found) if hit], self._matrix[rows[found]]
+
+    def clear(self):
+        """清空存储并释放矩阵"""
+        self._matrix = np.empty((0, self.dim), dtype=np.float32)
+        self._rows = {}
+        self._ids = []
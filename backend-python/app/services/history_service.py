@@ -1,12 +1,21 @@
 """历史记录服务"""
 import pandas as pd
 from datetime import datetime
-from typing import List, Dict, Any, Optional
-from app.models.history import HistoryRecord, HistorySearchRequest, SessionDetail
+from typing import List, Dict, Any, Optional, AsyncIterator, Sequence, Set, Tuple, Union
+from app.config import settings
+from app.models.history import HistoryRecord, HistorySearchRequest, SamplingStrategy, SessionDetail
 from app.services.demo_data import MOCK_HISTORY_DATA, AVAILABLE_MODELS, generate_more_history_data
 from app.services.bigquery_factory import get_bigquery_service
-from app.services.bigquery_service import ConversationQueryRequest
+from app.services.cached_bigquery_service import CachedBigQueryService
+from app.services.bigquery_service import (
+    ConversationQueryRequest, ConversationRow, RetrievalChunkRow, SessionSummaryRow, encode_conversation_cursor
+)
+from app.services.session_sampler import StratifiedSessionSampler, k_center, session_vectors
+from app.services.test_case_service import TestCaseService
+from app.services.test_case_store import near_duplicate_text
 from app.utils.logger import logger
+from app.utils.minhash import MinHashLSH, first_occurrences
+from app.utils.text_index import InvertedIndex
 
 class HistoryService:
     """历史记录服务类"""
@@ -15,12 +24,19 @@ class HistoryService:
         """初始化历史记录服务"""
         # 获取BigQuery服务实例
         self.bigquery_service = get_bigquery_service()
+        # 测试用例服务，用于过滤与已有用例近似重复的会话
+        self.test_case_service = TestCaseService()
 
         # 保留原有的演示数据作为后备（向后兼容）
         base_data = MOCK_HISTORY_DATA + generate_more_history_data(15)
         self.df = pd.DataFrame(base_data)
         self.df['created_at'] = pd.to_datetime(self.df['created_at'], utc=True)
 
+        # 演示数据的关键词倒排索引，文档ID为DataFrame行索引
+        self.text_index = InvertedIndex()
+        for index, user_query, ai_response in zip(self.df.index, self.df['user_query'], self.df['ai_response']):
+            self.text_index.add(index, user_query, ai_response)
+
         logger.info("HistoryService initialized with BigQuery integration",
                    service_type=type(self.bigquery_service).__name__,
                    demo_records_count=len(self.df))
@@ -33,6 +49,9 @@ class HistoryService:
                    model_ids=request.model_ids,
                    keywords=request.keywords)
 
+        if request.sample_size:
+            return await self.sample_history(request)
+
         try:
             # 使用BigQuery服务查询
             bq_request = ConversationQueryRequest(
@@ -44,62 +63,40 @@ class HistoryService:
                 max_rating=request.rating_range[1] if request.rating_range else None,
                 limit=request.page_size,
                 offset=(request.page - 1) * request.page_size,
+                cursor=request.cursor,
                 order_by="timestamp",
                 order_direction="desc"
             )
 
-            # 查询对话记录
-            conversations = await self.bigquery_service.query_conversations(bq_request)
+            # 一次查询得到按会话聚合的当前页及会话总数，分页和总数都以会话为单位
+            sessions, total = await self.bigquery_service.query_sessions_with_total(bq_request)
 
-            # 获取总数
-            count_request = bq_request.copy()
-            count_request.offset = 0
-            count_request.limit = 1000000
-            total = await self.bigquery_service.count_conversations(count_request)
+            # 满页时以最后一个会话生成下一页游标
+            next_cursor = None
+            if len(sessions) == request.page_size:
+                last = sessions[-1]
+                next_cursor = encode_conversation_cursor(last.created_at, last.session_id)
 
-            # 按会话分组并转换格式
-            session_dict = {}
-            for conv in conversations:
-                if conv.session_id not in session_dict:
-                    session_dict[conv.session_id] = {
-                        "session_id": conv.session_id,
-                        "user_query": "",
-                        "ai_response": "",
-                        "user_rating": None,
-                        "model_id": conv.model_id,
-                        "created_at": conv.timestamp,
-                        "retrieval_chunks": [],
-                        "test_config": None
-                    }
-
-                session = session_dict[conv.session_id]
-                if conv.message_type == "user":
-                    session["user_query"] = conv.content
-                elif conv.message_type == "assistant":
-                    session["ai_response"] = conv.content
-                    session["user_rating"] = conv.user_rating
-                    # 获取检索片段
-                    if conv.retrieval_chunk_ids:
-                        chunks = await self.bigquery_service.get_chunks_by_ids(conv.retrieval_chunk_ids)
-                        session["retrieval_chunks"] = [
-                            {
-                                "id": chunk.chunk_id,
-                                "title": chunk.title,
-                                "content": chunk.content
-                            }
-                            for chunk in chunks
-                        ]
-
-            # 转换为列表并保持排序
-            items = list(session_dict.values())
-            items.sort(key=lambda x: x["created_at"], reverse=True)
+            # 一次性获取整页会话引用的检索片段
+            chunks_map = await self._resolve_retrieval_chunks(sessions)
+
+            items = [self._session_item(session, chunks_map) for session in sessions]
+            # 近似重复在分页之后过滤：total和total_pages按过滤前的会话计，是上限；
+            # 本页去掉的会话数单独返回，页码和游标不受过滤影响
+            filtered_count = 0
+            if request.exclude_near_duplicates:
+                kept = await self._drop_near_duplicates(items)
+                filtered_count = len(items) - len(kept)
+                items = kept
 
             result = {
                 "items": items,
                 "total": total,
                 "page": request.page,
                 "page_size": request.page_size,
-                "total_pages": (total + request.page_size - 1) // request.page_size
+                "total_pages": (total + request.page_size - 1) // request.page_size,
+                "next_cursor": next_cursor,
+                "filtered_count": filtered_count
             }
 
             # Ensure all data is JSON serializable
@@ -129,11 +126,213 @@ class HistoryService:
             return result
 
         except Exception as e:
+            if request.cursor:
+                # 游标来自会话查询，演示数据只支持页码分页，回退得到的页没有意义
+                logger.error("BigQuery search failed for cursor page", error=str(e))
+                raise
+
             logger.warning("BigQuery search failed, falling back to demo data", error=str(e))
 
             # 回退到原有的演示数据逻辑
             return await self._search_demo_data(request)
 
+    async def sample_history(self, request: HistorySearchRequest) -> Dict[str, Any]:
+        """
+        抽取代表性会话样本
+
+        流式扫描时间范围内符合条件的AI回复（关键词匹配回复内容，超过扫描上限时先按会话
+        哈希抽取），按 (模型, 评分, 主题) 分层做水库抽样，内存占用与时间范围无关；多样性策略先按分层抽取更多候选，
+        再按检索片段向量做k-center选择，使样本覆盖尽量不同的内容。去除近似重复时被去掉的会话由分层中的
+        后备会话补足，只要有足够多互不重复的会话，样本数就等于sample_size。
+        """
+        sample_size = request.sample_size
+        diverse = request.sampling_strategy == SamplingStrategy.DIVERSE
+        # 多样性选择需要更多候选；去除近似重复时每个分层也保留后备会话，用于补足被去掉的名额
+        pool_size = sample_size * settings.history_sample_pool_factor if diverse else sample_size
+        capacity = sample_size * settings.history_sample_pool_factor if diverse or request.exclude_near_duplicates else sample_size
+        sampler = StratifiedSessionSampler(capacity=capacity, seed=request.sample_seed)
+
+        bq_request = ConversationQueryRequest(
+            start_time=request.start_time,
+            end_time=request.end_time,
+            model_ids=request.model_ids,
+            message_types=["assistant"],
+            keywords=request.keywords,
+            min_rating=request.rating_range[0] if request.rating_range else None,
+            max_rating=request.rating_range[1] if request.rating_range else None,
+            order_by="timestamp",
+            order_direction="asc"
+        )
+        # 回复数超过扫描上限时按会话ID哈希抽取一部分会话再扫描：扫描的会话均匀分布在
+        # 整个时间范围内，而不是只取最早的部分；按会话抽取保证入样会话的消息完整
+        message_count = await self.bigquery_service.count_conversations(bq_request)
+        if message_count > settings.history_sample_max_messages:
+            bq_request.session_sample_rate = settings.history_sample_max_messages / message_count
+            bq_request.session_sample_seed = request.sample_seed
+        bq_request.limit = max(1, message_count)
+
+        async for conv in self.bigquery_service.stream_conversations(bq_request):
+            sampler.add(conv)
+
+        # 去除近似重复后按分层重新抽取，被去掉的会话由后备会话补足，直到样本中不再有近似重复
+        excluded: Set[str] = set()
+        fetched: Dict[str, Dict[str, Any]] = {}
+        while True:
+            candidates = sampler.sample(pool_size, exclude=excluded)
+            session_ids = [session_id for session_id, _ in candidates]
+            if diverse and len(session_ids) > sample_size:
+                session_ids = await self._select_diverse(sampler, session_ids, sample_size)
+
+            missing = [session_id for session_id in session_ids if session_id not in fetched]
+            if missing:
+                sessions = await self.bigquery_service.get_sessions_conversations(missing)
+                conversations = [conv for session_id in missing for conv in sessions.get(session_id, [])]
+                chunks_map = await self._resolve_retrieval_chunks(conversations)
+                fetched.update((item["session_id"], item) for item in self._group_sessions(conversations, chunks_map))
+            items = [fetched[session_id] for session_id in session_ids if session_id in fetched]
+            if not request.exclude_near_duplicates:
+                break
+
+            kept = await self._drop_near_duplicates(items)
+            if len(kept) == len(items):
+                break
+            kept_ids = {item["session_id"] for item in kept}
+            excluded.update(item["session_id"] for item in items if item["session_id"] not in kept_ids)
+
+        logger.info("History sample completed",
+                   strategy=request.sampling_strategy.value,
+                   messages_scanned=sampler.messages_seen,
+                   strata_count=len(sampler.strata),
+                   items_returned=len(items))
+
+        return {
+            "items": items,
+            "total": len(items),
+            "page": 1,
+            "page_size": sample_size,
+            "total_pages": 1,
+            "next_cursor": None,
+            "sampling": {
+                "strategy": request.sampling_strategy.value,
+                "seed": request.sample_seed,
+                "messages_scanned": sampler.messages_seen,
+                "strata_count": len(sampler.strata)
+            }
+        }
+
+    async def _select_diverse(
+        self,
+        sampler: StratifiedSessionSampler,
+        session_ids: List[str],
+        sample_size: int
+    ) -> List[str]:
+        """在候选会话中按检索片段向量做k-center选择，没有向量的会话按抽样顺序补足"""
+        chunk_ids = {session_id: sampler.chunk_ids(session_id) for session_id in session_ids}
+        all_chunk_ids = list(dict.fromkeys(chunk_id for ids in chunk_ids.values() for chunk_id in ids))
+        embedded_ids, matrix = await self.bigquery_service.get_chunk_embeddings(all_chunk_ids)
+
+        with_vectors, vectors = session_vectors(session_ids, chunk_ids, embedded_ids, matrix)
+        if vectors is None:
+            return session_ids[:sample_size]
+
+        selected = [with_vectors[index] for index in k_center(vectors, sample_size)]
+        chosen = set(selected)
+        selected.extend([session_id for session_id in session_ids if session_id not in chosen][:sample_size - len(selected)])
+        return selected
+
+    async def _drop_near_duplicates(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """去除与已有测试用例近似、或与结果中排在前面的会话近似的会话（MinHash LSH）"""
+        texts = {item["session_id"]: near_duplicate_text(item["user_query"], item["ai_response"]) for item in items}
+        covered = await self.test_case_service.find_near_duplicates(texts)
+        repeated = first_occurrences(
+            MinHashLSH(threshold=settings.near_duplicate_threshold, num_perm=settings.near_duplicate_num_perm),
+            {session_id: text for session_id, text in texts.items() if session_id not in covered}
+        )
+
+        kept = [item for item in items if item["session_id"] not in covered and item["session_id"] not in repeated]
+        logger.info("Near-duplicate sessions filtered",
+                   input_count=len(items),
+                   kept_count=len(kept))
+        return kept
+
+    def _group_sessions(
+        self,
+        conversations: List[ConversationRow],
+        chunks_map: Dict[str, RetrievalChunkRow]
+    ) -> List[Dict[str, Any]]:
+        """按会话分组并转换为历史记录格式，保持会话首次出现的顺序"""
+        session_dict = {}
+        for conv in conversations:
+            if conv.session_id not in session_dict:
+                session_dict[conv.session_id] = {
+                    "session_id": conv.session_id,
+                    "user_query": "",
+                    "ai_response": "",
+                    "user_rating": None,
+                    "model_id": conv.model_id,
+                    "created_at": conv.timestamp,
+                    "retrieval_chunks": [],
+                    "test_config": None
+                }
+
+            session = session_dict[conv.session_id]
+            if conv.message_type == "user":
+                session["user_query"] = conv.content
+            elif conv.message_type == "assistant":
+                session["ai_response"] = conv.content
+                session["user_rating"] = conv.user_rating
+                if conv.retrieval_chunk_ids:
+                    session["retrieval_chunks"] = self._format_retrieval_chunks(
+                        conv.retrieval_chunk_ids, chunks_map
+                    )
+
+        return list(session_dict.values())
+
+    def _session_item(self, session: SessionSummaryRow, chunks_map: Dict[str, RetrievalChunkRow]) -> Dict[str, Any]:
+        """将会话汇总转换为历史记录格式"""
+        return {
+            "session_id": session.session_id,
+            "user_query": session.user_query,
+            "ai_response": session.ai_response,
+            "user_rating": session.user_rating,
+            "model_id": session.model_id,
+            "created_at": session.created_at,
+            "retrieval_chunks": self._format_retrieval_chunks(session.retrieval_chunk_ids, chunks_map),
+            "test_config": None
+        }
+
+    async def _resolve_retrieval_chunks(
+        self,
+        rows: Sequence[Union[ConversationRow, SessionSummaryRow]]
+    ) -> Dict[str, RetrievalChunkRow]:
+        """收集一页对话或会话引用的全部检索片段ID，去重后一次性批量获取"""
+        chunk_ids = list(dict.fromkeys(
+            chunk_id
+            for row in rows
+            for chunk_id in row.retrieval_chunk_ids
+        ))
+        if not chunk_ids:
+            return {}
+
+        chunks = await self.bigquery_service.get_chunks_by_ids(chunk_ids)
+        logger.debug("Retrieval chunks resolved for page",
+                    requested_count=len(chunk_ids),
+                    resolved_count=len(chunks))
+        return {chunk.chunk_id: chunk for chunk in chunks}
+
+    @staticmethod
+    def _format_retrieval_chunks(chunk_ids: List[str], chunks_map: Dict[str, RetrievalChunkRow]) -> List[Dict[str, Any]]:
+        """按消息引用顺序将批量结果分发回单条消息"""
+        return [
+            {
+                "id": chunks_map[chunk_id].chunk_id,
+                "title": chunks_map[chunk_id].title,
+                "content": chunks_map[chunk_id].content
+            }
+            for chunk_id in chunk_ids
+            if chunk_id in chunks_map
+        ]
+
     async def _search_demo_data(self, request: HistorySearchRequest) -> Dict[str, Any]:
         """使用演示数据进行搜索（回退方案）"""
         logger.info("Using demo data for history search")
@@ -164,12 +363,7 @@ class HistoryService:
 
         # 关键词搜索
         if request.keywords and request.keywords.strip():
-            keywords = request.keywords.lower().strip()
-            keyword_mask = (
-                filtered_df['user_query'].str.lower().str.contains(keywords, na=False) |
-                filtered_df['ai_response'].str.lower().str.contains(keywords, na=False)
-            )
-            filtered_df = filtered_df[keyword_mask]
+            filtered_df = filtered_df[filtered_df.index.isin(self.text_index.search(request.keywords))]
 
         # 按时间倒序排序
         filtered_df = filtered_df.sort_values('created_at', ascending=False)
@@ -199,7 +393,9 @@ class HistoryService:
             "total": total,
             "page": request.page,
             "page_size": request.page_size,
-            "total_pages": (total + request.page_size - 1) // request.page_size
+            "total_pages": (total + request.page_size - 1) // request.page_size,
+            "next_cursor": None,  # 演示数据仅支持页码分页
+            "filtered_count": 0
         }
 
         # Ensure all data is JSON serializable
@@ -241,21 +437,13 @@ class HistoryService:
                 # 回退到演示数据
                 return await self._get_session_details_demo(session_id)
 
+            # 一次性获取整个会话引用的检索片段
+            chunks_map = await self._resolve_retrieval_chunks(conversations)
+
             # 转换为SessionDetail对象
             details = []
             for conv in conversations:
-                # 获取检索片段
-                retrieval_chunks = []
-                if conv.retrieval_chunk_ids:
-                    chunks = await self.bigquery_service.get_chunks_by_ids(conv.retrieval_chunk_ids)
-                    retrieval_chunks = [
-                        {
-                            "id": chunk.chunk_id,
-                            "title": chunk.title,
-                            "content": chunk.content
-                        }
-                        for chunk in chunks
-                    ]
+                retrieval_chunks = self._format_retrieval_chunks(conv.retrieval_chunk_ids, chunks_map)
 
                 if conv.message_type == "user":
                     detail = SessionDetail(
@@ -313,6 +501,15 @@ class HistoryService:
 
         return details
 
+    async def find_similar_sessions(self, session_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """查找与指定会话语义相似的会话，会话没有embedding时抛出ValueError"""
+        logger.info("Finding similar sessions", session_id=session_id, limit=limit)
+
+        similar = await self.bigquery_service.find_similar_sessions(session_id, limit)
+
+        logger.info("Similar sessions found", session_id=session_id, result_count=len(similar))
+        return similar
+
     async def get_model_ids(self) -> List[str]:
         """获取所有可用的模型ID列表"""
         logger.info("Getting available model IDs")
@@ -339,6 +536,79 @@ class HistoryService:
 
             return model_ids
 
+    async def export_conversations(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        model_ids: Optional[List[str]] = None,
+        keywords: Optional[str] = None,
+        rating_range: Optional[Tuple[int, int]] = None,
+        limit: int = 100000,
+        lines_per_chunk: int = 500
+    ) -> AsyncIterator[str]:
+        """
+        以NDJSON格式流式导出对话记录，按块输出，内存占用与结果总量无关
+
+        返回前先取出第一块：查询条件或数据源的错误在响应开始前抛出，
+        由调用方返回错误状态码，而不是输出被截断的响应体。
+        """
+        bq_request = ConversationQueryRequest(
+            start_time=start_time,
+            end_time=end_time,
+            model_ids=model_ids,
+            keywords=keywords,
+            min_rating=rating_range[0] if rating_range else None,
+            max_rating=rating_range[1] if rating_range else None,
+            limit=limit,
+            order_by="timestamp",
+            order_direction="asc"
+        )
+
+        chunks = self._export_chunks(bq_request, lines_per_chunk)
+        try:
+            first_chunk = await chunks.__anext__()
+        except StopAsyncIteration:
+            first_chunk = None
+
+        async def stream() -> AsyncIterator[str]:
+            if first_chunk is None:
+                return
+            yield first_chunk
+            async for chunk in chunks:
+                yield chunk
+
+        return stream()
+
+    async def _export_chunks(self, bq_request: ConversationQueryRequest, lines_per_chunk: int) -> AsyncIterator[str]:
+        """按块输出NDJSON行"""
+        exported = 0
+        buffer: List[str] = []
+        async for conv in self.bigquery_service.stream_conversations(bq_request):
+            buffer.append(conv.model_dump_json())
+            exported += 1
+            if len(buffer) >= lines_per_chunk:
+                yield "\n".join(buffer) + "\n"
+                buffer = []
+
+        if buffer:
+            yield "\n".join(buffer) + "\n"
+
+        logger.info("Conversation export completed", exported_count=exported)
+
+    def get_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """获取查询缓存统计信息，未启用缓存时返回None"""
+        if isinstance(self.bigquery_service, CachedBigQueryService):
+            return self.bigquery_service.cache_stats()
+        return None
+
+    def invalidate_cache(self) -> int:
+        """清空查询缓存，返回失效条目数"""
+        if isinstance(self.bigquery_service, CachedBigQueryService):
+            removed = self.bigquery_service.invalidate()
+            logger.info("History query cache invalidated", removed_count=removed)
+            return removed
+        return 0
+
     async def test_connection(self) -> bool:
         """测试服务连接状态"""
         try:
@@ -0,0 +1,115 @@
+"""按块预留的测试用例ID分配器"""
+import asyncio
+import os
+from typing import Callable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # 非POSIX平台无文件锁，仅保证进程内安全
+    fcntl = None
+
+from app.utils.logger import logger
+
+class IdAllocator:
+    """
+    递增ID分配器
+
+    每次从计数器预留一整块编号（block_size个），块内编号在进程内分配，不再访问存储。
+    提供counter_path时计数器保存在本地文件中，预留通过文件锁互斥，同一主机上的
+    多个worker进程不会拿到重叠的编号；进程退出时未用完的编号会留下空缺。
+    """
+
+    def __init__(
+        self,
+        prefix: str = "TC",
+        width: int = 4,
+        block_size: int = 1000,
+        counter_path: Optional[str] = None,
+        seed: Callable[[], int] = lambda: 0
+    ):
+        """
+        初始化分配器
+
+        Args:
+            prefix: ID前缀
+            width: 编号最小位数
+            block_size: 每次预留的编号数
+            counter_path: 计数器文件路径，为None时只在进程内计数
+            seed: 计数器不存在时调用，返回已使用的最大编号
+        """
+        self.prefix = prefix
+        self.width = width
+        self.block_size = max(1, block_size)
+        self.counter_path = counter_path
+        self._seed = seed
+
+        # 当前块内下一个可用编号及块末尾（不含）
+        self._next = 0
+        self._end = 0
+        # 进程内计数器（counter_path为None时使用）
+        self._local_counter: Optional[int] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _format(self, number: int) -> str:
+        return f"{self.prefix}-{number:0{self.width}d}"
+
+    def _reserve(self, count: int) -> int:
+        """预留count个连续编号，返回起始编号"""
+        if self.counter_path is None:
+            if self._local_counter is None:
+                self._local_counter = self._seed() + 1
+            start = self._local_counter
+            self._local_counter += count
+            return start
+
+        directory = os.path.dirname(os.path.abspath(self.counter_path))
+        os.makedirs(directory, exist_ok=True)
+
+        fd = os.open(self.counter_path, os.O_RDWR | os.O_CREAT, 0o644)
+        with os.fdopen(fd, "r+") as counter_file:
+            if fcntl is not None:
+                fcntl.flock(counter_file.fileno(), fcntl.LOCK_EX)
+            try:
+                content = counter_file.read().strip()
+                start = int(content) if content else self._seed() + 1
+
+                counter_file.seek(0)
+                counter_file.truncate()
+                counter_file.write(str(start + count))
+                counter_file.flush()
+                os.fsync(counter_file.fileno())
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(counter_file.fileno(), fcntl.LOCK_UN)
+
+        logger.info("ID block reserved", prefix=self.prefix, start=start, count=count, counter_path=self.counter_path)
+        return start
+
+    async def allocate(self, count: int = 1) -> List[str]:
+        """分配count个ID，当前块不足时预留新块"""
+        if count <= 0:
+            return []
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            numbers: List[int] = []
+            while len(numbers) < count:
+                if self._next >= self._end:
+                    needed = count - len(numbers)
+                    reserved = max(self.block_size, needed)
+                    # 文件锁、fsync和计数器初始化查询都是阻塞操作，放到线程池执行
+                    loop = asyncio.get_running_loop()
+                    self._next = await loop.run_in_executor(None, self._reserve, reserved)
+                    self._end = self._next + reserved
+
+                take = min(count - len(numbers), self._end - self._next)
+                numbers.extend(range(self._next, self._next + take))
+                self._next += take
+
+        return [self._format(number) for number in numbers]
+
+    async def next_id(self) -> str:
+        """分配一个ID"""
+        return (await self.allocate(1))[0]
@@ -1,24 +1,36 @@
 """导入服务"""
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator, Callable, Tuple
 import asyncio
+import functools
+import os
+import socket
 import uuid
 import random
 from app.models.import_models import (
     ImportRequest, ImportPreview, ImportTask, ImportProgress,
-    ImportTaskStatus, DuplicateSessionInfo, ImportValidationResult
+    ImportTaskStatus, DuplicateSessionInfo, ImportValidationResult, NearDuplicateSessionInfo
 )
+from app.models.test_case import TestCaseCreate
 from app.services.data_conversion_service import data_conversion_service
 from app.services.test_case_service import TestCaseService
 from app.services.bigquery_factory import get_bigquery_service
-from app.services.bigquery_service import ConversationQueryRequest
+from app.services.bigquery_service import ConversationQueryRequest, ConversationRow
+from app.services.import_task_store import ImportTaskStore
+from app.services.test_case_store import near_duplicate_text
+from app.config import settings
 from app.utils.logger import logger
+from app.utils.minhash import MinHashLSH, first_occurrences
+from app.utils.rate_limiter import RateLimiter
 
 class ImportService:
     """导入服务类"""
     _instance = None
     _shared_service = None
 
+    # 每次批量获取的会话数
+    SESSION_FETCH_BATCH_SIZE = 200
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(ImportService, cls).__new__(cls)
@@ -29,12 +41,25 @@ class ImportService:
         # 如果已经有共享服务实例，直接使用
         if ImportService._shared_service is not None:
             self.tasks = ImportService._shared_service.tasks
+            self.store = ImportService._shared_service.store
+            self.worker_id = ImportService._shared_service.worker_id
+            self._running = ImportService._shared_service._running
+            self._recovery_task = ImportService._shared_service._recovery_task
+            self._progress_events = ImportService._shared_service._progress_events
             self.test_case_service = ImportService._shared_service.test_case_service
             self.bigquery_service = ImportService._shared_service.bigquery_service
             return
 
-        # 存储导入任务
+        # 持久化任务存储，多个worker进程共享
+        self.store = ImportTaskStore(settings.import_task_db_path)
+        # 当前进程的租约持有者标识
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # 当前进程正在执行的任务
         self.tasks: Dict[str, ImportTask] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._recovery_task: Optional[asyncio.Task] = None
+        # 进度变化通知，供进度流订阅者等待
+        self._progress_events: Dict[str, asyncio.Event] = {}
         # 测试用例服务
         self.test_case_service = TestCaseService()
         # BigQuery服务
@@ -43,7 +68,7 @@ class ImportService:
         # 保存为共享实例
         ImportService._shared_service = self
 
-        logger.info("ImportService initialized")
+        logger.info("ImportService initialized", worker_id=self.worker_id)
 
     async def check_duplicate_sessions(self, session_ids: List[str]) -> ImportValidationResult:
         """检查重复会话"""
@@ -98,6 +123,59 @@ class ImportService:
 
         return result
 
+    @staticmethod
+    def _session_text(conversations: List[ConversationRow]) -> str:
+        """会话用于近似重复比较的文本：最后一条用户消息 + 最后一条AI回复（与转换后的测试用例一致）"""
+        last_user = next((conv.content for conv in reversed(conversations) if conv.message_type == "user"), None)
+        last_assistant = next((conv.content for conv in reversed(conversations) if conv.message_type == "assistant"), None)
+        return near_duplicate_text(last_user, last_assistant)
+
+    async def find_near_duplicate_sessions(self, session_ids: List[str]) -> List[NearDuplicateSessionInfo]:
+        """
+        查找内容近似重复的会话
+
+        会话与已有测试用例近似，或与本批次中排在前面的会话近似时均被标记；
+        每个会话只查询LSH分桶，不与全部用例逐一比较。
+        """
+        texts: Dict[str, str] = {}
+        for start in range(0, len(session_ids), self.SESSION_FETCH_BATCH_SIZE):
+            batch = session_ids[start:start + self.SESSION_FETCH_BATCH_SIZE]
+            sessions_conversations = await self.bigquery_service.get_sessions_conversations(batch)
+            for session_id in batch:
+                text = self._session_text(sessions_conversations.get(session_id, []))
+                if text:
+                    texts[session_id] = text
+
+        existing = await self.test_case_service.find_near_duplicates(texts)
+
+        in_batch = first_occurrences(
+            MinHashLSH(threshold=settings.near_duplicate_threshold, num_perm=settings.near_duplicate_num_perm),
+            {session_id: text for session_id, text in texts.items() if session_id not in existing}
+        )
+
+        near_duplicates = []
+        for session_id in texts:
+            if session_id in existing:
+                best = existing[session_id][0]
+                near_duplicates.append(NearDuplicateSessionInfo(
+                    session_id=session_id,
+                    similarity=best["similarity"],
+                    existing_test_case_id=best["test_case_id"],
+                    existing_test_case_name=best["test_case_name"]
+                ))
+            elif session_id in in_batch:
+                similar_session_id, similarity = in_batch[session_id]
+                near_duplicates.append(NearDuplicateSessionInfo(
+                    session_id=session_id,
+                    similarity=similarity,
+                    similar_session_id=similar_session_id
+                ))
+
+        logger.info("Near-duplicate session check completed",
+                   session_count=len(session_ids),
+                   near_duplicate_count=len(near_duplicates))
+        return near_duplicates
+
     async def preview_import(self, request: ImportRequest) -> ImportPreview:
         """预览导入数据"""
         logger.info("Previewing import",
@@ -106,15 +184,23 @@ class ImportService:
         # 检查重复会话
         validation_result = await self.check_duplicate_sessions(request.session_ids)
 
+        # 在未重复的会话中检查内容近似重复
+        near_duplicates = []
+        try:
+            near_duplicates = await self.find_near_duplicate_sessions(validation_result.valid_sessions)
+        except Exception as e:
+            logger.error("Near-duplicate session check failed", error=str(e))
+
         preview_count = min(5, len(request.session_ids))
         preview_session_ids = request.session_ids[:preview_count]
 
         # 获取预览会话数据
         preview_sessions = []
         try:
+            # 一次查询获取全部预览会话的对话记录
+            sessions_conversations = await self.bigquery_service.get_sessions_conversations(preview_session_ids)
             for session_id in preview_session_ids:
-                # 获取会话的对话记录
-                conversations = await self.bigquery_service.get_session_conversations(session_id)
+                conversations = sessions_conversations.get(session_id, [])
                 if conversations:
                     preview_sessions.append({
                         "session_id": session_id,
@@ -142,6 +228,8 @@ class ImportService:
             message = base_message + duplicate_message
         else:
             message = base_message
+        if near_duplicates:
+            message += f"，{len(near_duplicates)} 个会话与已有用例或其他会话内容近似"
 
         preview = ImportPreview(
             total_count=len(request.session_ids),
@@ -150,6 +238,7 @@ class ImportService:
             preview_data=preview_sessions,
             message=message,
             duplicate_sessions=validation_result.duplicate_sessions,
+            near_duplicate_sessions=near_duplicates,
             validation_result=validation_result
         )
 
@@ -157,7 +246,8 @@ class ImportService:
                    total_count=preview.total_count,
                    preview_count=preview.preview_count,
                    preview_sessions_count=len(preview_sessions),
-                   duplicate_count=validation_result.duplicate_count)
+                   duplicate_count=validation_result.duplicate_count,
+                   near_duplicate_count=len(near_duplicates))
 
         return preview
 
@@ -167,7 +257,8 @@ class ImportService:
         validation_result = await self.check_duplicate_sessions(request.session_ids)
 
         # 生成任务ID
-        task_id = f"IMPORT-{int(datetime.now().timestamp())}"
+        # 时间戳加随机后缀，避免多个worker进程同一秒内生成相同ID
+        task_id = f"IMPORT-{int(datetime.now().timestamp())}-{uuid.uuid4().hex[:6]}"
 
         # 构建配置参数
         config = {
@@ -176,6 +267,7 @@ class ImportService:
             "default_difficulty": request.default_difficulty,
             "include_analysis": request.include_analysis,
             "skip_duplicates": request.skip_duplicates if request.skip_duplicates is not None else True,
+            "concurrency": request.concurrency or settings.import_concurrency,
             "validation_result": validation_result
         }
 
@@ -201,7 +293,7 @@ class ImportService:
                     end_time=datetime.now(),
                     message="所有会话都已存在，跳过重复会话后无新会话可导入"
                 )
-                self.tasks[task_id] = task
+                await self._store_call(self.store.create_task, task)
                 return task
         else:
             # 不跳过重复会话，处理所有会话
@@ -221,8 +313,10 @@ class ImportService:
             config=config
         )
 
-        # 存储任务
-        self.tasks[task_id] = task
+        # 持久化任务，创建者同时持有执行租约
+        await self._store_call(
+            self.store.create_task, task, lease_owner=self.worker_id, lease_seconds=settings.import_task_lease_seconds
+        )
 
         logger.info("Import task created",
                    task_id=task_id,
@@ -235,20 +329,78 @@ class ImportService:
                    config=config)
 
         # 异步执行导入
-        asyncio.create_task(self._process_import_task(task_id))
+        self._start_task(task_id)
 
         return task
 
+    def _start_task(self, task_id: str):
+        """在当前进程中启动任务执行"""
+        if task_id in self._running:
+            return
+        runner = asyncio.create_task(self._process_import_task(task_id))
+        self._running[task_id] = runner
+        runner.add_done_callback(lambda _: self._running.pop(task_id, None))
+
+    async def _store_call(self, method: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        在线程池中执行任务存储操作
+
+        存储共用一个连接，写事务在其他进程持有数据库锁时会等待，不能在事件循环上执行。
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(method, *args, **kwargs))
+
+    async def _renew_lease(self, task_id: str, lease_lost: asyncio.Event) -> bool:
+        """
+        续期任务租约
+
+        租约已被其他进程接管（或任务已删除）时标记lease_lost并取消本进程的执行，
+        避免两个进程同时写入同一任务。
+        """
+        if not lease_lost.is_set() and await self._store_call(
+            self.store.acquire_lease, task_id, self.worker_id, settings.import_task_lease_seconds
+        ):
+            return True
+
+        if not lease_lost.is_set():
+            lease_lost.set()
+            logger.warning("Import task lease lost, stopping", task_id=task_id, worker_id=self.worker_id)
+            runner = self._running.get(task_id)
+            if runner is not None:
+                runner.cancel()
+        return False
+
+    async def _keep_lease(self, task_id: str, lease_lost: asyncio.Event):
+        """周期性续期任务租约，直到任务结束或租约丢失"""
+        interval = max(1.0, settings.import_task_lease_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            if not await self._renew_lease(task_id, lease_lost):
+                return
+
     async def _process_import_task(self, task_id: str):
-        """处理导入任务（后台执行）"""
-        task = self.tasks.get(task_id)
+        """处理导入任务（后台执行），从最后提交的会话检查点继续"""
+        task = await self._store_call(self.store.get_task, task_id)
         if not task:
             return
 
+        self.tasks[task_id] = task
+        lease_lost = asyncio.Event()
+        lease_keeper = asyncio.create_task(self._keep_lease(task_id, lease_lost))
         try:
+            # 跳过已有检查点的会话
+            finished = await self._store_call(self.store.finished_sessions, task_id)
+            pending_session_ids = [session_id for session_id in task.session_ids if session_id not in finished]
+
             # 更新任务状态为运行中
             task.status = ImportTaskStatus.RUNNING
-            logger.info("Import task started", task_id=task_id)
+            await self._store_call(self.store.update_status, task_id, ImportTaskStatus.RUNNING)
+            self._notify_progress(task_id)
+            logger.info("Import task started",
+                       task_id=task_id,
+                       resumed=bool(finished),
+                       finished_sessions=len(finished),
+                       pending_sessions=len(pending_session_ids))
 
             # 获取转换配置
             config = getattr(task, 'config', {})
@@ -260,88 +412,15 @@ class ImportService:
                 "include_analysis": config.get("include_analysis", False)
             }
 
-            # 处理每个会话
-            for i, session_id in enumerate(task.session_ids):
-                try:
-                    logger.info("Processing session",
-                               task_id=task_id,
-                               session_id=session_id,
-                               progress=f"{i+1}/{len(task.session_ids)}")
-
-                    # 获取会话数据
-                    session_conversations = await self.bigquery_service.get_session_conversations(session_id)
-
-                    if not session_conversations:
-                        logger.warning("No conversations found for session",
-                                     task_id=task_id,
-                                     session_id=session_id)
-                        task.failed += 1
-                        continue
-
-                    # 获取检索片段数据
-                    all_chunk_ids = []
-                    for conv in session_conversations:
-                        if conv.retrieval_chunk_ids:
-                            all_chunk_ids.extend(conv.retrieval_chunk_ids)
-
-                    retrieval_chunks_map = {}
-                    if all_chunk_ids:
-                        # 批量获取检索片段
-                        unique_chunk_ids = list(set(all_chunk_ids))
-                        try:
-                            chunks = await self.bigquery_service.get_chunks_by_ids(unique_chunk_ids)
-                            retrieval_chunks_map = {chunk.chunk_id: chunk for chunk in chunks}
-                        except Exception as e:
-                            logger.warning("Failed to fetch retrieval chunks",
-                                         task_id=task_id,
-                                         session_id=session_id,
-                                         error=str(e))
-
-                    # 获取会话的测试配置信息（如果可用）
-                    session_test_config = None
-                    try:
-                        # 尝试从历史服务的demo data获取test_config
-                        from app.services.demo_data import MOCK_HISTORY_DATA
-                        for session in MOCK_HISTORY_DATA:
-                            if session.get("session_id") == session_id:
-                                session_test_config = session.get("test_config")
-                                break
-                    except Exception as e:
-                        logger.debug("Could not get test config from demo data",
-                                   task_id=task_id,
-                                   session_id=session_id,
-                                   error=str(e))
-
-                    # 更新转换配置，设置正确的源会话ID和test_config
-                    conversion_config["source_session"] = session_id
-                    if session_test_config:
-                        conversion_config["test_config"] = session_test_config
-
-                    # 转换为测试用例
-                    test_case_create = await data_conversion_service.convert_session_to_test_case(
-                        session_conversations,
-                        retrieval_chunks_map,
-                        conversion_config
-                    )
-
-                    # 创建测试用例
-                    created_test_case = await self.test_case_service.create_test_case(test_case_create)
-
-                    task.processed += 1
-                    logger.info("Session converted successfully",
-                               task_id=task_id,
-                               session_id=session_id,
-                               test_case_id=created_test_case.id)
-
-                except Exception as e:
-                    task.failed += 1
-                    logger.error("Session processing failed",
-                               task_id=task_id,
-                               session_id=session_id,
-                               error=str(e))
-
-                # 添加小延迟避免过快的处理
-                await asyncio.sleep(0.05)
+            await self._run_import_pipeline(
+                task,
+                pending_session_ids,
+                conversion_config,
+                config.get("concurrency") or settings.import_concurrency,
+                lease_lost
+            )
+            if lease_lost.is_set():
+                return
 
             # 任务完成
             task.status = ImportTaskStatus.COMPLETED
@@ -354,6 +433,11 @@ class ImportService:
             else:
                 task.message = f"导入完成: {task.processed}/{task.total} 个会话转换成功 ({success_rate:.1f}% 成功率)"
 
+            await self._store_call(
+                self.store.update_status, task_id, task.status, message=task.message, end_time=task.end_time
+            )
+            self._notify_progress(task_id)
+
             logger.info("Import task completed",
                        task_id=task_id,
                        processed=task.processed,
@@ -362,19 +446,317 @@ class ImportService:
                        success_rate=f"{success_rate:.1f}%",
                        duration=task.end_time - task.start_time)
 
+        except asyncio.CancelledError:
+            # 租约丢失时任务由接管的进程继续执行，本进程不修改任务状态
+            if not lease_lost.is_set():
+                raise
+            logger.info("Import task handed over", task_id=task_id, worker_id=self.worker_id)
+
         except Exception as e:
             # 任务失败
             task.status = ImportTaskStatus.FAILED
             task.end_time = datetime.now()
             task.message = f"Import failed: {str(e)}"
+            await self._store_call(
+                self.store.update_status, task_id, task.status, message=task.message, end_time=task.end_time
+            )
+            self._notify_progress(task_id)
 
             logger.error("Import task failed",
                        task_id=task_id,
                        error=str(e))
 
+        finally:
+            lease_keeper.cancel()
+            self.tasks.pop(task_id, None)
+            # 无论完成、失败还是被接管，都移除并唤醒等待事件：订阅者重新读取最终状态，
+            # 没有订阅者时也不会在字典中遗留
+            self._notify_progress(task_id)
+
+    async def resume_orphaned_tasks(self) -> List[str]:
+        """接管执行进程已退出（租约过期）的未完成任务，返回接管的任务ID"""
+        resumed = []
+        for task_id in await self._store_call(self.store.find_orphaned_tasks):
+            if task_id in self._running:
+                continue
+            if await self._store_call(self.store.acquire_lease, task_id, self.worker_id, settings.import_task_lease_seconds):
+                logger.info("Resuming interrupted import task", task_id=task_id, worker_id=self.worker_id)
+                self._start_task(task_id)
+                resumed.append(task_id)
+        return resumed
+
+    def start_recovery(self):
+        """启动后台恢复循环：启动时及之后每个租约周期检查一次中断的任务"""
+        if self._recovery_task is not None:
+            return
+
+        async def recover():
+            while True:
+                try:
+                    await self.resume_orphaned_tasks()
+                except Exception as e:
+                    logger.error("Import task recovery failed", error=str(e))
+                await asyncio.sleep(settings.import_task_lease_seconds)
+
+        self._recovery_task = asyncio.create_task(recover())
+
+    async def _record_session_result(
+        self,
+        task: ImportTask,
+        session_id: str,
+        succeeded: bool,
+        test_case_id: Optional[str] = None
+    ):
+        """提交会话检查点，并同步更新内存中的任务计数"""
+        await self._record_session_results(task, [(session_id, succeeded, test_case_id)])
+
+    async def _record_session_results(self, task: ImportTask, results: List[Tuple[str, bool, Optional[str]]]):
+        """在一个事务中提交一批会话检查点，并同步更新内存中的任务计数"""
+        recorded = await self._store_call(self.store.record_sessions, task.task_id, results)
+        for (_, succeeded, _), inserted in zip(results, recorded):
+            if inserted and succeeded:
+                task.processed += 1
+            elif inserted:
+                task.failed += 1
+        if any(recorded):
+            self._notify_progress(task.task_id)
+
+    def _notify_progress(self, task_id: str):
+        """唤醒等待该任务进度变化的订阅者"""
+        event = self._progress_events.pop(task_id, None)
+        if event is not None:
+            event.set()
+
+    async def _run_import_pipeline(
+        self,
+        task: ImportTask,
+        session_ids: List[str],
+        conversion_config: Dict[str, Any],
+        concurrency: int,
+        lease_lost: asyncio.Event
+    ):
+        """
+        并发导入流水线
+
+        一个生产者按批获取会话对话和检索片段，放入有界队列；concurrency个工作者
+        并发执行转换，由限流器控制会话处理速率；一个写入者将转换结果按批
+        批量创建为测试用例，并提交会话检查点。写入者每次写入前确认仍持有租约，
+        租约丢失后不再写入，未写入的结果由接管的进程重新处理。
+        """
+        task_id = task.task_id
+        concurrency = max(1, concurrency)
+        queue: "asyncio.Queue[Optional[tuple]]" = asyncio.Queue(maxsize=concurrency * 2)
+        flush_size = max(1, settings.import_flush_batch_size)
+        write_queue: "asyncio.Queue[Optional[tuple]]" = asyncio.Queue(maxsize=flush_size * 2)
+        rate_limiter = RateLimiter(settings.import_max_sessions_per_second, burst=concurrency)
+        total_sessions = len(task.session_ids)
+
+        logger.info("Import pipeline started",
+                   task_id=task_id,
+                   concurrency=concurrency,
+                   max_sessions_per_second=settings.import_max_sessions_per_second)
+
+        async def produce():
+            try:
+                # 按批获取：每批的对话和检索片段各只查询一次
+                batch_size = self.SESSION_FETCH_BATCH_SIZE
+                for batch_start in range(0, len(session_ids), batch_size):
+                    batch_session_ids = session_ids[batch_start:batch_start + batch_size]
+
+                    try:
+                        sessions_conversations = await self.bigquery_service.get_sessions_conversations(batch_session_ids)
+                    except Exception as e:
+                        await self._record_session_results(
+                            task, [(session_id, False, None) for session_id in batch_session_ids]
+                        )
+                        logger.error("Session batch fetch failed",
+                                   task_id=task_id,
+                                   batch_start=batch_start,
+                                   batch_size=len(batch_session_ids),
+                                   error=str(e))
+                        continue
+
+                    retrieval_chunks_map = await self._fetch_retrieval_chunks(task_id, sessions_conversations)
+
+                    for session_id in batch_session_ids:
+                        await queue.put((session_id, sessions_conversations.get(session_id, []), retrieval_chunks_map))
+            finally:
+                # 通知工作者退出
+                for _ in range(concurrency):
+                    await queue.put(None)
+
+        async def work():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+
+                session_id, session_conversations, retrieval_chunks_map = item
+                await rate_limiter.acquire()
+
+                logger.info("Processing session",
+                           task_id=task_id,
+                           session_id=session_id,
+                           progress=f"{task.processed + task.failed + 1}/{total_sessions}")
+
+                test_case_create = await self._convert_session(
+                    task,
+                    session_id,
+                    session_conversations,
+                    retrieval_chunks_map,
+                    conversion_config
+                )
+                if test_case_create is not None:
+                    await write_queue.put((session_id, test_case_create))
+
+        async def write():
+            pending: List[tuple] = []
+            finished = False
+            while not finished:
+                item = await write_queue.get()
+                if item is None:
+                    finished = True
+                else:
+                    pending.append(item)
+
+                # 攒满一批、上游暂时没有新结果或流水线结束时写入
+                if pending and (finished or len(pending) >= flush_size or write_queue.empty()):
+                    if not await self._renew_lease(task_id, lease_lost):
+                        logger.warning("Discarding unflushed test cases", task_id=task_id, count=len(pending))
+                        return
+                    # 写入中途不取消：已创建的测试用例必须提交检查点，否则接管的进程会重复创建
+                    await asyncio.shield(self._flush_test_cases(task, pending))
+                    pending = []
+
+        writer = asyncio.create_task(write())
+        try:
+            await asyncio.gather(produce(), *[work() for _ in range(concurrency)])
+        finally:
+            if lease_lost.is_set():
+                writer.cancel()
+                await asyncio.gather(writer, return_exceptions=True)
+            else:
+                await write_queue.put(None)
+                await writer
+
+    async def _fetch_retrieval_chunks(
+        self,
+        task_id: str,
+        sessions_conversations: Dict[str, List[Any]]
+    ) -> Dict[str, Any]:
+        """一次性获取一批会话引用的全部检索片段"""
+        unique_chunk_ids = list(dict.fromkeys(
+            chunk_id
+            for conversations in sessions_conversations.values()
+            for conv in conversations
+            for chunk_id in (conv.retrieval_chunk_ids or [])
+        ))
+        if not unique_chunk_ids:
+            return {}
+
+        try:
+            chunks = await self.bigquery_service.get_chunks_by_ids(unique_chunk_ids)
+            return {chunk.chunk_id: chunk for chunk in chunks}
+        except Exception as e:
+            logger.warning("Failed to fetch retrieval chunks",
+                         task_id=task_id,
+                         chunk_count=len(unique_chunk_ids),
+                         error=str(e))
+            return {}
+
+    async def _convert_session(
+        self,
+        task: ImportTask,
+        session_id: str,
+        session_conversations: List[Any],
+        retrieval_chunks_map: Dict[str, Any],
+        conversion_config: Dict[str, Any]
+    ) -> Optional[TestCaseCreate]:
+        """将单个会话转换为测试用例创建请求，失败时记录检查点并返回None"""
+        task_id = task.task_id
+        try:
+            if not session_conversations:
+                logger.warning("No conversations found for session",
+                             task_id=task_id,
+                             session_id=session_id)
+                await self._record_session_result(task, session_id, False)
+                return None
+
+            # 只保留本会话引用的检索片段
+            session_chunks_map = {
+                chunk_id: retrieval_chunks_map[chunk_id]
+                for conv in session_conversations
+                for chunk_id in (conv.retrieval_chunk_ids or [])
+                if chunk_id in retrieval_chunks_map
+            }
+
+            # 获取会话的测试配置信息（如果可用）
+            session_test_config = None
+            try:
+                # 尝试从历史服务的demo data获取test_config
+                from app.services.demo_data import MOCK_HISTORY_DATA
+                for session in MOCK_HISTORY_DATA:
+                    if session.get("session_id") == session_id:
+                        session_test_config = session.get("test_config")
+                        break
+            except Exception as e:
+                logger.debug("Could not get test config from demo data",
+                           task_id=task_id,
+                           session_id=session_id,
+                           error=str(e))
+
+            # 每个会话使用独立的转换配置，设置正确的源会话ID和test_config
+            session_config = dict(conversion_config, source_session=session_id)
+            if session_test_config:
+                session_config["test_config"] = session_test_config
+
+            # 转换为测试用例
+            return await data_conversion_service.convert_session_to_test_case(
+                session_conversations,
+                session_chunks_map,
+                session_config
+            )
+
+        except Exception as e:
+            await self._record_session_result(task, session_id, False)
+            logger.error("Session conversion failed",
+                       task_id=task_id,
+                       session_id=session_id,
+                       error=str(e))
+            return None
+
+    async def _flush_test_cases(self, task: ImportTask, pending: List[tuple]):
+        """批量创建一批转换好的测试用例，并逐个提交会话检查点"""
+        task_id = task.task_id
+        session_ids = [session_id for session_id, _ in pending]
+        try:
+            results = await self.test_case_service.create_test_cases_bulk([
+                test_case_create for _, test_case_create in pending
+            ])
+        except Exception as e:
+            results = [e] * len(pending)
+
+        for session_id, result in zip(session_ids, results):
+            if isinstance(result, Exception):
+                logger.error("Session processing failed",
+                           task_id=task_id,
+                           session_id=session_id,
+                           error=str(result))
+
+        # 整批检查点在一个事务中提交
+        await self._record_session_results(task, [
+            (session_id, False, None) if isinstance(result, Exception) else (session_id, True, result.id)
+            for session_id, result in zip(session_ids, results)
+        ])
+
+        logger.info("Test cases flushed",
+                   task_id=task_id,
+                   batch_size=len(pending),
+                   created_count=sum(1 for result in results if not isinstance(result, Exception)))
+
     async def get_import_progress(self, task_id: str) -> Optional[ImportProgress]:
-        """获取导入进度"""
-        task = self.tasks.get(task_id)
+        """获取导入进度（从共享存储读取，任意worker进程均可查询）"""
+        task = await self._store_call(self.store.get_task, task_id)
         if not task:
             logger.warning("Import task not found", task_id=task_id)
             return None
@@ -400,6 +782,59 @@ class ImportService:
 
         return progress
 
+    async def watch_import_progress(
+        self,
+        task_id: str,
+        min_interval: float = 0.5,
+        poll_interval: float = 2.0
+    ) -> AsyncIterator[ImportProgress]:
+        """
+        订阅导入进度，进度变化时产出最新的ImportProgress，任务结束后停止
+
+        本进程执行的任务在进度变化时立即唤醒；其他进程执行的任务按poll_interval
+        从共享存储读取。两次推送至少间隔min_interval，期间的多次变化合并为一次。
+        """
+        last_progress = None
+        try:
+            while True:
+                # 先登记等待事件再读取，避免读取后、等待前的变化被遗漏
+                event = self._progress_events.setdefault(task_id, asyncio.Event())
+
+                task = await self._store_call(self.store.get_task, task_id)
+                if task is None:
+                    return
+
+                progress = ImportProgress(
+                    task_id=task.task_id,
+                    status=task.status,
+                    total=task.total,
+                    processed=task.processed,
+                    failed=task.failed,
+                    skipped=task.skipped,
+                    message=task.message,
+                    start_time=task.start_time,
+                    end_time=task.end_time
+                )
+                if progress != last_progress:
+                    yield progress
+                    last_progress = progress
+
+                if progress.status in (ImportTaskStatus.COMPLETED, ImportTaskStatus.FAILED):
+                    return
+
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+                # 合并短时间内的连续更新
+                await asyncio.sleep(min_interval)
+        finally:
+            # 本进程执行的任务结束时由任务移除等待事件；其他进程的任务或已结束的任务
+            # 没有通知方，订阅者退出时自行移除
+            if task_id not in self.tasks:
+                self._progress_events.pop(task_id, None)
+
     async def get_import_tasks(
         self,
         page: int = 1,
@@ -410,18 +845,8 @@ class ImportService:
                    page=page,
                    page_size=page_size)
 
-        # 排序任务（按创建时间倒序）
-        sorted_tasks = sorted(
-            self.tasks.values(),
-            key=lambda t: t.created_at,
-            reverse=True
-        )
-
-        # 分页
-        total = len(sorted_tasks)
-        start_idx = (page - 1) * page_size
-        end_idx = start_idx + page_size
-        page_tasks = sorted_tasks[start_idx:end_idx]
+        # 按创建时间倒序分页
+        page_tasks, total = await self._store_call(self.store.list_tasks, limit=page_size, offset=(page - 1) * page_size)
 
         # 转换为字典格式
         items = []
@@ -459,8 +884,12 @@ class ImportService:
         """删除导入任务"""
         logger.info("Deleting import task", task_id=task_id)
 
-        if task_id in self.tasks:
-            del self.tasks[task_id]
+        # 任务正在当前进程执行时先停止
+        runner = self._running.get(task_id)
+        if runner is not None:
+            runner.cancel()
+
+        if await self._store_call(self.store.delete_task, task_id):
             logger.info("Import task deleted", task_id=task_id)
             return True
         else:
@@ -0,0 +1,283 @@
+"""导入任务持久化存储（SQLite）"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from app.models.import_models import ImportTask, ImportTaskStatus
+from app.utils.logger import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS import_tasks (
+    task_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    session_ids TEXT NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    processed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    message TEXT,
+    start_time TEXT,
+    end_time TEXT,
+    created_at TEXT NOT NULL,
+    config TEXT,
+    lease_owner TEXT,
+    lease_expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_import_tasks_created_at ON import_tasks (created_at);
+CREATE INDEX IF NOT EXISTS idx_import_tasks_status ON import_tasks (status);
+
+CREATE TABLE IF NOT EXISTS import_task_sessions (
+    task_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    succeeded INTEGER NOT NULL,
+    test_case_id TEXT,
+    finished_at TEXT NOT NULL,
+    PRIMARY KEY (task_id, session_id)
+);
+"""
+
+# 未结束的任务状态
+ACTIVE_STATUSES = (ImportTaskStatus.PENDING.value, ImportTaskStatus.RUNNING.value)
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _to_iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+def _from_iso(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+class ImportTaskStore:
+    """
+    基于SQLite文件的导入任务存储
+
+    任务记录和逐会话检查点保存在同一个数据库中，多个worker进程共享同一文件。
+    租约（lease_owner + lease_expires_at）保证同一任务同一时间只由一个进程执行，
+    进程退出后租约过期，任务可被其他进程接管并从检查点继续。
+    """
+
+    def __init__(self, path: str):
+        """
+        初始化任务存储
+
+        Args:
+            path: SQLite数据库文件路径，":memory:" 表示仅进程内存储
+        """
+        self.path = path
+        if path != ":memory:":
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            # WAL允许其他进程在写入时并发读取进度
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+        logger.info("ImportTaskStore initialized", path=path)
+
+    def _execute(self, sql: str, params: Tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def _transaction(self, statements: List[Tuple[str, Tuple]]) -> List[sqlite3.Cursor]:
+        """在一个写事务中执行多条语句"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursors = [self._conn.execute(sql, params) for sql, params in statements]
+                self._conn.execute("COMMIT")
+                return cursors
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _row_to_task(row: sqlite3.Row) -> ImportTask:
+        return ImportTask(
+            task_id=row["task_id"],
+            session_ids=json.loads(row["session_ids"]),
+            status=ImportTaskStatus(row["status"]),
+            total=row["total"],
+            processed=row["processed"],
+            failed=row["failed"],
+            skipped=row["skipped"],
+            message=row["message"],
+            start_time=_from_iso(row["start_time"]),
+            end_time=_from_iso(row["end_time"]),
+            created_at=_from_iso(row["created_at"]),
+            config=json.loads(row["config"]) if row["config"] else None
+        )
+
+    # ------------------------------------------------------------------
+    # 任务记录
+    # ------------------------------------------------------------------
+
+    def create_task(self, task: ImportTask, lease_owner: Optional[str] = None, lease_seconds: float = 0):
+        """写入新任务，提供lease_owner时同时为创建者持有租约"""
+        lease_expires_at = time.time() + lease_seconds if lease_owner else None
+        self._execute(
+            "INSERT INTO import_tasks (task_id, status, session_ids, total, processed, failed, skipped, "
+            "message, start_time, end_time, created_at, config, lease_owner, lease_expires_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                task.task_id,
+                task.status.value,
+                json.dumps(task.session_ids),
+                task.total,
+                task.processed,
+                task.failed,
+                task.skipped,
+                task.message,
+                _to_iso(task.start_time),
+                _to_iso(task.end_time),
+                _to_iso(task.created_at),
+                json.dumps(task.config, default=_json_default, ensure_ascii=False) if task.config else None,
+                lease_owner,
+                lease_expires_at
+            )
+        )
+
+    def update_status(
+        self,
+        task_id: str,
+        status: ImportTaskStatus,
+        message: Optional[str] = None,
+        end_time: Optional[datetime] = None
+    ):
+        """更新任务状态，结束状态同时释放租约"""
+        release = status.value not in ACTIVE_STATUSES
+        self._execute(
+            "UPDATE import_tasks SET status = ?, message = COALESCE(?, message), "
+            "end_time = COALESCE(?, end_time)"
+            + (", lease_owner = NULL, lease_expires_at = NULL" if release else "")
+            + " WHERE task_id = ?",
+            (status.value, message, _to_iso(end_time), task_id)
+        )
+
+    def get_task(self, task_id: str) -> Optional[ImportTask]:
+        """根据ID读取任务"""
+        row = self._execute("SELECT * FROM import_tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return self._row_to_task(row) if row else None
+
+    def list_tasks(self, limit: int, offset: int) -> Tuple[List[ImportTask], int]:
+        """按创建时间倒序分页读取任务，返回 (任务列表, 总数)"""
+        total = self._execute("SELECT COUNT(*) FROM import_tasks").fetchone()[0]
+        rows = self._execute(
+            "SELECT * FROM import_tasks ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            (limit, offset)
+        ).fetchall()
+        return [self._row_to_task(row) for row in rows], total
+
+    def delete_task(self, task_id: str) -> bool:
+        """删除任务及其检查点"""
+        cursors = self._transaction([
+            ("DELETE FROM import_task_sessions WHERE task_id = ?", (task_id,)),
+            ("DELETE FROM import_tasks WHERE task_id = ?", (task_id,)),
+        ])
+        return cursors[1].rowcount > 0
+
+    # ------------------------------------------------------------------
+    # 会话检查点
+    # ------------------------------------------------------------------
+
+    def record_session(
+        self,
+        task_id: str,
+        session_id: str,
+        succeeded: bool,
+        test_case_id: Optional[str] = None
+    ) -> bool:
+        """
+        记录会话处理结果并在同一事务中更新任务计数
+
+        Returns:
+            False表示该会话此前已记录（重复执行），计数未变化
+        """
+        return self.record_sessions(task_id, [(session_id, succeeded, test_case_id)])[0]
+
+    def record_sessions(self, task_id: str, results: List[Tuple[str, bool, Optional[str]]]) -> List[bool]:
+        """
+        在一个事务中记录一批会话处理结果并更新任务计数
+
+        Args:
+            results: [(会话ID, 是否成功, 测试用例ID)]
+
+        Returns:
+            与results一一对应，False表示该会话此前已记录（重复执行），计数未变化
+        """
+        finished_at = datetime.now().isoformat()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                inserted = [
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO import_task_sessions "
+                        "(task_id, session_id, succeeded, test_case_id, finished_at) VALUES (?, ?, ?, ?, ?)",
+                        (task_id, session_id, int(succeeded), test_case_id, finished_at)
+                    ).rowcount > 0
+                    for session_id, succeeded, test_case_id in results
+                ]
+                processed = sum(1 for (_, succeeded, _), new in zip(results, inserted) if new and succeeded)
+                failed = sum(1 for (_, succeeded, _), new in zip(results, inserted) if new and not succeeded)
+                if processed or failed:
+                    self._conn.execute(
+                        "UPDATE import_tasks SET processed = processed + ?, failed = failed + ? WHERE task_id = ?",
+                        (processed, failed, task_id)
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return inserted
+
+    def finished_sessions(self, task_id: str) -> Set[str]:
+        """获取任务中已处理完成（成功或失败）的会话"""
+        rows = self._execute(
+            "SELECT session_id FROM import_task_sessions WHERE task_id = ?",
+            (task_id,)
+        ).fetchall()
+        return {row["session_id"] for row in rows}
+
+    # ------------------------------------------------------------------
+    # 租约
+    # ------------------------------------------------------------------
+
+    def acquire_lease(self, task_id: str, owner: str, lease_seconds: float) -> bool:
+        """获取或续期任务租约，租约被其他进程持有且未过期时返回False"""
+        now = time.time()
+        cursor = self._execute(
+            "UPDATE import_tasks SET lease_owner = ?, lease_expires_at = ? "
+            "WHERE task_id = ? AND status IN (?, ?) "
+            "AND (lease_owner IS NULL OR lease_owner = ? OR lease_expires_at < ?)",
+            (owner, now + lease_seconds, task_id, *ACTIVE_STATUSES, owner, now)
+        )
+        return cursor.rowcount > 0
+
+    def find_orphaned_tasks(self) -> List[str]:
+        """查找未结束且没有有效租约的任务（执行进程已退出）"""
+        rows = self._execute(
+            "SELECT task_id FROM import_tasks WHERE status IN (?, ?) "
+            "AND (lease_expires_at IS NULL OR lease_expires_at < ?) ORDER BY created_at",
+            (*ACTIVE_STATUSES, time.time())
+        ).fetchall()
+        return [row["task_id"] for row in rows]
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -3,27 +3,77 @@ import asyncio
 import random
 import uuid
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, AsyncIterator
+from typing import List, Dict, Any, Optional, AsyncIterator, Sequence, Tuple
+import numpy as np
 import pandas as pd
 
 from app.services.bigquery_service import (
     BigQueryService,
+    ChunkProjection,
     ConversationRow,
     RetrievalChunkRow,
     ConversationQueryRequest,
-    RetrievalChunkQueryRequest
+    RetrievalChunkQueryRequest,
+    SessionSummaryRow,
+    decode_conversation_cursor
 )
+from app.services.arrow_conversion import chunks_from_arrow, conversations_from_arrow, session_summaries_from_arrow
+from app.services.synthetic_data import (
+    chunk_references,
+    dataset_exists,
+    embedding_matrix,
+    keyword_positions,
+    load_dataset
+)
+from app.services.embedding_store import EmbeddingStore
+from app.services.session_sampler import session_priority
+from app.services.vector_index import SIMILARITY_IVF_THRESHOLD, VectorIndex
 from app.utils.logger import logger
+from app.utils.text_index import InvertedIndex
+
+# 参与过滤和排序的标量列（列式表中的列）
+CONVERSATION_FRAME_COLUMNS = [
+    "conversation_id", "session_id", "message_id", "message_type", "model_id",
+    "timestamp", "user_rating", "token_count", "processing_time_ms",
+]
+CHUNK_FRAME_COLUMNS = ["chunk_id", "document_id", "chunk_index", "similarity_score", "created_at", "updated_at"]
+
+def _frame_time(value: datetime) -> pd.Timestamp:
+    """将请求中的时间转换为列式表使用的UTC无时区时间，无时区的值视为UTC"""
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+    return timestamp
 
 class MockBigQueryService(BigQueryService):
     """Mock BigQuery服务实现"""
 
-    def __init__(self):
-        """初始化Mock BigQuery服务"""
-        logger.info("Initializing MockBigQueryService")
+    def __init__(self, stream_page_size: int = 1000, data_dir: Optional[str] = None):
+        """
+        初始化Mock BigQuery服务
+
+        Args:
+            stream_page_size: 流式查询默认每页行数
+            data_dir: 合成数据目录（scripts/generate_synthetic_data.py生成），存在时内存映射加载，
+                否则生成少量演示数据
+        """
+        logger.info("Initializing MockBigQueryService", data_dir=data_dir)
+        self.stream_page_size = stream_page_size
         self._conversations_data: List[ConversationRow] = []
         self._retrieval_chunks_data: List[RetrievalChunkRow] = []
-        self._initialize_data()
+        # 从数据文件加载时记录保存在内存映射的Arrow表中，按需转换为对象
+        self._conversations_table = None
+        self._chunks_table = None
+        self._chunk_row_table = None
+        # 片段向量集中存放在float32矩阵中，片段记录本身不携带embedding_vector
+        self._chunk_embeddings = EmbeddingStore()
+
+        if dataset_exists(data_dir):
+            self.load_dataset(data_dir)
+        else:
+            if data_dir:
+                logger.warning("Synthetic dataset not found, generating demo data", data_dir=data_dir)
+            self._initialize_data()
 
     def _initialize_data(self):
         """初始化模拟数据"""
@@ -35,12 +85,193 @@ class MockBigQueryService(BigQueryService):
         # 生成对话数据
         self._generate_conversations()
 
+        self._build_indexes()
+
         logger.info(
             "Mock data initialized",
             conversations_count=len(self._conversations_data),
             chunks_count=len(self._retrieval_chunks_data)
         )
 
+    def load_data(self, conversations: List[ConversationRow], chunks: List[RetrievalChunkRow]):
+        """替换为外部提供的数据集并重建索引，片段向量移入向量存储"""
+        embedded = [chunk for chunk in chunks if chunk.embedding_vector]
+        self._chunk_embeddings = EmbeddingStore.from_matrix(
+            [chunk.chunk_id for chunk in embedded],
+            np.asarray([chunk.embedding_vector for chunk in embedded], dtype=np.float32)
+        )
+        self._conversations_data = list(conversations)
+        self._retrieval_chunks_data = [
+            chunk.model_copy(update={"embedding_vector": None}) if chunk.embedding_vector else chunk
+            for chunk in chunks
+        ]
+        self._conversations_table = None
+        self._chunks_table = None
+        self._build_indexes()
+
+        logger.info(
+            "Mock data loaded",
+            conversations_count=len(self._conversations_data),
+            chunks_count=len(self._retrieval_chunks_data)
+        )
+
+    def load_dataset(self, directory: str):
+        """内存映射合成数据目录中的Arrow文件并重建索引"""
+        self._conversations_table, self._chunks_table = load_dataset(directory)
+        # 向量列直接映射为矩阵视图；记录转换时不再读取该列
+        positions, matrix = embedding_matrix(self._chunks_table)
+        chunk_ids = self._chunks_table.column("chunk_id").to_numpy(zero_copy_only=False)
+        self._chunk_embeddings = EmbeddingStore.from_matrix([str(chunk_id) for chunk_id in chunk_ids[positions]], matrix)
+        self._chunk_row_table = self._chunks_table.select(
+            [name for name in self._chunks_table.column_names if name != "embedding_vector"]
+        )
+        self._conversations_data = []
+        self._retrieval_chunks_data = []
+        self._build_indexes()
+
+        logger.info(
+            "Mock dataset loaded",
+            directory=directory,
+            conversations_count=self._conversations_table.num_rows,
+            chunks_count=self._chunks_table.num_rows
+        )
+
+    def _build_indexes(self):
+        """
+        构建列式表和索引
+
+        过滤和排序用到的标量列预先建成DataFrame（索引为记录在列表中的位置），查询只在
+        列上做向量化过滤，最后按位置取回当前页的原始记录；ID和会话走哈希索引，
+        关键词走倒排索引。
+        """
+        if self._conversations_table is not None:
+            conversations_frame = self._conversations_table.select(CONVERSATION_FRAME_COLUMNS).to_pandas()
+            chunks_frame = self._chunks_table.select(CHUNK_FRAME_COLUMNS).to_pandas()
+        else:
+            conversations_frame = pd.DataFrame({
+                column: [getattr(conv, column) for conv in self._conversations_data]
+                for column in CONVERSATION_FRAME_COLUMNS
+            }, columns=CONVERSATION_FRAME_COLUMNS)
+            chunks_frame = pd.DataFrame({
+                column: [getattr(chunk, column) for chunk in self._retrieval_chunks_data]
+                for column in CHUNK_FRAME_COLUMNS
+            }, columns=CHUNK_FRAME_COLUMNS)
+            chunks_frame["created_at"] = pd.to_datetime(chunks_frame["created_at"])
+            chunks_frame["updated_at"] = pd.to_datetime(chunks_frame["updated_at"])
+
+        # 时间列统一为UTC无时区时间，请求中的时间边界经_frame_time转换后比较
+        conversations_frame["timestamp"] = pd.to_datetime(conversations_frame["timestamp"], utc=True).dt.tz_localize(None)
+
+        # 未评分/无统计的记录按0参与过滤和排序
+        for column in ("user_rating", "token_count", "processing_time_ms"):
+            conversations_frame[column] = conversations_frame[column].fillna(0)
+        chunks_frame["similarity_score"] = chunks_frame["similarity_score"].fillna(0.0)
+        self._conversations_frame = conversations_frame
+        self._chunks_frame = chunks_frame
+
+        # ID哈希索引（pandas Index内部为哈希表）
+        self._conversation_ids = pd.Index(conversations_frame["conversation_id"])
+        self._chunk_ids = pd.Index(chunks_frame["chunk_id"])
+
+        # 会话 -> 按时间排序的记录位置
+        ordered = conversations_frame.sort_values(["session_id", "timestamp", "conversation_id"], kind="stable")
+        labels = ordered.index.to_numpy()
+        self._session_positions: Dict[str, np.ndarray] = {
+            str(session_id): labels[indices]
+            for session_id, indices in ordered.groupby("session_id", sort=False, observed=True).indices.items()
+        }
+
+        # 会话向量索引在首次相似检索时构建
+        self._session_vector_index: Optional[VectorIndex] = None
+
+        # 关键词倒排索引（文档ID为记录位置）；数据文件路径直接在Arrow列上做向量化匹配
+        self._conversation_text_index = None
+        self._chunk_text_index = None
+        if self._conversations_table is None:
+            self._conversation_text_index = InvertedIndex()
+            for position, conv in enumerate(self._conversations_data):
+                self._conversation_text_index.add(position, conv.content)
+            self._chunk_text_index = InvertedIndex()
+            for position, chunk in enumerate(self._retrieval_chunks_data):
+                self._chunk_text_index.add(position, chunk.content, chunk.title)
+
+    @staticmethod
+    def _position(index: pd.Index, key: str) -> Optional[int]:
+        """哈希索引查找，不存在时返回None"""
+        position = index.get_indexer([key])[0]
+        return int(position) if position >= 0 else None
+
+    def _conversation_rows(self, positions: Sequence[int]) -> List[ConversationRow]:
+        """按位置取回对话记录，Arrow表只转换被取出的行"""
+        if len(positions) == 0:
+            return []
+        if self._conversations_table is not None:
+            return conversations_from_arrow(self._conversations_table.take(np.asarray(positions, dtype=np.int64)))
+        return [self._conversations_data[position] for position in positions]
+
+    def _chunk_rows(self, positions: Sequence[int]) -> List[RetrievalChunkRow]:
+        """按位置取回检索片段"""
+        if len(positions) == 0:
+            return []
+        if self._chunks_table is not None:
+            return chunks_from_arrow(self._chunk_row_table.take(np.asarray(positions, dtype=np.int64)))
+        return [self._retrieval_chunks_data[position] for position in positions]
+
+    def _conversation_keyword_positions(self, keywords: str) -> Any:
+        if self._conversation_text_index is not None:
+            return self._conversation_text_index.search(keywords)
+        return keyword_positions(self._conversations_table, ["content"], keywords)
+
+    def _chunk_keyword_positions(self, keywords: str) -> Any:
+        if self._chunk_text_index is not None:
+            return self._chunk_text_index.search(keywords)
+        return keyword_positions(self._chunks_table, ["content", "title"], keywords)
+
+    def _build_session_vector_index(self) -> VectorIndex:
+        """
+        构建会话向量索引
+
+        会话向量为其对话引用的（去重后）片段embedding之和，归一化后与均值方向相同；
+        全部以数组运算完成，不逐条转换记录。
+        """
+        if self._conversations_table is not None:
+            conversation_rows, referenced_ids = chunk_references(self._conversations_table)
+        else:
+            references = [
+                (row, chunk_id)
+                for row, conv in enumerate(self._conversations_data)
+                for chunk_id in conv.retrieval_chunk_ids
+            ]
+            conversation_rows = np.array([row for row, _ in references], dtype=np.int64)
+            referenced_ids = [chunk_id for _, chunk_id in references]
+
+        store = self._chunk_embeddings
+        if len(store) == 0 or len(conversation_rows) == 0:
+            return VectorIndex([], np.empty((0, 0), dtype=np.float32))
+
+        # 引用的片段 -> 向量矩阵行号（无向量为-1）
+        matrix = store.matrix
+        vector_rows = store.rows(referenced_ids)
+
+        session_codes, session_ids = pd.factorize(self._conversations_frame["session_id"])
+        valid = vector_rows >= 0
+        pairs = np.unique(np.stack([session_codes[conversation_rows[valid]], vector_rows[valid]], axis=1), axis=0)
+
+        # pairs已按会话排序：分批取出向量，按会话分段求和，避免一次展开 引用数 x d 的矩阵
+        sums = np.zeros((len(session_ids), matrix.shape[1]), dtype=np.float32)
+        for start in range(0, len(pairs), 100000):
+            batch = pairs[start:start + 100000]
+            starts = np.flatnonzero(np.r_[True, batch[1:, 0] != batch[:-1, 0]])
+            sums[batch[starts, 0]] += np.add.reduceat(matrix[batch[:, 1]], starts, axis=0)
+
+        present = np.unique(pairs[:, 0])
+        index = VectorIndex([str(session_ids[code]) for code in present], sums[present])
+        if len(index) > SIMILARITY_IVF_THRESHOLD:
+            index.train_ivf()
+
+        logger.info("Session vector index built", sessions=len(index), dim=index.dim)
+        return index
+
     def _generate_retrieval_chunks(self):
         """生成检索片段数据"""
         # 预定义的文档和主题
@@ -140,7 +371,6 @@ class MockBigQueryService(BigQueryService):
                     chunk_index=i,
                     content=content,
                     title=f"{doc['title']} - 片段{i+1}",
-                    embedding_vector=[random.random() for _ in range(768)],  # 模拟向量
                     similarity_score=random.uniform(0.5, 1.0),
                     metadata={
                         "topic": topic,
@@ -166,6 +396,12 @@ class MockBigQueryService(BigQueryService):
                 )
                 self._retrieval_chunks_data.append(chunk)
 
+        # 模拟向量：整体生成一个float32矩阵，不为每个片段创建768个float对象
+        self._chunk_embeddings = EmbeddingStore.from_matrix(
+            [chunk.chunk_id for chunk in self._retrieval_chunks_data],
+            np.random.default_rng().random((len(self._retrieval_chunks_data), 768), dtype=np.float32)
+        )
+
     def _generate_conversations(self):
         """生成对话数据"""
         models = ["gpt-4o-mini", "gpt-4o", "claude-3-sonnet", "claude-3-haiku"]
@@ -362,103 +598,202 @@ class MockBigQueryService(BigQueryService):
         """查询对话记录"""
         logger.info("Querying conversations", request=request.dict())
 
-        # 转换为DataFrame便于过滤
-        df = pd.DataFrame([conv.dict() for conv in self._conversations_data])
+        df = self._filter_conversations(request)
+        results = self._rows_from_frame(self._paginate(df, request))
+
+        logger.info("Conversation query completed", results_count=len(results))
+        return results
+
+    async def query_conversations_with_total(self, request: ConversationQueryRequest) -> Tuple[List[ConversationRow], int]:
+        """查询对话记录及过滤后的总数（单次过滤）"""
+        logger.info("Querying conversations with total", request=request.dict())
+
+        df = self._filter_conversations(request)
+        total = len(df)
+        results = self._rows_from_frame(self._paginate(df, request))
+
+        logger.info("Conversation query with total completed", results_count=len(results), total_count=total)
+        return results, total
+
+    def _filter_conversations(self, request: ConversationQueryRequest, sort: bool = True) -> pd.DataFrame:
+        """按请求条件过滤并排序对话记录（不分页），返回预建列式表的切片，索引为记录位置；sort为False时不排序"""
+        df = self._conversations_frame
 
         if df.empty:
-            return []
+            return df
 
-        # 处理NaN值
-        df['user_rating'] = df['user_rating'].fillna(0)
-        df['token_count'] = df['token_count'].fillna(0)
-        df['processing_time_ms'] = df['processing_time_ms'].fillna(0)
+        # 会话和关键词条件先经由哈希索引/倒排索引缩小候选位置
+        if request.session_ids:
+            positions = [
+                self._session_positions[session_id]
+                for session_id in dict.fromkeys(request.session_ids)
+                if session_id in self._session_positions
+            ]
+            df = df.loc[np.concatenate(positions) if positions else []]
+        if request.keywords and request.keywords.strip():
+            df = df[df.index.isin(self._conversation_keyword_positions(request.keywords))]
 
         # 时间过滤
         if request.start_time:
-            df = df[df['timestamp'] >= pd.to_datetime(request.start_time)]
+            df = df[df['timestamp'] >= _frame_time(request.start_time)]
         if request.end_time:
-            df = df[df['timestamp'] <= pd.to_datetime(request.end_time)]
+            df = df[df['timestamp'] <= _frame_time(request.end_time)]
 
         # 模型过滤
         if request.model_ids:
             df = df[df['model_id'].isin(request.model_ids)]
 
-        # 会话过滤
-        if request.session_ids:
-            df = df[df['session_id'].isin(request.session_ids)]
-
         # 消息类型过滤
         if request.message_types:
             df = df[df['message_type'].isin(request.message_types)]
 
-        # 关键词搜索
-        if request.keywords and request.keywords.strip():
-            keywords = request.keywords.lower()
-            mask = df['content'].str.lower().str.contains(keywords, na=False)
-            df = df[mask]
-
-        # 评分过滤（只对assistant消息有效）
+        # 评分过滤（未评分记为0）
         if request.min_rating is not None:
-            df = df[(df['user_rating'] >= request.min_rating) | (df['user_rating'].isna())]
+            df = df[df['user_rating'] >= request.min_rating]
         if request.max_rating is not None:
-            df = df[(df['user_rating'] <= request.max_rating) | (df['user_rating'].isna())]
+            df = df[df['user_rating'] <= request.max_rating]
 
-        # 排序
-        if request.order_by in df.columns:
-            ascending = request.order_direction == "asc"
-            df = df.sort_values(by=request.order_by, ascending=ascending)
-
-        # 分页
-        df = df.iloc[request.offset:request.offset + request.limit]
+        # 会话抽样：与抽样器使用相同的会话优先级，保留优先级低于比例的会话
+        if request.session_sample_rate is not None:
+            kept = [
+                session_id for session_id in df['session_id'].unique()
+                if session_priority(session_id, request.session_sample_seed) < request.session_sample_rate
+            ]
+            df = df[df['session_id'].isin(kept)]
 
-        # 转换回ConversationRow对象
-        results = []
-        for _, row in df.iterrows():
-            # 将NaN的user_rating转换为None
-            if pd.isna(row.get('user_rating')) or row.get('user_rating') == 0:
-                row = row.copy()
-                row['user_rating'] = None
+        # 排序（conversation_id作为同一时间戳内的稳定次序）
+        if sort and request.order_by in df.columns:
+            ascending = request.order_direction == "asc"
+            df = df.sort_values(by=[request.order_by, 'conversation_id'], ascending=ascending)
+
+        return df
+
+    @staticmethod
+    def _paginate(
+        df: pd.DataFrame,
+        request: ConversationQueryRequest,
+        time_column: str = "timestamp",
+        id_column: str = "conversation_id"
+    ) -> pd.DataFrame:
+        """分页：设置游标时从游标 (time_column, id_column) 之后取limit条，否则按offset切片"""
+        if not request.cursor:
+            return df.iloc[request.offset:request.offset + request.limit]
+
+        if request.order_by != "timestamp":
+            raise ValueError("Cursor pagination requires order_by='timestamp'")
+        if df.empty:
+            return df
 
-            results.append(ConversationRow(**row.to_dict()))
+        cursor_timestamp, cursor_id = decode_conversation_cursor(request.cursor)
+        cursor_timestamp = _frame_time(cursor_timestamp)
+        if request.order_direction == "asc":
+            mask = (df[time_column] > cursor_timestamp) | (
+                (df[time_column] == cursor_timestamp) & (df[id_column] > cursor_id)
+            )
+        else:
+            mask = (df[time_column] < cursor_timestamp) | (
+                (df[time_column] == cursor_timestamp) & (df[id_column] < cursor_id)
+            )
+        return df[mask].iloc[:request.limit]
 
-        logger.info("Conversation query completed", results_count=len(results))
-        return results
+    def _rows_from_frame(self, df: pd.DataFrame) -> List[ConversationRow]:
+        """按切片中的位置取回ConversationRow，只物化当前页"""
+        return self._conversation_rows(df.index.to_numpy())
 
     async def count_conversations(self, request: ConversationQueryRequest) -> int:
-        """统计对话记录数量"""
-        # 重用查询逻辑，但不应用分页
-        count_request = request.copy()
-        count_request.offset = 0
-        count_request.limit = 1000000  # 设置一个很大的限制
-
-        results = await self.query_conversations(count_request)
-        return len(results)
+        """统计对话记录数量（只计算过滤结果的行数，不构建记录对象）"""
+        return len(self._filter_conversations(request, sort=False))
+
+    async def query_sessions_with_total(self, request: ConversationQueryRequest) -> Tuple[List[SessionSummaryRow], int]:
+        """
+        按会话分页查询
+
+        过滤、按会话去重、排序和计数都在列式表上完成；只有当前页会话的消息被取回，
+        用于汇总提问、回复和片段ID。
+        """
+        logger.info("Querying sessions with total", request=request.dict())
+
+        sessions = self._filter_sessions(request)
+        total = len(sessions)
+        page = self._paginate(sessions, request, time_column="created_at", id_column="session_id")
+        results = self._session_summaries(page["session_id"].tolist())
+
+        logger.info("Session query with total completed", results_count=len(results), total_count=total)
+        return results, total
+
+    def _filter_sessions(self, request: ConversationQueryRequest) -> pd.DataFrame:
+        """命中过滤条件的会话及其起始时间（会话索引已按时间排序，首条记录即起始消息），按起始时间排序"""
+        matched = self._filter_conversations(request, sort=False)
+        session_ids = [str(session_id) for session_id in matched["session_id"].unique()]
+        first_positions = np.fromiter(
+            (self._session_positions[session_id][0] for session_id in session_ids),
+            dtype=np.int64,
+            count=len(session_ids)
+        )
+        sessions = pd.DataFrame({
+            "session_id": session_ids,
+            "created_at": self._conversations_frame["timestamp"].to_numpy()[first_positions],
+        })
+        ascending = request.order_direction == "asc"
+        return sessions.sort_values(by=["created_at", "session_id"], ascending=ascending)
+
+    def _session_summaries(self, session_ids: List[str]) -> List[SessionSummaryRow]:
+        """汇总会话：一次取回全部会话的消息，再按会话切分"""
+        positions = [self._session_positions[session_id] for session_id in session_ids]
+        if self._conversations_table is not None:
+            # Arrow表在列上按会话分组，只为每个会话构建一个汇总对象
+            return session_summaries_from_arrow(
+                self._conversations_table.take(np.concatenate(positions) if positions else np.empty(0, dtype=np.int64)),
+                session_ids
+            )
+        rows = self._conversation_rows(np.concatenate(positions) if positions else [])
+
+        summaries = []
+        start = 0
+        for session_id, session_positions in zip(session_ids, positions):
+            messages = rows[start:start + len(session_positions)]
+            start += len(session_positions)
+
+            user_messages = [conv for conv in messages if conv.message_type == "user"]
+            ai_messages = [conv for conv in messages if conv.message_type == "assistant"]
+            last_response = ai_messages[-1] if ai_messages else None
+            summaries.append(SessionSummaryRow(
+                session_id=session_id,
+                model_id=last_response.model_id if last_response else messages[0].model_id,
+                user_query=user_messages[0].content if user_messages else "",
+                ai_response=last_response.content if last_response else "",
+                user_rating=last_response.user_rating if last_response else None,
+                created_at=messages[0].timestamp,
+                last_message_at=messages[-1].timestamp,
+                message_count=len(messages),
+                retrieval_chunk_ids=list(dict.fromkeys(
+                    chunk_id for conv in messages for chunk_id in conv.retrieval_chunk_ids
+                ))
+            ))
+        return summaries
 
     async def get_conversation_by_id(self, conversation_id: str) -> Optional[ConversationRow]:
         """根据ID获取对话记录"""
-        for conv in self._conversations_data:
-            if conv.conversation_id == conversation_id:
-                return conv
-        return None
+        position = self._position(self._conversation_ids, conversation_id)
+        return self._conversation_rows([position])[0] if position is not None else None
 
     async def get_session_conversations(self, session_id: str) -> List[ConversationRow]:
         """获取会话的所有对话"""
-        return [
-            conv for conv in self._conversations_data
-            if conv.session_id == session_id
-        ]
+        return self._conversation_rows(self._session_positions.get(session_id, []))
 
-    async def query_retrieval_chunks(self, request: RetrievalChunkQueryRequest) -> List[RetrievalChunkRow]:
-        """查询检索片段"""
-        logger.info("Querying retrieval chunks", request=request.dict())
+    async def get_sessions_conversations(self, session_ids: List[str]) -> Dict[str, List[ConversationRow]]:
+        """批量获取多个会话的对话：按会话索引直接取出（索引内已按时间排序）"""
+        return {
+            session_id: self._conversation_rows(self._session_positions.get(session_id, []))
+            for session_id in session_ids
+        }
 
-        df = pd.DataFrame([chunk.dict() for chunk in self._retrieval_chunks_data])
+    def _filter_chunks(self, request: RetrievalChunkQueryRequest) -> pd.DataFrame:
+        """按请求条件过滤并排序检索片段（不分页），索引为记录位置"""
+        df = self._chunks_frame
 
         if df.empty:
-            return []
-
-        # 处理NaN值
-        df['similarity_score'] = df['similarity_score'].fillna(0.0)
+            return df
 
         # 文档过滤
         if request.document_ids:
@@ -466,14 +801,9 @@ class MockBigQueryService(BigQueryService):
 
         # 关键词搜索
         if request.keywords and request.keywords.strip():
-            keywords = request.keywords.lower()
-            mask = (
-                df['content'].str.lower().str.contains(keywords, na=False) |
-                df['title'].str.lower().str.contains(keywords, na=False)
-            )
-            df = df[mask]
+            df = df[df.index.isin(self._chunk_keyword_positions(request.keywords))]
 
-        # 相似度过滤
+        # 相似度过滤（无分数记为0）
         if request.min_similarity is not None:
             df = df[df['similarity_score'] >= request.min_similarity]
         if request.max_similarity is not None:
@@ -482,51 +812,69 @@ class MockBigQueryService(BigQueryService):
         # 排序
         if request.order_by in df.columns:
             ascending = request.order_direction == "asc"
-            df = df.sort_values(by=request.order_by, ascending=ascending)
+            df = df.sort_values(by=request.order_by, ascending=ascending, kind="stable")
 
-        # 分页
-        df = df.iloc[request.offset:request.offset + request.limit]
+        return df
 
-        # 转换回RetrievalChunkRow对象
-        results = []
-        for _, row in df.iterrows():
-            # 处理None值
-            if pd.isna(row.get('similarity_score')):
-                row = row.copy()
-                row['similarity_score'] = None
+    async def query_retrieval_chunks(self, request: RetrievalChunkQueryRequest) -> List[RetrievalChunkRow]:
+        """查询检索片段"""
+        logger.info("Querying retrieval chunks", request=request.dict())
 
-            results.append(RetrievalChunkRow(**row.to_dict()))
+        df = self._filter_chunks(request)
+
+        # 分页后按位置取回原始记录并应用投影
+        df = df.iloc[request.offset:request.offset + request.limit]
+        results = [
+            self._project_chunk(chunk, request.projection)
+            for chunk in self._chunk_rows(df.index.to_numpy())
+        ]
 
         logger.info("Retrieval chunks query completed", results_count=len(results))
         return results
 
     async def count_retrieval_chunks(self, request: RetrievalChunkQueryRequest) -> int:
-        """统计检索片段数量"""
-        count_request = request.copy()
-        count_request.offset = 0
-        count_request.limit = 1000000
-
-        results = await self.query_retrieval_chunks(count_request)
-        return len(results)
-
-    async def get_chunk_by_id(self, chunk_id: str) -> Optional[RetrievalChunkRow]:
+        """统计检索片段数量（不构建记录对象）"""
+        return len(self._filter_chunks(request))
+
+    def _project_chunk(self, chunk: RetrievalChunkRow, projection: ChunkProjection) -> RetrievalChunkRow:
+        """按投影返回检索片段：记录本身不含向量，完整投影时才从向量存储转换为列表"""
+        if projection == ChunkProjection.LIGHT:
+            return chunk
+        vector = self._chunk_embeddings.get(chunk.chunk_id)
+        if vector is None:
+            return chunk
+        return chunk.model_copy(update={"embedding_vector": vector.tolist()})
+
+    async def get_chunk_embeddings(self, chunk_ids: List[str]) -> Tuple[List[str], np.ndarray]:
+        """批量获取片段向量（直接从向量存储取行）"""
+        return self._chunk_embeddings.take(dict.fromkeys(chunk_ids))
+
+    async def get_chunk_by_id(
+        self,
+        chunk_id: str,
+        projection: ChunkProjection = ChunkProjection.LIGHT
+    ) -> Optional[RetrievalChunkRow]:
         """根据ID获取检索片段"""
-        for chunk in self._retrieval_chunks_data:
-            if chunk.chunk_id == chunk_id:
-                return chunk
-        return None
-
-    async def get_chunks_by_ids(self, chunk_ids: List[str]) -> List[RetrievalChunkRow]:
+        position = self._position(self._chunk_ids, chunk_id)
+        if position is None:
+            return None
+        return self._project_chunk(self._chunk_rows([position])[0], projection)
+
+    async def get_chunks_by_ids(
+        self,
+        chunk_ids: List[str],
+        projection: ChunkProjection = ChunkProjection.LIGHT
+    ) -> List[RetrievalChunkRow]:
         """根据ID列表批量获取检索片段"""
+        positions = self._chunk_ids.get_indexer(list(dict.fromkeys(chunk_ids)))
         return [
-            chunk for chunk in self._retrieval_chunks_data
-            if chunk.chunk_id in chunk_ids
+            self._project_chunk(chunk, projection)
+            for chunk in self._chunk_rows(positions[positions >= 0])
         ]
 
     async def get_available_model_ids(self) -> List[str]:
         """获取所有可用的模型ID"""
-        model_ids = list(set(conv.model_id for conv in self._conversations_data))
-        return sorted(model_ids)
+        return sorted(str(model_id) for model_id in self._conversations_frame['model_id'].dropna().unique())
 
     async def get_session_statistics(self, session_id: str) -> Dict[str, Any]:
         """获取会话统计信息"""
@@ -554,26 +902,33 @@ class MockBigQueryService(BigQueryService):
             "last_message_time": max(conv.timestamp for conv in session_convs)
         }
 
-    async def stream_conversations(self, request: ConversationQueryRequest) -> AsyncIterator[ConversationRow]:
-        """流式查询对话记录"""
-        # 简单实现：批量返回结果
-        batch_size = 50
-        offset = 0
-
-        while True:
-            batch_request = request.copy()
-            batch_request.offset = offset
-            batch_request.limit = batch_size
+    async def find_similar_sessions(self, session_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """查找语义相似的会话"""
+        if self._session_vector_index is None:
+            self._session_vector_index = self._build_session_vector_index()
 
-            batch = await self.query_conversations(batch_request)
+        index = self._session_vector_index
+        vector = index.vector(session_id)
+        if vector is None:
+            raise ValueError(f"Session has no embeddings: {session_id}")
 
-            if not batch:
-                break
+        return [
+            {"session_id": similar_id, "score": score}
+            for similar_id, score in index.search(vector, k=limit, exclude=[session_id])
+        ]
 
-            for conv in batch:
+    async def stream_conversations(
+        self,
+        request: ConversationQueryRequest,
+        page_size: Optional[int] = None
+    ) -> AsyncIterator[ConversationRow]:
+        """流式查询对话记录：只过滤一次，再按页逐批转换"""
+        page_size = page_size or self.stream_page_size
+        df = self._paginate(self._filter_conversations(request), request)
+
+        for start in range(0, len(df), page_size):
+            for conv in self._rows_from_frame(df.iloc[start:start + page_size]):
                 yield conv
 
-            offset += batch_size
-
-            # 模拟网络延迟
-            await asyncio.sleep(0.01)
\ No newline at end of file
+            # 每页之间让出事件循环
+            await asyncio.sleep(0)
\ No newline at end of file
@@ -0,0 +1,116 @@
+"""查询结果缓存（TTL + 按字节LRU淘汰）"""
+import pickle
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from app.utils.logger import logger
+
+def estimate_size(value: Any) -> int:
+    """估算缓存值占用的字节数"""
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+class QueryCache:
+    """带TTL和最大字节数限制的LRU缓存"""
+
+    def __init__(
+        self,
+        ttl_seconds: float = 300,
+        max_bytes: int = 64 * 1024 * 1024,
+        sizeof: Callable[[Any], int] = estimate_size,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        初始化缓存
+
+        Args:
+            ttl_seconds: 条目存活时间（秒）
+            max_bytes: 所有条目的最大总字节数，超出时淘汰最久未使用的条目
+            sizeof: 计算条目大小的函数
+            clock: 单调时钟，便于替换
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._clock = clock
+
+        # key -> (过期时间, 字节数, 值)
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._current_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """读取缓存，返回 (是否命中, 值)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+
+        expires_at, _, value = entry
+        if expires_at <= self._clock():
+            self._remove(key)
+            self.misses += 1
+            return False, None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, value
+
+    def set(self, key: Hashable, value: Any):
+        """写入缓存，超过字节上限时按LRU顺序淘汰"""
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            # 单个条目超过上限时不缓存
+            logger.debug("Query cache entry too large, skipped", size=size, max_bytes=self.max_bytes)
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = (self._clock() + self.ttl_seconds, size, value)
+        self._current_bytes += size
+
+        while self._current_bytes > self.max_bytes and self._entries:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """失效缓存条目，predicate为空时清空全部，返回失效条目数"""
+        if predicate is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            self._current_bytes = 0
+        else:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+            removed = len(keys)
+
+        logger.info("Query cache invalidated", removed_count=removed)
+        return removed
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self._current_bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "current_bytes": self._current_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -1,24 +1,126 @@
 """真实BigQuery服务实现"""
 import asyncio
-from typing import List, Dict, Any, Optional, AsyncIterator
-from datetime import datetime
+import json
+import time
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
+from datetime import date, datetime
 from google.cloud import bigquery
 from google.oauth2 import service_account
+import numpy as np
 import pandas as pd
 
+try:
+    from google.cloud import bigquery_storage
+except ImportError:  # 未安装时Arrow结果通过REST分页下载
+    bigquery_storage = None
+
 from app.services.bigquery_service import (
     BigQueryService,
+    ChunkProjection,
     ConversationRow,
     RetrievalChunkRow,
     ConversationQueryRequest,
-    RetrievalChunkQueryRequest
+    RetrievalChunkQueryRequest,
+    SessionSummaryRow,
+    decode_conversation_cursor
 )
+from app.services.bigquery_executor import BigQueryExecutor
+from app.services.vector_index import SIMILARITY_IVF_THRESHOLD, VectorIndex
+from app.services.arrow_conversion import ARROW_AVAILABLE, arrow_total_count, conversations_from_arrow
 from app.utils.logger import logger
+from app.utils.text_index import parse_query
+
+# 对话表查询列
+CONVERSATION_COLUMNS = [
+    "conversation_id",
+    "session_id",
+    "message_id",
+    "message_type",
+    "content",
+    "model_id",
+    "timestamp",
+    "metadata",
+    "user_rating",
+    "feedback_text",
+    "token_count",
+    "processing_time_ms",
+    "retrieval_chunk_ids",
+]
+
+# 检索片段轻量投影列（不含embedding_vector）
+CHUNK_LIGHT_COLUMNS = [
+    "chunk_id",
+    "document_id",
+    "chunk_index",
+    "content",
+    "title",
+    "similarity_score",
+    "metadata",
+    "created_at",
+    "updated_at",
+]
+CHUNK_FULL_COLUMNS = CHUNK_LIGHT_COLUMNS + ["embedding_vector"]
+
+def chunk_columns(projection: ChunkProjection) -> str:
+    """返回检索片段投影对应的SELECT列"""
+    columns = CHUNK_FULL_COLUMNS if projection == ChunkProjection.FULL else CHUNK_LIGHT_COLUMNS
+    return ", ".join(columns)
+
+# 批量会话查询每个作业包含的最大会话数，避免数组参数过大
+SESSION_BATCH_SIZE = 5000
+
+# 排序列无法参数化，只允许白名单中的列
+CONVERSATION_ORDER_COLUMNS = {
+    "timestamp", "conversation_id", "session_id", "message_id",
+    "message_type", "model_id", "user_rating", "token_count", "processing_time_ms",
+}
+CHUNK_ORDER_COLUMNS = {
+    "created_at", "updated_at", "chunk_id", "document_id", "chunk_index", "similarity_score",
+}
+
+def _scalar_type(value: Any) -> str:
+    """推断查询参数的BigQuery类型"""
+    # bool是int的子类，需先判断
+    if isinstance(value, bool):
+        return "BOOL"
+    if isinstance(value, int):
+        return "INT64"
+    if isinstance(value, float):
+        return "FLOAT64"
+    if isinstance(value, datetime):
+        return "TIMESTAMP"
+    if isinstance(value, date):
+        return "DATE"
+    return "STRING"
+
+def build_query_parameters(params: Dict[str, Any]) -> List[Any]:
+    """将参数字典转换为BigQuery查询参数列表"""
+    query_parameters = []
+    for name, value in params.items():
+        if isinstance(value, (list, tuple, set)):
+            values = list(value)
+            element_type = _scalar_type(values[0]) if values else "STRING"
+            query_parameters.append(bigquery.ArrayQueryParameter(name, element_type, values))
+        else:
+            query_parameters.append(bigquery.ScalarQueryParameter(name, _scalar_type(value), value))
+    return query_parameters
 
 class RealBigQueryService(BigQueryService):
     """真实BigQuery服务实现"""
 
-    def __init__(self, project_id: str, dataset_id: str, table_id: str, credentials_path: Optional[str] = None):
+    def __init__(
+        self,
+        project_id: str,
+        dataset_id: str,
+        table_id: str,
+        credentials_path: Optional[str] = None,
+        max_concurrent_queries: int = 8,
+        fetch_mode: str = "arrow",
+        stream_page_size: int = 1000,
+        stream_prefetch_pages: int = 2,
+        use_search_index: bool = False,
+        similarity_index_ttl_seconds: float = 3600
+    ):
         """
         初始化真实BigQuery服务
 
@@ -27,113 +129,87 @@ class RealBigQueryService(BigQueryService):
             dataset_id: BigQuery数据集ID
             table_id: BigQuery表ID
             credentials_path: 服务账号凭证文件路径，为None时使用应用默认凭证
+            max_concurrent_queries: 同时在线程池中运行的最大BigQuery作业数
+            fetch_mode: 对话结果下载方式，"arrow" 按列批量下载和转换，"rows" 逐行转换
+            stream_page_size: 流式查询默认每页行数
+            stream_prefetch_pages: 流式查询在后台预取的最大页数
+            use_search_index: 关键词搜索使用SEARCH函数（需在content/title上建立搜索索引），否则逐词LIKE
+            similarity_index_ttl_seconds: 相似会话检索的会话向量索引刷新周期
         """
         self.project_id = project_id
         self.dataset_id = dataset_id
         self.conversations_table = f"{project_id}.{dataset_id}.{table_id}"
         self.retrieval_chunks_table = f"{project_id}.{dataset_id}.retrieval_chunks"
+        self.stream_page_size = stream_page_size
+        self.stream_prefetch_pages = stream_prefetch_pages
+        self.use_search_index = use_search_index
+        self.similarity_index_ttl_seconds = similarity_index_ttl_seconds
+
+        # 会话向量索引：按TTL整体重建，过期后后台刷新，刷新期间继续使用旧索引
+        self._session_index: Optional[VectorIndex] = None
+        self._session_index_built_at = 0.0
+        self._session_index_lock: Optional[asyncio.Lock] = None
+        self._session_index_refresh: Optional[asyncio.Task] = None
 
         # 初始化BigQuery客户端
+        credentials = None
         if credentials_path:
             credentials = service_account.Credentials.from_service_account_file(credentials_path)
             self.client = bigquery.Client(project=project_id, credentials=credentials)
         else:
             self.client = bigquery.Client(project=project_id)
 
+        # Arrow快速路径：需要pyarrow，安装了bigquery-storage时经由Storage Read API下载
+        self.use_arrow = fetch_mode == "arrow" and ARROW_AVAILABLE
+        if fetch_mode == "arrow" and not ARROW_AVAILABLE:
+            logger.warning("pyarrow not installed, falling back to row fetch mode")
+        self._bqstorage_client = None
+        if self.use_arrow and bigquery_storage is not None:
+            self._bqstorage_client = bigquery_storage.BigQueryReadClient(credentials=credentials)
+
+        # 所有作业都经由执行器在事件循环之外运行
+        self._executor = BigQueryExecutor(self.client, max_concurrency=max_concurrent_queries)
+
         logger.info(
             "RealBigQueryService initialized",
             project_id=project_id,
             dataset_id=dataset_id,
+            max_concurrent_queries=max_concurrent_queries,
+            use_arrow=self.use_arrow,
+            use_storage_api=self._bqstorage_client is not None,
+            use_search_index=use_search_index,
             conversations_table=self.conversations_table,
             retrieval_chunks_table=self.retrieval_chunks_table
         )
 
-    async def test_connection(self) -> bool:
-        """测试连接状态"""
-        try:
-            # 执行简单查询测试连接
-            query = f"SELECT 1 as test FROM `{self.conversations_table}` LIMIT 1"
-            query_job = self.client.query(query)
-            results = list(query_job.result(timeout=10))
-
-            logger.info("BigQuery connection test successful")
-            return True
-        except Exception as e:
-            logger.error("BigQuery connection test failed", error=str(e))
-            return False
+    # ------------------------------------------------------------------
+    # 参数化查询构建
+    # ------------------------------------------------------------------
 
-    async def query_conversations(self, request: ConversationQueryRequest) -> List[ConversationRow]:
-        """查询对话记录"""
-        logger.info("Querying conversations from BigQuery", request=request.dict())
-
-        # 构建SQL查询
-        query = self._build_conversations_query(request)
+    @staticmethod
+    def _job_config(params: Dict[str, Any]) -> Any:
+        """构建绑定参数的作业配置；SQL文本只随过滤条件的组合变化，可命中BigQuery结果缓存"""
+        return bigquery.QueryJobConfig(
+            query_parameters=build_query_parameters(params),
+            use_query_cache=True
+        )
 
-        try:
-            # 执行查询
-            query_job = self.client.query(query)
-            results = query_job.result(timeout=30)
-
-            # 转换结果
-            conversations = []
-            for row in results:
-                # 解析retrieval_chunk_ids（假设存储为JSON字符串）
-                retrieval_chunk_ids = row.get("retrieval_chunk_ids", [])
-                if isinstance(retrieval_chunk_ids, str):
-                    import json
-                    try:
-                        retrieval_chunk_ids = json.loads(retrieval_chunk_ids)
-                    except json.JSONDecodeError:
-                        retrieval_chunk_ids = []
-
-                conversation = ConversationRow(
-                    conversation_id=row["conversation_id"],
-                    session_id=row["session_id"],
-                    message_id=row["message_id"],
-                    message_type=row["message_type"],
-                    content=row["content"],
-                    model_id=row["model_id"],
-                    timestamp=row["timestamp"],
-                    metadata=dict(row.get("metadata", {})),
-                    user_rating=row.get("user_rating"),
-                    feedback_text=row.get("feedback_text"),
-                    token_count=row.get("token_count"),
-                    processing_time_ms=row.get("processing_time_ms"),
-                    retrieval_chunk_ids=retrieval_chunk_ids
-                )
-                conversations.append(conversation)
+    async def _run_query(self, query: str, params: Dict[str, Any], timeout: float = 30) -> List[Any]:
+        """执行参数化查询"""
+        return await self._executor.query(query, job_config=self._job_config(params), timeout=timeout)
 
-            logger.info("BigQuery conversation query completed", results_count=len(conversations))
-            return conversations
+    @staticmethod
+    def _where_clause(conditions: List[str]) -> str:
+        return ("WHERE " + " AND ".join(conditions)) if conditions else ""
 
-        except Exception as e:
-            logger.error("BigQuery conversation query failed", error=str(e), query=query)
-            raise
+    @staticmethod
+    def _order_direction(direction: str) -> str:
+        return "ASC" if direction == "asc" else "DESC"
 
-    def _build_conversations_query(self, request: ConversationQueryRequest) -> str:
-        """构建对话查询SQL"""
+    def _conversation_filters(self, request: ConversationQueryRequest) -> Tuple[List[str], Dict[str, Any]]:
+        """构建对话过滤条件及参数（不含游标和分页），条件顺序固定以保持SQL文本稳定"""
         conditions = []
-        params = {}
-
-        # 基础查询
-        query = f"""
-        SELECT
-            conversation_id,
-            session_id,
-            message_id,
-            message_type,
-            content,
-            model_id,
-            timestamp,
-            metadata,
-            user_rating,
-            feedback_text,
-            token_count,
-            processing_time_ms,
-            retrieval_chunk_ids
-        FROM `{self.conversations_table}`
-        WHERE 1=1
-        """
+        params: Dict[str, Any] = {}
 
         # 时间范围过滤
         if request.start_time:
@@ -147,22 +223,21 @@ class RealBigQueryService(BigQueryService):
         # 模型过滤
         if request.model_ids:
             conditions.append("model_id IN UNNEST(@model_ids)")
-            params["model_ids"] = request.model_ids
+            params["model_ids"] = list(request.model_ids)
 
         # 会话过滤
         if request.session_ids:
             conditions.append("session_id IN UNNEST(@session_ids)")
-            params["session_ids"] = request.session_ids
+            params["session_ids"] = list(request.session_ids)
 
         # 消息类型过滤
         if request.message_types:
             conditions.append("message_type IN UNNEST(@message_types)")
-            params["message_types"] = request.message_types
+            params["message_types"] = list(request.message_types)
 
         # 关键词搜索
         if request.keywords and request.keywords.strip():
-            conditions.append("LOWER(content) LIKE LOWER(@keywords)")
-            params["keywords"] = f"%{request.keywords}%"
+            conditions.extend(self._keyword_conditions(["content"], request.keywords, params))
 
         # 评分过滤
         if request.min_rating is not None:
@@ -173,72 +248,424 @@ class RealBigQueryService(BigQueryService):
             conditions.append("user_rating <= @max_rating")
             params["max_rating"] = request.max_rating
 
-        # 添加条件到查询
-        if conditions:
-            query += " AND " + " AND ".join(conditions)
-
-        # 排序
-        order_direction = "ASC" if request.order_direction == "asc" else "DESC"
-        query += f" ORDER BY {request.order_by} {order_direction}"
+        # 会话抽样：哈希谓词在扫描时过滤，保留的会话均匀分布在整个时间范围内
+        if request.session_sample_rate is not None:
+            conditions.append(
+                "MOD(ABS(FARM_FINGERPRINT(CONCAT(@session_sample_seed, session_id))), 1000000) "
+                "< @session_sample_threshold"
+            )
+            params["session_sample_seed"] = f"{request.session_sample_seed}:"
+            params["session_sample_threshold"] = int(request.session_sample_rate * 1000000)
+
+        return conditions, params
+
+    def _build_conversations_query(
+        self,
+        request: ConversationQueryRequest,
+        include_total: bool = False
+    ) -> Tuple[str, Dict[str, Any]]:
+        """构建对话查询SQL及参数"""
+        if request.order_by not in CONVERSATION_ORDER_COLUMNS:
+            raise ValueError(f"Unsupported order_by column: {request.order_by}")
+
+        conditions, params = self._conversation_filters(request)
+        order_direction = self._order_direction(request.order_direction)
+        offset = request.offset
+
+        # 游标分页：从上一页最后一条记录之后继续扫描
+        if request.cursor:
+            if request.order_by != "timestamp":
+                raise ValueError("Cursor pagination requires order_by='timestamp'")
+            cursor_timestamp, cursor_conversation_id = decode_conversation_cursor(request.cursor)
+            comparator = ">" if order_direction == "ASC" else "<"
+            conditions.append(
+                f"(timestamp {comparator} @cursor_timestamp OR"
+                f" (timestamp = @cursor_timestamp AND conversation_id {comparator} @cursor_conversation_id))"
+            )
+            params["cursor_timestamp"] = cursor_timestamp
+            params["cursor_conversation_id"] = cursor_conversation_id
+            offset = 0
+
+        columns = list(CONVERSATION_COLUMNS)
+        if include_total:
+            # 窗口计数在LIMIT之前计算，返回过滤后的总行数
+            columns.append("COUNT(*) OVER() AS total_count")
+
+        params["limit"] = request.limit
+        params["offset"] = offset
+
+        # conversation_id作为同一时间戳内的稳定次序
+        query = (
+            f"SELECT {', '.join(columns)} "
+            f"FROM `{self.conversations_table}` "
+            f"{self._where_clause(conditions)} "
+            f"ORDER BY {request.order_by} {order_direction}, conversation_id {order_direction} "
+            f"LIMIT @limit OFFSET @offset"
+        )
+        return query, params
+
+    def _build_conversations_count_query(self, request: ConversationQueryRequest) -> Tuple[str, Dict[str, Any]]:
+        """构建对话计数SQL及参数（不含游标和分页）"""
+        conditions, params = self._conversation_filters(request)
+        query = (
+            f"SELECT COUNT(*) AS total_count "
+            f"FROM `{self.conversations_table}` "
+            f"{self._where_clause(conditions)}"
+        )
+        return query, params
 
-        # 分页
-        query += f" LIMIT {request.limit} OFFSET {request.offset}"
+    def _build_sessions_query(
+        self,
+        request: ConversationQueryRequest,
+        include_total: bool = False
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        构建会话汇总SQL及参数
 
-        return query
+        先按消息条件找出命中的会话，再在这些会话的全部消息上按会话聚合：第一条用户提问、
+        最后一条AI回复（连同其评分和模型）、去重后的片段ID。分页和计数都以会话为单位。
+        """
+        conditions, params = self._conversation_filters(request)
+        order_direction = self._order_direction(request.order_direction)
+        offset = request.offset
+
+        page_conditions = []
+        if request.cursor:
+            cursor_timestamp, cursor_session_id = decode_conversation_cursor(request.cursor)
+            comparator = ">" if order_direction == "ASC" else "<"
+            page_conditions.append(
+                f"(created_at {comparator} @cursor_timestamp OR"
+                f" (created_at = @cursor_timestamp AND session_id {comparator} @cursor_session_id))"
+            )
+            params["cursor_timestamp"] = cursor_timestamp
+            params["cursor_session_id"] = cursor_session_id
+            offset = 0
 
-    async def count_conversations(self, request: ConversationQueryRequest) -> int:
-        """统计对话记录数量"""
-        logger.info("Counting conversations from BigQuery")
+        # 窗口计数在LIMIT之前计算，返回命中的会话总数
+        total_column = ", COUNT(*) OVER() AS total_count" if include_total else ""
+        params["limit"] = request.limit
+        params["offset"] = offset
 
-        # 构建计数查询
         query = f"""
-        SELECT COUNT(*) as total_count
-        FROM `{self.conversations_table}`
-        WHERE 1=1
+        WITH matched_sessions AS (
+            SELECT DISTINCT session_id
+            FROM `{self.conversations_table}`
+            {self._where_clause(conditions)}
+        ),
+        sessions AS (
+            SELECT
+                c.session_id,
+                MIN(c.timestamp) AS created_at,
+                MAX(c.timestamp) AS last_message_at,
+                COUNT(*) AS message_count,
+                ARRAY_AGG(IF(c.message_type = 'user', c.content, NULL) IGNORE NULLS
+                    ORDER BY c.timestamp, c.conversation_id LIMIT 1)[SAFE_OFFSET(0)] AS user_query,
+                ARRAY_AGG(IF(c.message_type = 'assistant', STRUCT(c.content, c.user_rating, c.model_id), NULL) IGNORE NULLS
+                    ORDER BY c.timestamp DESC, c.conversation_id DESC LIMIT 1)[SAFE_OFFSET(0)] AS last_response,
+                ARRAY_AGG(c.model_id ORDER BY c.timestamp, c.conversation_id LIMIT 1)[OFFSET(0)] AS first_model_id,
+                ARRAY_CONCAT_AGG(c.retrieval_chunk_ids ORDER BY c.timestamp, c.conversation_id) AS chunk_ids
+            FROM `{self.conversations_table}` c
+            JOIN matched_sessions USING (session_id)
+            GROUP BY c.session_id
+        )
+        SELECT
+            session_id,
+            COALESCE(last_response.model_id, first_model_id) AS model_id,
+            IFNULL(user_query, '') AS user_query,
+            IFNULL(last_response.content, '') AS ai_response,
+            last_response.user_rating AS user_rating,
+            created_at,
+            last_message_at,
+            message_count,
+            ARRAY(
+                SELECT chunk_id FROM UNNEST(chunk_ids) AS chunk_id WITH OFFSET AS position
+                GROUP BY chunk_id ORDER BY MIN(position)
+            ) AS retrieval_chunk_ids{total_column}
+        FROM sessions
+        {self._where_clause(page_conditions)}
+        ORDER BY created_at {order_direction}, session_id {order_direction}
+        LIMIT @limit OFFSET @offset
+        """
+        return query, params
+
+    def _build_sessions_count_query(self, request: ConversationQueryRequest) -> Tuple[str, Dict[str, Any]]:
+        """构建会话计数SQL及参数（不含游标和分页）"""
+        conditions, params = self._conversation_filters(request)
+        query = (
+            f"SELECT COUNT(DISTINCT session_id) AS total_count "
+            f"FROM `{self.conversations_table}` "
+            f"{self._where_clause(conditions)}"
+        )
+        return query, params
+
+    def _keyword_conditions(self, columns: List[str], keywords: str, params: Dict[str, Any]) -> List[str]:
         """
+        关键词条件：空格分隔的词之间为AND，双引号内为短语
 
+        默认每个词一个LIKE条件，即不区分大小写的子串匹配，与Mock服务的倒排索引语义一致。
+        启用搜索索引时改用一次SEARCH调用（短语用反引号包裹），由索引裁剪扫描的数据，
+        但SEARCH按分词后的完整词元匹配：单词内部的子串不会命中，未分词的中文只能整段匹配。
+        """
+        terms = parse_query(keywords)
+        if not terms:
+            return []
+
+        if self.use_search_index:
+            params["keywords"] = " ".join(f"`{term}`" if " " in term else term for term in terms)
+            return ["SEARCH((" + ", ".join(columns) + "), @keywords)"]
+
+        conditions = []
+        for i, term in enumerate(terms):
+            name = f"keyword_{i}"
+            # 转义LIKE通配符，词中的 % 和 _ 按字面匹配
+            escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params[name] = f"%{escaped}%"
+            conditions.append("(" + " OR ".join(f"LOWER({column}) LIKE @{name}" for column in columns) + ")")
+        return conditions
+
+    def _chunk_filters(self, request: RetrievalChunkQueryRequest) -> Tuple[List[str], Dict[str, Any]]:
+        """构建检索片段过滤条件及参数"""
         conditions = []
-        params = {}
+        params: Dict[str, Any] = {}
 
-        # 添加相同的过滤条件（不包括排序和分页）
-        if request.start_time:
-            conditions.append("timestamp >= @start_time")
-            params["start_time"] = request.start_time
+        # 文档过滤
+        if request.document_ids:
+            conditions.append("document_id IN UNNEST(@document_ids)")
+            params["document_ids"] = list(request.document_ids)
 
-        if request.end_time:
-            conditions.append("timestamp <= @end_time")
-            params["end_time"] = request.end_time
+        # 关键词搜索
+        if request.keywords and request.keywords.strip():
+            conditions.extend(self._keyword_conditions(["content", "title"], request.keywords, params))
 
-        if request.model_ids:
-            conditions.append("model_id IN UNNEST(@model_ids)")
-            params["model_ids"] = request.model_ids
+        # 相似度过滤
+        if request.min_similarity is not None:
+            conditions.append("similarity_score >= @min_similarity")
+            params["min_similarity"] = request.min_similarity
 
-        if request.session_ids:
-            conditions.append("session_id IN UNNEST(@session_ids)")
-            params["session_ids"] = request.session_ids
+        if request.max_similarity is not None:
+            conditions.append("similarity_score <= @max_similarity")
+            params["max_similarity"] = request.max_similarity
 
-        if request.message_types:
-            conditions.append("message_type IN UNNEST(@message_types)")
-            params["message_types"] = request.message_types
+        return conditions, params
 
-        if request.keywords and request.keywords.strip():
-            conditions.append("LOWER(content) LIKE LOWER(@keywords)")
-            params["keywords"] = f"%{request.keywords}%"
+    def _build_chunks_query(self, request: RetrievalChunkQueryRequest) -> Tuple[str, Dict[str, Any]]:
+        """构建检索片段查询SQL及参数"""
+        if request.order_by not in CHUNK_ORDER_COLUMNS:
+            raise ValueError(f"Unsupported order_by column: {request.order_by}")
 
-        if request.min_rating is not None:
-            conditions.append("user_rating >= @min_rating")
-            params["min_rating"] = request.min_rating
+        conditions, params = self._chunk_filters(request)
+        order_direction = self._order_direction(request.order_direction)
+        params["limit"] = request.limit
+        params["offset"] = request.offset
 
-        if request.max_rating is not None:
-            conditions.append("user_rating <= @max_rating")
-            params["max_rating"] = request.max_rating
+        query = (
+            f"SELECT {chunk_columns(request.projection)} "
+            f"FROM `{self.retrieval_chunks_table}` "
+            f"{self._where_clause(conditions)} "
+            f"ORDER BY {request.order_by} {order_direction}, chunk_id {order_direction} "
+            f"LIMIT @limit OFFSET @offset"
+        )
+        return query, params
+
+    def _build_chunks_count_query(self, request: RetrievalChunkQueryRequest) -> Tuple[str, Dict[str, Any]]:
+        """构建检索片段计数SQL及参数"""
+        conditions, params = self._chunk_filters(request)
+        query = (
+            f"SELECT COUNT(*) AS total_count "
+            f"FROM `{self.retrieval_chunks_table}` "
+            f"{self._where_clause(conditions)}"
+        )
+        return query, params
+
+    async def _fetch_conversations(
+        self,
+        query: str,
+        params: Dict[str, Any],
+        timeout: float = 30
+    ) -> Tuple[List[ConversationRow], Optional[int]]:
+        """执行对话查询，返回 (对话列表, 窗口计数)；查询不含total_count列或无结果时计数为None"""
+        if self.use_arrow:
+            table = await self._executor.query_arrow(
+                query,
+                job_config=self._job_config(params),
+                timeout=timeout,
+                bqstorage_client=self._bqstorage_client
+            )
+            total = arrow_total_count(table) if table.num_rows else None
+            return conversations_from_arrow(table), total
+
+        results = await self._run_query(query, params, timeout=timeout)
+        total = results[0].get("total_count") if results else None
+        return [self._row_to_conversation(row) for row in results], total
+
+    @staticmethod
+    def _row_to_conversation(row: Any) -> ConversationRow:
+        """将BigQuery结果行转换为ConversationRow"""
+        # 解析retrieval_chunk_ids（可能存储为JSON字符串）
+        retrieval_chunk_ids = row.get("retrieval_chunk_ids", [])
+        if isinstance(retrieval_chunk_ids, str):
+            try:
+                retrieval_chunk_ids = json.loads(retrieval_chunk_ids)
+            except json.JSONDecodeError:
+                retrieval_chunk_ids = []
+
+        return ConversationRow(
+            conversation_id=row["conversation_id"],
+            session_id=row["session_id"],
+            message_id=row["message_id"],
+            message_type=row["message_type"],
+            content=row["content"],
+            model_id=row["model_id"],
+            timestamp=row["timestamp"],
+            metadata=dict(row.get("metadata", {})),
+            user_rating=row.get("user_rating"),
+            feedback_text=row.get("feedback_text"),
+            token_count=row.get("token_count"),
+            processing_time_ms=row.get("processing_time_ms"),
+            retrieval_chunk_ids=list(retrieval_chunk_ids or [])
+        )
+
+    @staticmethod
+    def _row_to_chunk(row: Any) -> RetrievalChunkRow:
+        """将BigQuery结果行转换为RetrievalChunkRow"""
+        embedding_vector = row.get("embedding_vector")
+        return RetrievalChunkRow(
+            chunk_id=row["chunk_id"],
+            document_id=row["document_id"],
+            chunk_index=row["chunk_index"],
+            content=row["content"],
+            title=row.get("title"),
+            # 轻量投影不查询向量列，避免为每个片段分配上百个浮点数
+            embedding_vector=list(embedding_vector) if embedding_vector is not None else None,
+            similarity_score=row.get("similarity_score"),
+            metadata=dict(row.get("metadata", {})),
+            created_at=row["created_at"],
+            updated_at=row["updated_at"]
+        )
+
+    # ------------------------------------------------------------------
+    # 对话查询
+    # ------------------------------------------------------------------
+
+    async def test_connection(self) -> bool:
+        """测试连接状态"""
+        try:
+            # 执行简单查询测试连接
+            query = f"SELECT 1 as test FROM `{self.conversations_table}` LIMIT 1"
+            results = await self._executor.query(query, timeout=10)
+
+            logger.info("BigQuery connection test successful")
+            return True
+        except Exception as e:
+            logger.error("BigQuery connection test failed", error=str(e))
+            return False
+
+    async def query_conversations(self, request: ConversationQueryRequest) -> List[ConversationRow]:
+        """查询对话记录"""
+        logger.info("Querying conversations from BigQuery", request=request.dict())
+
+        # 构建SQL查询
+        query, params = self._build_conversations_query(request)
 
-        if conditions:
-            query += " AND " + " AND ".join(conditions)
+        try:
+            # 执行查询并转换结果
+            conversations, _ = await self._fetch_conversations(query, params, timeout=30)
+
+            logger.info("BigQuery conversation query completed", results_count=len(conversations))
+            return conversations
+
+        except Exception as e:
+            logger.error("BigQuery conversation query failed", error=str(e), query=query)
+            raise
+
+    async def query_conversations_with_total(self, request: ConversationQueryRequest) -> Tuple[List[ConversationRow], int]:
+        """查询对话记录，并通过窗口函数在同一次扫描中返回过滤后的总数"""
+        logger.info("Querying conversations with total from BigQuery", request=request.dict())
+
+        if request.cursor:
+            # 游标条件会影响窗口计数，改为并发执行页查询和总数查询
+            conversations, total = await asyncio.gather(
+                self.query_conversations(request),
+                self.count_conversations(request)
+            )
+            return conversations, total
+
+        query, params = self._build_conversations_query(request, include_total=True)
 
         try:
-            query_job = self.client.query(query)
-            results = list(query_job.result(timeout=30))
+            conversations, total = await self._fetch_conversations(query, params, timeout=30)
+            if total is None:
+                # 页码超出范围时窗口计数不可用，退回单独计数
+                total = await self.count_conversations(request) if request.offset > 0 else 0
+
+            logger.info("BigQuery conversation query with total completed",
+                       results_count=len(conversations),
+                       total_count=total)
+            return conversations, total
+
+        except Exception as e:
+            logger.error("BigQuery conversation query with total failed", error=str(e), query=query)
+            raise
+
+    async def query_sessions_with_total(self, request: ConversationQueryRequest) -> Tuple[List[SessionSummaryRow], int]:
+        """按会话分页查询，会话汇总和会话总数在同一个查询中完成"""
+        logger.info("Querying sessions with total from BigQuery", request=request.dict())
+
+        # 游标条件会影响窗口计数，此时与单独的会话计数并发执行
+        query, params = self._build_sessions_query(request, include_total=not request.cursor)
+
+        try:
+            if request.cursor:
+                results, total = await asyncio.gather(
+                    self._run_query(query, params, timeout=60),
+                    self._count_sessions(request)
+                )
+            else:
+                results = await self._run_query(query, params, timeout=60)
+                total = results[0].get("total_count") if results else None
+                if total is None:
+                    # 页码超出范围时窗口计数不可用，退回单独计数
+                    total = await self._count_sessions(request) if request.offset > 0 else 0
+
+            sessions = [self._row_to_session_summary(row) for row in results]
+            logger.info("BigQuery session query with total completed",
+                       results_count=len(sessions),
+                       total_count=total)
+            return sessions, total
+
+        except Exception as e:
+            logger.error("BigQuery session query with total failed", error=str(e), query=query)
+            raise
+
+    async def _count_sessions(self, request: ConversationQueryRequest) -> int:
+        """统计命中过滤条件的会话数量"""
+        query, params = self._build_sessions_count_query(request)
+        results = await self._run_query(query, params, timeout=30)
+        return results[0]["total_count"] if results else 0
+
+    @staticmethod
+    def _row_to_session_summary(row: Any) -> SessionSummaryRow:
+        """将会话汇总结果行转换为SessionSummaryRow"""
+        return SessionSummaryRow(
+            session_id=row["session_id"],
+            model_id=row["model_id"],
+            user_query=row["user_query"],
+            ai_response=row["ai_response"],
+            user_rating=row["user_rating"],
+            created_at=row["created_at"],
+            last_message_at=row["last_message_at"],
+            message_count=row["message_count"],
+            retrieval_chunk_ids=list(row["retrieval_chunk_ids"] or [])
+        )
+
+    async def count_conversations(self, request: ConversationQueryRequest) -> int:
+        """统计对话记录数量"""
+        logger.info("Counting conversations from BigQuery")
+
+        query, params = self._build_conversations_count_query(request)
+
+        try:
+            results = await self._run_query(query, params, timeout=30)
 
             total_count = results[0]["total_count"] if results else 0
             logger.info("Conversation count completed", total_count=total_count)
@@ -251,36 +678,20 @@ class RealBigQueryService(BigQueryService):
 
     async def get_conversation_by_id(self, conversation_id: str) -> Optional[ConversationRow]:
         """根据ID获取对话记录"""
-        query = f"""
-        SELECT *
-        FROM `{self.conversations_table}`
-        WHERE conversation_id = @conversation_id
-        LIMIT 1
-        """
+        query = (
+            f"SELECT {', '.join(CONVERSATION_COLUMNS)} "
+            f"FROM `{self.conversations_table}` "
+            f"WHERE conversation_id = @conversation_id "
+            f"LIMIT 1"
+        )
 
         try:
-            query_job = self.client.query(query)
-            results = list(query_job.result(timeout=10))
+            results = await self._run_query(query, {"conversation_id": conversation_id}, timeout=10)
 
             if not results:
                 return None
 
-            row = results[0]
-            return ConversationRow(
-                conversation_id=row["conversation_id"],
-                session_id=row["session_id"],
-                message_id=row["message_id"],
-                message_type=row["message_type"],
-                content=row["content"],
-                model_id=row["model_id"],
-                timestamp=row["timestamp"],
-                metadata=dict(row.get("metadata", {})),
-                user_rating=row.get("user_rating"),
-                feedback_text=row.get("feedback_text"),
-                token_count=row.get("token_count"),
-                processing_time_ms=row.get("processing_time_ms"),
-                retrieval_chunk_ids=list(row.get("retrieval_chunk_ids", []))
-            )
+            return self._row_to_conversation(results[0])
 
         except Exception as e:
             logger.error("Get conversation by ID failed", error=str(e), conversation_id=conversation_id)
@@ -288,108 +699,73 @@ class RealBigQueryService(BigQueryService):
 
     async def get_session_conversations(self, session_id: str) -> List[ConversationRow]:
         """获取会话的所有对话"""
-        query = f"""
-        SELECT *
-        FROM `{self.conversations_table}`
-        WHERE session_id = @session_id
-        ORDER BY timestamp ASC
-        """
+        query = (
+            f"SELECT {', '.join(CONVERSATION_COLUMNS)} "
+            f"FROM `{self.conversations_table}` "
+            f"WHERE session_id = @session_id "
+            f"ORDER BY timestamp ASC"
+        )
 
         try:
-            query_job = self.client.query(query)
-            results = query_job.result(timeout=30)
-
-            conversations = []
-            for row in results:
-                conversation = ConversationRow(
-                    conversation_id=row["conversation_id"],
-                    session_id=row["session_id"],
-                    message_id=row["message_id"],
-                    message_type=row["message_type"],
-                    content=row["content"],
-                    model_id=row["model_id"],
-                    timestamp=row["timestamp"],
-                    metadata=dict(row.get("metadata", {})),
-                    user_rating=row.get("user_rating"),
-                    feedback_text=row.get("feedback_text"),
-                    token_count=row.get("token_count"),
-                    processing_time_ms=row.get("processing_time_ms"),
-                    retrieval_chunk_ids=list(row.get("retrieval_chunk_ids", []))
-                )
-                conversations.append(conversation)
-
-            return conversations
+            results = await self._run_query(query, {"session_id": session_id}, timeout=30)
+            return [self._row_to_conversation(row) for row in results]
 
         except Exception as e:
             logger.error("Get session conversations failed", error=str(e), session_id=session_id)
             raise
 
-    async def query_retrieval_chunks(self, request: RetrievalChunkQueryRequest) -> List[RetrievalChunkRow]:
-        """查询检索片段"""
-        logger.info("Querying retrieval chunks from BigQuery", request=request.dict())
-
-        # 构建查询
-        query = f"""
-        SELECT *
-        FROM `{self.retrieval_chunks_table}`
-        WHERE 1=1
-        """
-
-        conditions = []
-        params = {}
-
-        # 文档过滤
-        if request.document_ids:
-            conditions.append("document_id IN UNNEST(@document_ids)")
-            params["document_ids"] = request.document_ids
-
-        # 关键词搜索
-        if request.keywords and request.keywords.strip():
-            conditions.append("""
-                (LOWER(content) LIKE LOWER(@keywords) OR
-                 LOWER(title) LIKE LOWER(@keywords))
-            """)
-            params["keywords"] = f"%{request.keywords}%"
+    async def get_sessions_conversations(self, session_ids: List[str]) -> Dict[str, List[ConversationRow]]:
+        """批量获取多个会话的对话，每批会话只提交一个查询作业"""
+        unique_session_ids = list(dict.fromkeys(session_ids))
+        grouped: Dict[str, List[ConversationRow]] = {session_id: [] for session_id in unique_session_ids}
+        if not unique_session_ids:
+            return grouped
+
+        query = (
+            f"SELECT {', '.join(CONVERSATION_COLUMNS)} "
+            f"FROM `{self.conversations_table}` "
+            f"WHERE session_id IN UNNEST(@session_ids) "
+            f"ORDER BY session_id, timestamp ASC, conversation_id ASC"
+        )
 
-        # 相似度过滤
-        if request.min_similarity is not None:
-            conditions.append("similarity_score >= @min_similarity")
-            params["min_similarity"] = request.min_similarity
+        try:
+            batches = [
+                unique_session_ids[i:i + SESSION_BATCH_SIZE]
+                for i in range(0, len(unique_session_ids), SESSION_BATCH_SIZE)
+            ]
+            results = await asyncio.gather(*[
+                self._fetch_conversations(query, {"session_ids": batch}, timeout=60)
+                for batch in batches
+            ])
+
+            for conversations, _ in results:
+                for conv in conversations:
+                    grouped[conv.session_id].append(conv)
+
+            logger.info("Bulk session conversations fetched",
+                       session_count=len(unique_session_ids),
+                       job_count=len(batches),
+                       conversation_count=sum(len(convs) for convs in grouped.values()))
+            return grouped
 
-        if request.max_similarity is not None:
-            conditions.append("similarity_score <= @max_similarity")
-            params["max_similarity"] = request.max_similarity
+        except Exception as e:
+            logger.error("Get sessions conversations failed", error=str(e), session_count=len(unique_session_ids))
+            raise
 
-        # 添加条件
-        if conditions:
-            query += " AND " + " AND ".join(conditions)
+    # ------------------------------------------------------------------
+    # 检索片段查询
+    # ------------------------------------------------------------------
 
-        # 排序
-        order_direction = "ASC" if request.order_direction == "asc" else "DESC"
-        query += f" ORDER BY {request.order_by} {order_direction}"
+    async def query_retrieval_chunks(self, request: RetrievalChunkQueryRequest) -> List[RetrievalChunkRow]:
+        """查询检索片段"""
+        logger.info("Querying retrieval chunks from BigQuery", request=request.dict())
 
-        # 分页
-        query += f" LIMIT {request.limit} OFFSET {request.offset}"
+        query, params = self._build_chunks_query(request)
 
         try:
-            query_job = self.client.query(query)
-            results = query_job.result(timeout=30)
-
-            chunks = []
-            for row in results:
-                chunk = RetrievalChunkRow(
-                    chunk_id=row["chunk_id"],
-                    document_id=row["document_id"],
-                    chunk_index=row["chunk_index"],
-                    content=row["content"],
-                    title=row.get("title"),
-                    embedding_vector=list(row.get("embedding_vector", [])),
-                    similarity_score=row.get("similarity_score"),
-                    metadata=dict(row.get("metadata", {})),
-                    created_at=row["created_at"],
-                    updated_at=row["updated_at"]
-                )
-                chunks.append(chunk)
+            results = await self._run_query(query, params, timeout=30)
+
+            chunks = [self._row_to_chunk(row) for row in results]
 
             logger.info("Retrieval chunks query completed", results_count=len(chunks))
             return chunks
@@ -400,41 +776,10 @@ class RealBigQueryService(BigQueryService):
 
     async def count_retrieval_chunks(self, request: RetrievalChunkQueryRequest) -> int:
         """统计检索片段数量"""
-        query = f"""
-        SELECT COUNT(*) as total_count
-        FROM `{self.retrieval_chunks_table}`
-        WHERE 1=1
-        """
-
-        conditions = []
-        params = {}
-
-        # 添加过滤条件
-        if request.document_ids:
-            conditions.append("document_id IN UNNEST(@document_ids)")
-            params["document_ids"] = request.document_ids
-
-        if request.keywords and request.keywords.strip():
-            conditions.append("""
-                (LOWER(content) LIKE LOWER(@keywords) OR
-                 LOWER(title) LIKE LOWER(@keywords))
-            """)
-            params["keywords"] = f"%{request.keywords}%"
-
-        if request.min_similarity is not None:
-            conditions.append("similarity_score >= @min_similarity")
-            params["min_similarity"] = request.min_similarity
-
-        if request.max_similarity is not None:
-            conditions.append("similarity_score <= @max_similarity")
-            params["max_similarity"] = request.max_similarity
-
-        if conditions:
-            query += " AND " + " AND ".join(conditions)
+        query, params = self._build_chunks_count_query(request)
 
         try:
-            query_job = self.client.query(query)
-            results = list(query_job.result(timeout=10))
+            results = await self._run_query(query, params, timeout=10)
 
             total_count = results[0]["total_count"] if results else 0
             return total_count
@@ -443,74 +788,82 @@ class RealBigQueryService(BigQueryService):
             logger.error("Retrieval chunks count failed", error=str(e), query=query)
             raise
 
-    async def get_chunk_by_id(self, chunk_id: str) -> Optional[RetrievalChunkRow]:
+    async def get_chunk_by_id(
+        self,
+        chunk_id: str,
+        projection: ChunkProjection = ChunkProjection.LIGHT
+    ) -> Optional[RetrievalChunkRow]:
         """根据ID获取检索片段"""
-        query = f"""
-        SELECT *
-        FROM `{self.retrieval_chunks_table}`
-        WHERE chunk_id = @chunk_id
-        LIMIT 1
-        """
+        query = (
+            f"SELECT {chunk_columns(projection)} "
+            f"FROM `{self.retrieval_chunks_table}` "
+            f"WHERE chunk_id = @chunk_id "
+            f"LIMIT 1"
+        )
 
         try:
-            query_job = self.client.query(query)
-            results = list(query_job.result(timeout=10))
+            results = await self._run_query(query, {"chunk_id": chunk_id}, timeout=10)
 
             if not results:
                 return None
 
-            row = results[0]
-            return RetrievalChunkRow(
-                chunk_id=row["chunk_id"],
-                document_id=row["document_id"],
-                chunk_index=row["chunk_index"],
-                content=row["content"],
-                title=row.get("title"),
-                embedding_vector=list(row.get("embedding_vector", [])),
-                similarity_score=row.get("similarity_score"),
-                metadata=dict(row.get("metadata", {})),
-                created_at=row["created_at"],
-                updated_at=row["updated_at"]
-            )
+            return self._row_to_chunk(results[0])
 
         except Exception as e:
             logger.error("Get chunk by ID failed", error=str(e), chunk_id=chunk_id)
             raise
 
-    async def get_chunks_by_ids(self, chunk_ids: List[str]) -> List[RetrievalChunkRow]:
+    async def get_chunks_by_ids(
+        self,
+        chunk_ids: List[str],
+        projection: ChunkProjection = ChunkProjection.LIGHT
+    ) -> List[RetrievalChunkRow]:
         """根据ID列表批量获取检索片段"""
-        query = f"""
-        SELECT *
-        FROM `{self.retrieval_chunks_table}`
-        WHERE chunk_id IN UNNEST(@chunk_ids)
-        """
+        if not chunk_ids:
+            return []
 
-        try:
-            query_job = self.client.query(query)
-            results = query_job.result(timeout=30)
-
-            chunks = []
-            for row in results:
-                chunk = RetrievalChunkRow(
-                    chunk_id=row["chunk_id"],
-                    document_id=row["document_id"],
-                    chunk_index=row["chunk_index"],
-                    content=row["content"],
-                    title=row.get("title"),
-                    embedding_vector=list(row.get("embedding_vector", [])),
-                    similarity_score=row.get("similarity_score"),
-                    metadata=dict(row.get("metadata", {})),
-                    created_at=row["created_at"],
-                    updated_at=row["updated_at"]
-                )
-                chunks.append(chunk)
+        query = (
+            f"SELECT {chunk_columns(projection)} "
+            f"FROM `{self.retrieval_chunks_table}` "
+            f"WHERE chunk_id IN UNNEST(@chunk_ids)"
+        )
 
-            return chunks
+        try:
+            results = await self._run_query(query, {"chunk_ids": list(dict.fromkeys(chunk_ids))}, timeout=30)
+            return [self._row_to_chunk(row) for row in results]
 
         except Exception as e:
             logger.error("Get chunks by IDs failed", error=str(e), chunk_ids=chunk_ids)
             raise
 
+    async def get_chunk_embeddings(self, chunk_ids: List[str]) -> Tuple[List[str], np.ndarray]:
+        """批量获取片段向量，只读取chunk_id和embedding_vector两列"""
+        if not chunk_ids:
+            return [], np.empty((0, 0), dtype=np.float32)
+
+        query = (
+            f"SELECT chunk_id, embedding_vector "
+            f"FROM `{self.retrieval_chunks_table}` "
+            f"WHERE chunk_id IN UNNEST(@chunk_ids) AND ARRAY_LENGTH(embedding_vector) > 0"
+        )
+
+        try:
+            results = await self._run_query(query, {"chunk_ids": list(dict.fromkeys(chunk_ids))}, timeout=30)
+            if not results:
+                return [], np.empty((0, 0), dtype=np.float32)
+            return (
+                [row["chunk_id"] for row in results],
+                np.asarray([row["embedding_vector"] for row in results], dtype=np.float32)
+            )
+
+        except Exception as e:
+            logger.error("Get chunk embeddings failed", error=str(e), chunk_count=len(chunk_ids))
+            raise
+
+    # ------------------------------------------------------------------
+    # 统计与流式查询
+    # ------------------------------------------------------------------
+
     async def get_available_model_ids(self) -> List[str]:
         """获取所有可用的模型ID"""
         query = f"""
@@ -521,8 +874,7 @@ class RealBigQueryService(BigQueryService):
         """
 
         try:
-            query_job = self.client.query(query)
-            results = query_job.result(timeout=10)
+            results = await self._run_query(query, {}, timeout=10)
 
             model_ids = [row["model_id"] for row in results]
             return model_ids
@@ -549,8 +901,7 @@ class RealBigQueryService(BigQueryService):
         """
 
         try:
-            query_job = self.client.query(query)
-            results = list(query_job.result(timeout=10))
+            results = await self._run_query(query, {"session_id": session_id}, timeout=10)
 
             if not results:
                 return {}
@@ -574,44 +925,125 @@ class RealBigQueryService(BigQueryService):
             logger.error("Get session statistics failed", error=str(e), session_id=session_id)
             raise
 
-    async def stream_conversations(self, request: ConversationQueryRequest) -> AsyncIterator[ConversationRow]:
-        """流式查询对话记录"""
-        logger.info("Streaming conversations from BigQuery")
+    async def _load_session_vector_index(self) -> VectorIndex:
+        """
+        从BigQuery构建会话向量索引
+
+        每个会话的向量为其引用片段embedding按维度求均值，聚合在BigQuery中完成，
+        只下载 会话数 x d 的结果；每个TTL周期执行一次。
+        """
+        query = f"""
+        WITH session_chunks AS (
+            SELECT DISTINCT session_id, chunk_id
+            FROM `{self.conversations_table}`, UNNEST(retrieval_chunk_ids) AS chunk_id
+        ),
+        session_dims AS (
+            SELECT sc.session_id, dim, AVG(value) AS value
+            FROM session_chunks sc
+            JOIN `{self.retrieval_chunks_table}` rc ON rc.chunk_id = sc.chunk_id,
+                UNNEST(rc.embedding_vector) AS value WITH OFFSET AS dim
+            GROUP BY sc.session_id, dim
+        )
+        SELECT session_id, ARRAY_AGG(value ORDER BY dim) AS embedding
+        FROM session_dims
+        GROUP BY session_id
+        """
+        rows = await self._run_query(query, {}, timeout=600)
+
+        def build() -> VectorIndex:
+            if not rows:
+                return VectorIndex([], np.empty((0, 0), dtype=np.float32))
+            index = VectorIndex(
+                [row["session_id"] for row in rows],
+                np.array([row["embedding"] for row in rows], dtype=np.float32)
+            )
+            if len(index) > SIMILARITY_IVF_THRESHOLD:
+                index.train_ivf()
+            return index
+
+        # 矩阵归一化和IVF训练是CPU密集操作，放到线程池执行
+        index = await asyncio.get_running_loop().run_in_executor(None, build)
+        logger.info("Session vector index built", sessions=len(index), dim=index.dim)
+        return index
+
+    async def _refresh_session_index(self):
+        """重建会话向量索引并替换当前索引"""
+        self._session_index = await self._load_session_vector_index()
+        self._session_index_built_at = time.monotonic()
+
+    async def _refresh_session_index_in_background(self):
+        try:
+            await self._refresh_session_index()
+        except Exception as e:
+            logger.warning("Session vector index refresh failed", error=str(e))
+        finally:
+            self._session_index_refresh = None
+
+    async def _session_vector_index(self) -> VectorIndex:
+        """获取会话向量索引：首次使用时构建，过期后在后台刷新"""
+        if self._session_index is None:
+            if self._session_index_lock is None:
+                self._session_index_lock = asyncio.Lock()
+            async with self._session_index_lock:
+                if self._session_index is None:
+                    await self._refresh_session_index()
+        elif (
+            time.monotonic() - self._session_index_built_at > self.similarity_index_ttl_seconds
+            and self._session_index_refresh is None
+        ):
+            self._session_index_refresh = asyncio.create_task(self._refresh_session_index_in_background())
+        return self._session_index
+
+    async def find_similar_sessions(self, session_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        查找语义相似的会话
+
+        在内存中的会话向量索引上检索；索引按similarity_index_ttl_seconds刷新，
+        刷新前新增的会话不可检索。
+        """
+        try:
+            index = await self._session_vector_index()
+        except Exception as e:
+            logger.error("Find similar sessions failed", error=str(e), session_id=session_id)
+            raise
+
+        vector = index.vector(session_id)
+        if vector is None:
+            raise ValueError(f"Session has no embeddings: {session_id}")
+
+        return [
+            {"session_id": similar_id, "score": score}
+            for similar_id, score in index.search(vector, k=limit, exclude=[session_id])
+        ]
+
+    async def stream_conversations(
+        self,
+        request: ConversationQueryRequest,
+        page_size: Optional[int] = None
+    ) -> AsyncIterator[ConversationRow]:
+        """流式查询对话记录，结果页在后台预取到有界队列"""
+        page_size = page_size or self.stream_page_size
+        logger.info("Streaming conversations from BigQuery", page_size=page_size)
 
         # 构建查询
-        query = self._build_conversations_query(request)
+        query, params = self._build_conversations_query(request)
 
         try:
-            # 使用BigQuery的流式API
-            query_job = self.client.query(query)
-
-            for row in query_job.result(timeout=60):
-                retrieval_chunk_ids = row.get("retrieval_chunk_ids", [])
-                if isinstance(retrieval_chunk_ids, str):
-                    import json
-                    try:
-                        retrieval_chunk_ids = json.loads(retrieval_chunk_ids)
-                    except json.JSONDecodeError:
-                        retrieval_chunk_ids = []
-
-                conversation = ConversationRow(
-                    conversation_id=row["conversation_id"],
-                    session_id=row["session_id"],
-                    message_id=row["message_id"],
-                    message_type=row["message_type"],
-                    content=row["content"],
-                    model_id=row["model_id"],
-                    timestamp=row["timestamp"],
-                    metadata=dict(row.get("metadata", {})),
-                    user_rating=row.get("user_rating"),
-                    feedback_text=row.get("feedback_text"),
-                    token_count=row.get("token_count"),
-                    processing_time_ms=row.get("processing_time_ms"),
-                    retrieval_chunk_ids=retrieval_chunk_ids
-                )
+            query_job = await self._executor.run(self.client.query, query, job_config=self._job_config(params))
+            row_iterator = await self._executor.run(query_job.result, timeout=60, page_size=page_size)
 
-                yield conversation
+            if self.use_arrow:
+                # 以RecordBatch为单位下载，每批按列转换
+                batches = row_iterator.to_arrow_iterable(bqstorage_client=self._bqstorage_client)
+                async for batch in self._executor.iterate(batches, prefetch=self.stream_prefetch_pages):
+                    for conversation in conversations_from_arrow(batch):
+                        yield conversation
+                return
+
+            async for page in self._executor.iterate(row_iterator.pages, prefetch=self.stream_prefetch_pages):
+                for row in page:
+                    yield self._row_to_conversation(row)
 
         except Exception as e:
             logger.error("Stream conversations failed", error=str(e), query=query)
-            raise
\ No newline at end of file
+            raise
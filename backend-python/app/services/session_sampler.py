@@ -0,0 +1,202 @@
+"""代表性会话抽样：按模型、评分、主题分层的流式水库抽样，以及基于向量的多样性选择"""
+import hashlib
+import heapq
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.services.bigquery_service import ConversationRow
+from app.services.vector_index import normalize_rows
+
+def session_priority(session_id: str, seed: int = 0) -> float:
+    """会话的确定性随机优先级（0~1），同一会话的每条消息得到相同的值"""
+    digest = hashlib.blake2b(f"{seed}:{session_id}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64
+
+def stratum_key(conv: ConversationRow) -> Tuple[Any, ...]:
+    """分层键：(模型, 评分, 主题)"""
+    return conv.model_id, conv.user_rating, (conv.metadata or {}).get("topic")
+
+class StratifiedSessionSampler:
+    """
+    分层会话抽样器
+
+    对话消息按流式逐条输入，每个分层只保留优先级最小的capacity个会话（bottom-k水库）。
+    优先级由会话ID哈希得到，与消息到达顺序无关，因此同一会话的多条消息不会重复入样，
+    结果可按seed复现；内存占用为 O(分层数 x capacity)，与扫描的数据量无关。
+    """
+
+    def __init__(self, capacity: int, seed: int = 0):
+        """
+        初始化抽样器
+
+        Args:
+            capacity: 每个分层保留的会话数上限，应不小于最终抽样数
+            seed: 随机种子
+        """
+        self.capacity = capacity
+        self.seed = seed
+        # 分层 -> 以负优先级为键的最大堆，堆顶为当前优先级最大（最先被淘汰）的会话
+        self._reservoirs: Dict[Hashable, List[Tuple[float, str]]] = {}
+        self._members: Dict[Hashable, Set[str]] = {}
+        # 分层 -> 输入的消息数，作为按比例分配样本的权重
+        self._sizes: Dict[Hashable, int] = {}
+        # 水库中的会话 -> 引用的检索片段ID（多样性选择时使用）
+        self._chunk_ids: Dict[str, List[str]] = {}
+        self.messages_seen = 0
+
+    def add(self, conv: ConversationRow):
+        """输入一条对话消息，只有AI回复参与抽样（评分和检索片段在回复上）"""
+        if conv.message_type != "assistant":
+            return
+        self.messages_seen += 1
+
+        key = stratum_key(conv)
+        self._sizes[key] = self._sizes.get(key, 0) + 1
+        reservoir = self._reservoirs.setdefault(key, [])
+        members = self._members.setdefault(key, set())
+
+        session_id = conv.session_id
+        if session_id in members:
+            self._chunk_ids[session_id].extend(conv.retrieval_chunk_ids)
+            return
+
+        priority = session_priority(session_id, self.seed)
+        if len(reservoir) < self.capacity:
+            heapq.heappush(reservoir, (-priority, session_id))
+        elif priority < -reservoir[0][0]:
+            _, evicted = heapq.heapreplace(reservoir, (-priority, session_id))
+            members.discard(evicted)
+            if not any(evicted in other for other in self._members.values()):
+                self._chunk_ids.pop(evicted, None)
+        else:
+            return
+
+        members.add(session_id)
+        self._chunk_ids.setdefault(session_id, []).extend(conv.retrieval_chunk_ids)
+
+    @property
+    def strata(self) -> Dict[Hashable, int]:
+        """各分层的消息数"""
+        return dict(self._sizes)
+
+    def chunk_ids(self, session_id: str) -> List[str]:
+        """水库中会话引用的检索片段ID（去重）"""
+        return list(dict.fromkeys(self._chunk_ids.get(session_id, [])))
+
+    def _allocate(self, n: int, available: Dict[Hashable, int]) -> Dict[Hashable, int]:
+        """按分层大小比例分配n个名额（最大余数法），名额超过分层可用会话数时分给其余分层"""
+        quotas = {key: 0 for key in available}
+        remaining = n
+        while remaining > 0:
+            open_keys = [key for key in quotas if quotas[key] < available[key]]
+            if not open_keys:
+                break
+
+            total = sum(self._sizes[key] for key in open_keys)
+            shares = {key: remaining * self._sizes[key] / total for key in open_keys}
+            grants = {key: int(share) for key, share in shares.items()}
+            by_remainder = sorted(open_keys, key=lambda key: shares[key] - grants[key], reverse=True)
+            for key in by_remainder[:remaining - sum(grants.values())]:
+                grants[key] += 1
+
+            for key in open_keys:
+                granted = min(grants[key], available[key] - quotas[key])
+                quotas[key] += granted
+                remaining -= granted
+        return quotas
+
+    def sample(self, n: int, exclude: Optional[Set[str]] = None) -> List[Tuple[str, Hashable]]:
+        """
+        抽取n个会话
+
+        Args:
+            n: 抽样数
+            exclude: 不参与抽样的会话（如已判定为近似重复），其名额由同分层的
+                后备会话补足，分层不足时分给其余分层
+
+        Returns:
+            [(会话ID, 分层键)]；同一会话出现在多个分层时只取一次
+        """
+        exclude = exclude or set()
+        candidates = {
+            key: [session_id for _, session_id in sorted(reservoir, reverse=True) if session_id not in exclude]
+            for key, reservoir in self._reservoirs.items()
+        }
+        quotas = self._allocate(n, {key: len(session_ids) for key, session_ids in candidates.items()})
+        selected: Dict[str, Hashable] = {}
+        for key, quota in quotas.items():
+            taken = 0
+            for session_id in candidates[key]:
+                if taken >= quota:
+                    break
+                if session_id not in selected:
+                    selected[session_id] = key
+                    taken += 1
+
+        # 同一会话出现在多个分层时，后一个分层的名额可能落空，按优先级从其余候选补足
+        if len(selected) < n:
+            remaining: Dict[str, Hashable] = {}
+            for key, session_ids in candidates.items():
+                for session_id in session_ids:
+                    if session_id not in selected:
+                        remaining.setdefault(session_id, key)
+            for session_id in sorted(remaining, key=lambda session_id: session_priority(session_id, self.seed))[:n - len(selected)]:
+                selected[session_id] = remaining[session_id]
+        return list(selected.items())
+
+def k_center(vectors: np.ndarray, k: int, first: int = 0) -> List[int]:
+    """
+    贪心k-center选择：每次取与已选集合余弦距离最远的向量
+
+    Args:
+        vectors: (N, d) 矩阵
+        k: 选择数量
+        first: 第一个选中的行
+
+    Returns:
+        选中的行号，按选择顺序
+    """
+    count = len(vectors)
+    if count == 0 or k <= 0:
+        return []
+
+    matrix = normalize_rows(vectors)
+    chosen = [first]
+    # 每个向量到已选集合的最小距离，随选择逐步更新
+    distances = 1.0 - matrix @ matrix[first]
+    distances[first] = -np.inf
+    while len(chosen) < min(k, count):
+        index = int(np.argmax(distances))
+        chosen.append(index)
+        distances = np.minimum(distances, 1.0 - matrix @ matrix[index])
+        distances[chosen] = -np.inf
+    return chosen
+
+def session_vectors(
+    session_ids: List[str],
+    chunk_ids: Dict[str, List[str]],
+    embedded_ids: List[str],
+    matrix: np.ndarray
+) -> Tuple[List[str], Optional[np.ndarray]]:
+    """
+    由片段向量计算会话向量（各片段归一化后求均值）
+
+    Returns:
+        (有向量的会话ID, 对应矩阵)；没有任何片段向量时矩阵为None
+    """
+    if len(embedded_ids) == 0:
+        return [], None
+
+    rows = {chunk_id: row for row, chunk_id in enumerate(embedded_ids)}
+    normalized = normalize_rows(matrix)
+    with_vectors = []
+    vectors = []
+    for session_id in session_ids:
+        session_rows = [rows[chunk_id] for chunk_id in chunk_ids.get(session_id, []) if chunk_id in rows]
+        if session_rows:
+            with_vectors.append(session_id)
+            vectors.append(normalized[session_rows].mean(axis=0))
+    if not vectors:
+        return [], None
+    return with_vectors, np.stack(vectors)
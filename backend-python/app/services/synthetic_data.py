@@ -0,0 +1,294 @@
+"""可复现的大规模合成对话数据：向量化生成、写入Arrow文件、内存映射加载"""
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pyarrow为可选依赖，缺失时无法生成和加载数据文件
+    pa = None
+    pc = None
+
+from app.utils.logger import logger
+from app.utils.text_index import parse_query
+
+# 数据目录中的文件名（Arrow IPC文件格式，可直接内存映射）
+CONVERSATIONS_FILE = "conversations.arrow"
+CHUNKS_FILE = "retrieval_chunks.arrow"
+
+# 主题 -> (用户问题, AI回答) 模板，内容与演示数据保持同一风格
+TOPIC_TEMPLATES: Dict[str, List[Tuple[str, str]]] = {
+    "finance": [
+        ("请帮我比较一下投资基金和股票投资的优缺点", "投资基金和股票投资各有优势。基金投资具有分散风险、专业管理等特点..."),
+        ("投资基金有哪些类型？我该如何选择？", "投资基金主要分为股票型、债券型、混合型、货币型等。选择时需考虑您的风险承受能力..."),
+        ("投资基金的风险如何控制？", "投资基金的风险可以通过资产配置、定期定额投资、长期持有等方式来控制..."),
+    ],
+    "technology": [
+        ("什么是人工智能？它有哪些应用领域？", "人工智能是模拟人类智能的计算机系统，应用领域包括自然语言处理、计算机视觉等..."),
+        ("机器学习和深度学习有什么区别？", "机器学习是AI的子集，而深度学习是机器学习的一个分支，使用神经网络进行学习..."),
+        ("AI技术对未来社会会有什么影响？", "AI技术将深刻改变社会，提高生产效率，但也需要关注就业影响和伦理问题..."),
+    ],
+    "programming": [
+        ("如何配置React项目的路由？", "可以使用React Router库来配置路由，首先安装react-router-dom包..."),
+        ("React Hooks的使用方法是什么？", "React Hooks允许在函数组件中使用状态和其他React特性，如useState、useEffect等..."),
+        ("Python装饰器怎么写？", "Python装饰器本质上是接收函数并返回新函数的高阶函数，可以用@语法应用..."),
+    ],
+    "database": [
+        ("数据库索引应该怎么设计？", "索引设计应围绕查询模式，优先覆盖高选择性的过滤列，并避免过多冗余索引..."),
+        ("慢查询如何排查？", "可以先开启慢查询日志，再结合执行计划分析全表扫描、排序和临时表等问题..."),
+        ("分库分表有哪些方案？", "常见方案包括按范围、按哈希和按业务拆分，需要同时考虑路由、扩容和分布式事务..."),
+    ],
+}
+
+class SyntheticDataConfig(BaseModel):
+    """合成数据生成参数"""
+    seed: int = Field(42, description="随机种子，相同参数和种子生成相同数据")
+    sessions: int = Field(100000, ge=1, description="会话数")
+    min_turns: int = Field(1, ge=1, description="每个会话的最少轮数（一轮为一问一答两条消息）")
+    max_turns: int = Field(8, ge=1, description="每个会话的最多轮数")
+    models: Dict[str, float] = Field(
+        default_factory=lambda: {"gpt-4o-mini": 0.4, "gpt-4o": 0.3, "claude-3-sonnet": 0.2, "claude-3-haiku": 0.1},
+        description="模型ID -> 会话占比"
+    )
+    rating_weights: List[float] = Field(
+        default_factory=lambda: [0.05, 0.1, 0.2, 0.35, 0.3],
+        description="AI回复评分1~5的分布"
+    )
+    unrated_ratio: float = Field(0.3, ge=0, le=1, description="未评分的AI回复比例")
+    chunks: int = Field(10000, ge=1, description="检索片段数")
+    max_chunks_per_reply: int = Field(3, ge=0, description="每条AI回复引用的最大片段数")
+    embedding_dim: int = Field(0, ge=0, description="片段向量维度，0表示不生成向量")
+    start_time: datetime = Field(datetime(2024, 1, 1), description="会话开始时间下界")
+    span_days: int = Field(180, ge=1, description="会话开始时间分布的天数")
+
+def _require_arrow():
+    if pa is None:
+        raise RuntimeError("pyarrow is required for synthetic datasets")
+
+def _prefixed(prefix: str, numbers: np.ndarray, width: int) -> "pa.Array":
+    """生成 prefix + 补零编号 的字符串列"""
+    digits = pc.utf8_lpad(pa.array(numbers).cast(pa.string()), width=width, padding="0")
+    return pc.binary_join_element_wise(pa.scalar(prefix), digits, "")
+
+def generate_chunks(config: SyntheticDataConfig) -> "pa.Table":
+    """生成检索片段表，片段按 位置 % 主题数 归属主题"""
+    _require_arrow()
+    rng = np.random.default_rng(config.seed + 1)
+    topics = list(TOPIC_TEMPLATES)
+    count = config.chunks
+    positions = np.arange(count)
+    topic_index = positions % len(topics)
+
+    contents = pa.array([answer for topic in topics for _, answer in TOPIC_TEMPLATES[topic]])
+    templates_per_topic = len(TOPIC_TEMPLATES[topics[0]])
+    content_index = topic_index * templates_per_topic + rng.integers(0, templates_per_topic, count)
+    metadata = pa.array([json.dumps({"topic": topic, "data_source": "synthetic"}, ensure_ascii=False) for topic in topics])
+
+    created_at = np.datetime64(config.start_time, "us") + rng.integers(0, config.span_days * 86400, count).astype("timedelta64[s]")
+    chunk_ids = _prefixed("CH-", positions + 1, 7)
+    columns = {
+        "chunk_id": chunk_ids,
+        "document_id": pc.binary_join_element_wise(
+            pa.scalar("doc"), pa.array(topics).take(pa.array(topic_index)), _prefixed("", positions // 20, 5), "_"
+        ),
+        "chunk_index": pa.array(positions % 20),
+        "content": pa.DictionaryArray.from_arrays(pa.array(content_index.astype(np.int32)), contents),
+        "title": pa.DictionaryArray.from_arrays(pa.array(topic_index.astype(np.int32)), pa.array(topics)),
+        "similarity_score": pa.array(rng.uniform(0.5, 0.99, count)),
+        "metadata": pa.DictionaryArray.from_arrays(pa.array(topic_index.astype(np.int32)), metadata),
+        "created_at": pa.array(created_at),
+        "updated_at": pa.array(created_at),
+    }
+    if config.embedding_dim:
+        # 同一主题的向量围绕同一中心分布，便于相似检索产生有意义的结果
+        centers = rng.standard_normal((len(topics), config.embedding_dim), dtype=np.float32)
+        vectors = centers[topic_index] + 0.5 * rng.standard_normal((count, config.embedding_dim), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        columns["embedding_vector"] = pa.FixedSizeListArray.from_arrays(pa.array(vectors.ravel()), config.embedding_dim)
+
+    return pa.table(columns)
+
+def generate_conversations(config: SyntheticDataConfig) -> "pa.Table":
+    """
+    生成对话表，全部按列向量化计算
+
+    每轮一条用户消息加一条AI回复，同一会话的消息连续存放并按时间递增。
+    内容、元数据等低基数列使用字典编码，千万级消息的文件也只有数百MB。
+    """
+    _require_arrow()
+    if config.max_turns < config.min_turns:
+        raise ValueError("max_turns must be >= min_turns")
+
+    rng = np.random.default_rng(config.seed)
+    topics = list(TOPIC_TEMPLATES)
+    templates_per_topic = len(TOPIC_TEMPLATES[topics[0]])
+
+    # 会话级属性
+    sessions = config.sessions
+    turns = rng.integers(config.min_turns, config.max_turns + 1, sessions)
+    session_topic = rng.integers(0, len(topics), sessions)
+    model_names = list(config.models)
+    model_weights = np.asarray(list(config.models.values()), dtype=float)
+    session_model = rng.choice(len(model_names), sessions, p=model_weights / model_weights.sum())
+    session_start = rng.integers(0, config.span_days * 86400, sessions)
+
+    # 轮级属性：会话编号及轮次
+    total_turns = int(turns.sum())
+    turn_session = np.repeat(np.arange(sessions), turns)
+    turn_number = np.arange(total_turns) - np.repeat(np.cumsum(turns) - turns, turns)
+    turn_template = rng.integers(0, templates_per_topic, total_turns)
+    turn_offset = turn_number * 600 + rng.integers(0, 300, total_turns)
+
+    # 消息级：每轮展开为 用户、AI 两条
+    count = total_turns * 2
+    message_turn = np.repeat(np.arange(total_turns), 2)
+    is_ai = np.tile(np.array([False, True]), total_turns)
+    message_session = turn_session[message_turn]
+
+    # 内容字典：每个主题的模板依次排列，问题在前、回答在后
+    contents = pa.array(
+        [question for topic in topics for question, _ in TOPIC_TEMPLATES[topic]] +
+        [answer for topic in topics for _, answer in TOPIC_TEMPLATES[topic]]
+    )
+    template_index = session_topic[message_session] * templates_per_topic + turn_template[message_turn]
+    content_index = template_index + is_ai * (len(topics) * templates_per_topic)
+
+    timestamps = (
+        np.datetime64(config.start_time, "us")
+        + session_start[message_session].astype("timedelta64[s]")
+        + turn_offset[message_turn].astype("timedelta64[s]")
+        + (is_ai * rng.integers(2, 30, count)).astype("timedelta64[s]")
+    )
+
+    # 评分只给AI回复
+    ratings = rng.choice(np.arange(1, 6), count, p=np.asarray(config.rating_weights) / np.sum(config.rating_weights))
+    rating_mask = ~is_ai | (rng.random(count) < config.unrated_ratio)
+
+    # 片段引用：AI回复从同主题的片段中抽取0~max个
+    fanout = np.where(is_ai, rng.integers(0, config.max_chunks_per_reply + 1, count), 0)
+    offsets = np.concatenate([[0], np.cumsum(fanout)]).astype(np.int32)
+    reference_topic = np.repeat(session_topic[message_session], fanout)
+    per_topic = max(1, config.chunks // len(topics))
+    chunk_positions = reference_topic + len(topics) * rng.integers(0, per_topic, int(offsets[-1]))
+    chunk_positions = np.minimum(chunk_positions, config.chunks - 1)
+    chunk_ids = _prefixed("CH-", chunk_positions + 1, 7)
+
+    session_ids = _prefixed("session_syn_", message_session + 1, 8)
+    message_kind = pa.array(np.where(is_ai, "_ai_", "_user_"))
+    turn_labels = pa.array(turn_number[message_turn] + 1).cast(pa.string())
+    message_suffix = pc.binary_join_element_wise(session_ids, message_kind, turn_labels, "")
+    metadata = pa.array([
+        json.dumps({"topic": topic, "language": "zh-CN", "data_source": "synthetic"}, ensure_ascii=False)
+        for topic in topics
+    ])
+
+    table = pa.table({
+        "conversation_id": pc.binary_join_element_wise(pa.scalar("conv_"), message_suffix, ""),
+        "session_id": pa.DictionaryArray.from_arrays(pa.array(message_session.astype(np.int32)), _prefixed("session_syn_", np.arange(sessions) + 1, 8)),
+        "message_id": pc.binary_join_element_wise(pa.scalar("msg_"), message_suffix, ""),
+        "message_type": pa.DictionaryArray.from_arrays(pa.array(is_ai.astype(np.int32)), pa.array(["user", "assistant"])),
+        "content": pa.DictionaryArray.from_arrays(pa.array(content_index.astype(np.int32)), contents),
+        "model_id": pa.DictionaryArray.from_arrays(pa.array(session_model[message_session].astype(np.int32)), pa.array(model_names)),
+        "timestamp": pa.array(timestamps),
+        "metadata": pa.DictionaryArray.from_arrays(pa.array(session_topic[message_session].astype(np.int32)), metadata),
+        "user_rating": pa.array(ratings, mask=rating_mask),
+        "feedback_text": pa.nulls(count, pa.string()),
+        "token_count": pa.array(rng.integers(10, 800, count)),
+        "processing_time_ms": pa.array(np.where(is_ai, rng.lognormal(7, 0.5, count), rng.integers(50, 500, count)).astype(np.int64)),
+        "retrieval_chunk_ids": pa.ListArray.from_arrays(pa.array(offsets), chunk_ids),
+    })
+    return table
+
+def write_dataset(directory: str, config: SyntheticDataConfig) -> Tuple[int, int]:
+    """生成并写入数据目录，返回 (消息数, 片段数)"""
+    _require_arrow()
+    os.makedirs(directory, exist_ok=True)
+
+    chunks = generate_chunks(config)
+    conversations = generate_conversations(config)
+    for name, table in ((CHUNKS_FILE, chunks), (CONVERSATIONS_FILE, conversations)):
+        with pa.OSFile(os.path.join(directory, name), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=1_000_000)
+
+    logger.info("Synthetic dataset written",
+               directory=directory,
+               conversations_count=conversations.num_rows,
+               chunks_count=chunks.num_rows,
+               seed=config.seed)
+    return conversations.num_rows, chunks.num_rows
+
+def dataset_exists(directory: Optional[str]) -> bool:
+    """数据目录中是否已有完整的数据文件"""
+    return bool(directory) and all(
+        os.path.exists(os.path.join(directory, name)) for name in (CONVERSATIONS_FILE, CHUNKS_FILE)
+    )
+
+def load_dataset(directory: str) -> Tuple["pa.Table", "pa.Table"]:
+    """内存映射数据文件，返回 (对话表, 片段表)；数据页由操作系统按需读入，不复制到堆内存"""
+    _require_arrow()
+    tables = []
+    for name in (CONVERSATIONS_FILE, CHUNKS_FILE):
+        source = pa.memory_map(os.path.join(directory, name), "r")
+        tables.append(pa.ipc.open_file(source).read_all())
+    return tables[0], tables[1]
+
+def _column_matches(column: "pa.ChunkedArray", term: str) -> "pa.ChunkedArray":
+    """列中包含term（不区分大小写）的行，字典编码列只在字典上匹配一次"""
+    chunks = []
+    for chunk in column.chunks:
+        if pa.types.is_dictionary(chunk.type):
+            dictionary_matches = pc.match_substring(chunk.dictionary, term, ignore_case=True)
+            chunks.append(pc.take(dictionary_matches, chunk.indices))
+        else:
+            chunks.append(pc.match_substring(chunk, term, ignore_case=True))
+    return pc.fill_null(pa.chunked_array(chunks, type=pa.bool_()), False)
+
+def keyword_positions(table: "pa.Table", columns: List[str], keywords: str) -> np.ndarray:
+    """
+    在Arrow表上按关键词过滤，返回命中行的位置
+
+    查询语法与倒排索引相同（空格分隔的词为AND，双引号内为短语），按子串匹配；
+    千万级数据不建倒排索引，直接在列上向量化匹配。
+    """
+    mask = None
+    for term in parse_query(keywords):
+        term_mask = None
+        for column in columns:
+            matches = _column_matches(table.column(column), term)
+            term_mask = matches if term_mask is None else pc.or_(term_mask, matches)
+        mask = term_mask if mask is None else pc.and_(mask, term_mask)
+
+    if mask is None:
+        return np.empty(0, dtype=np.int64)
+    return np.flatnonzero(mask.to_numpy())
+
+def embedding_matrix(table: "pa.Table") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    片段表中的embedding列转为float32矩阵
+
+    Returns:
+        (有向量的行位置, 对应的 (n, d) 矩阵)；没有embedding_vector列时均为空
+    """
+    if "embedding_vector" not in table.column_names:
+        return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+
+    column = table.column("embedding_vector").combine_chunks()
+    valid = np.flatnonzero(column.is_valid().to_numpy(zero_copy_only=False))
+    column = column.take(pa.array(valid))
+    if pa.types.is_fixed_size_list(column.type):
+        values = column.flatten().to_numpy(zero_copy_only=False)
+        return valid, values.astype(np.float32, copy=False).reshape(len(valid), column.type.list_size)
+    return valid, np.asarray(column.to_pylist(), dtype=np.float32)
+
+def chunk_references(table: "pa.Table") -> Tuple[np.ndarray, np.ndarray]:
+    """对话表的retrieval_chunk_ids展开为 (对话行位置, 片段ID) 两列"""
+    column = table.column("retrieval_chunk_ids").combine_chunks()
+    rows = pc.list_parent_indices(column).to_numpy()
+    chunk_ids = pc.list_flatten(column).to_numpy(zero_copy_only=False)
+    return rows, chunk_ids
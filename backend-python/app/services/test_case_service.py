@@ -1,7 +1,7 @@
 """测试用例服务"""
-import pandas as pd
+import copy
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from app.models.test_case import (
     TestCase, TestCaseCreate, TestCaseUpdate, BatchOperation,
     TestCaseStatus, PriorityLevel, DifficultyLevel, Tag
@@ -11,29 +11,42 @@ from app.utils.logger import logger
 from app.config import settings
 from app.services.bigquery_test_case_service import BigQueryTestCaseService
 from app.services.base_service import BaseTestCaseService
+from app.services.id_allocator import IdAllocator
+from app.services.test_case_store import TestCaseStore
 
 class MockTestCaseService(BaseTestCaseService):
+    _instance = None
+    _shared_service = None
+
+    def __new__(cls):
+        # 单例：导入任务和测试用例API共享同一份内存数据
+        if cls._instance is None:
+            cls._instance = super(MockTestCaseService, cls).__new__(cls)
+        return cls._instance
+
     def __init__(self):
         """初始化模拟测试用例服务，从内存加载数据"""
         # 如果已经有共享服务实例，直接使用
         if MockTestCaseService._shared_service is not None:
-            self.df = MockTestCaseService._shared_service.df
-            self.id_counter = MockTestCaseService._shared_service.id_counter
+            self.store = MockTestCaseService._shared_service.store
+            self.id_allocator = MockTestCaseService._shared_service.id_allocator
             return
 
-        # 转换演示数据为DataFrame
-        self.df = pd.DataFrame(MOCK_TEST_CASES)
-
-        # 确保日期字段是datetime类型
-        self.df['created_date'] = pd.to_datetime(self.df['metadata'].apply(lambda x: x.get('created_date')), format='ISO8601')
+        # 演示数据加载到带索引的内存存储，按status/priority/domain等筛选时不再扫描全表
+        self.store = TestCaseStore(
+            (copy.deepcopy(tc) for tc in MOCK_TEST_CASES),
+            duplicate_threshold=settings.near_duplicate_threshold,
+            duplicate_num_perm=settings.near_duplicate_num_perm
+        )
 
-        # 生成ID计数器
-        self.id_counter = max(int(tc['id'].split('-')[1]) for tc in MOCK_TEST_CASES)
+        # ID分配器：从演示数据中的最大编号之后开始，数据只在进程内存中，无需计数器文件
+        max_existing = max(int(tc['id'].split('-')[1]) for tc in MOCK_TEST_CASES)
+        self.id_allocator = IdAllocator(prefix="TC", seed=lambda: max_existing)
 
         # 保存为共享实例
         MockTestCaseService._shared_service = self
 
-        logger.info("MockTestCaseService initialized", record_count=len(self.df))
+        logger.info("MockTestCaseService initialized", record_count=len(self.store))
 
     async def get_test_cases(
         self,
@@ -53,67 +66,29 @@ class MockTestCaseService(BaseTestCaseService):
                    priority=priority,
                    search=search)
 
-        filtered_df = self.df.copy()
-
-        # 状态筛选 - 兼容字典和对象两种格式
-        if status:
-            filtered_df = filtered_df[filtered_df['metadata'].apply(lambda x: (
-                getattr(x, 'status', None) if hasattr(x, 'status') else x.get('status')
-            )) == status]
-
-        # 领域筛选
-        if domain:
-            filtered_df = filtered_df[filtered_df['domain'] == domain]
-
-        # 优先级筛选 - 兼容字典和对象两种格式
-        if priority:
-            filtered_df = filtered_df[filtered_df['metadata'].apply(lambda x: (
-                getattr(x, 'priority', None) if hasattr(x, 'priority') else x.get('priority')
-            )) == priority]
-
-        # 搜索
-        if search:
-            search_lower = search.lower()
-            search_mask = (
-                filtered_df['name'].str.lower().str.contains(search_lower, na=False) |
-                filtered_df['description'].str.lower().str.contains(search_lower, na=False)
-            )
-            filtered_df = filtered_df[search_mask]
-
-        # 排序
-        filtered_df = filtered_df.sort_values('created_date', ascending=False)
-
-        # 分页
-        total = len(filtered_df)
-        start_idx = (page - 1) * page_size
-        end_idx = start_idx + page_size
-        page_data = filtered_df.iloc[start_idx:end_idx]
-
-        # 转换为简化的字典格式用于列表显示 - 兼容字典和对象两种格式
-        items = []
-        for _, row in page_data.iterrows():
-            metadata = row["metadata"]
-
-            # 辅助函数，兼容字典和对象两种格式
-            def get_metadata_field(field_name):
-                if hasattr(metadata, field_name):
-                    return getattr(metadata, field_name, None)
-                elif isinstance(metadata, dict):
-                    return metadata.get(field_name)
-                return None
+        records, total = self.store.query(
+            filters={"status": status or None, "domain": domain or None, "priority": priority or None},
+            search=search or None,
+            offset=(page - 1) * page_size,
+            limit=page_size
+        )
 
+        # 转换为简化的字典格式用于列表显示
+        items = []
+        for record in records:
+            metadata = record.get("metadata") or {}
             items.append({
-                "id": row["id"],
-                "name": row["name"],
-                "description": row["description"],
-                "status": get_metadata_field('status'),
-                "owner": get_metadata_field('owner'),
-                "priority": get_metadata_field('priority'),
-                "domain": row["domain"],
-                "difficulty": row["difficulty"],
-                "created_date": get_metadata_field('created_date'),
-                "updated_date": get_metadata_field('updated_date'),
-                "tags": get_metadata_field('tags') or []
+                "id": record["id"],
+                "name": record["name"],
+                "description": record.get("description"),
+                "status": metadata.get('status'),
+                "owner": metadata.get('owner'),
+                "priority": metadata.get('priority'),
+                "domain": record.get("domain"),
+                "difficulty": record.get("difficulty"),
+                "created_date": metadata.get('created_date'),
+                "updated_date": metadata.get('updated_date'),
+                "tags": metadata.get('tags') or []
             })
 
         result = {
@@ -135,17 +110,14 @@ class MockTestCaseService(BaseTestCaseService):
         """根据ID获取测试用例（完整结构）"""
         logger.info("Getting test case by ID", test_case_id=test_case_id)
 
-        test_case_data = self.df[self.df['id'] == test_case_id]
+        record = self.store.get(test_case_id)
 
-        if test_case_data.empty:
+        if record is None:
             logger.warning("Test case not found", test_case_id=test_case_id)
             return None
 
-        # 返回完整的测试用例数据
-        test_case = test_case_data.iloc[0].to_dict()
-
         logger.info("Test case retrieved", test_case_id=test_case_id)
-        return test_case
+        return copy.deepcopy(record)
 
     async def create_test_case(self, request: TestCaseCreate) -> TestCase:
         """创建测试用例"""
@@ -164,10 +136,18 @@ class MockTestCaseService(BaseTestCaseService):
                     )
                     raise ValueError(f"测试用例已存在：源会话ID '{source_session}' 对应的测试用例 '{existing_case['name']}' (ID: {existing_case['id']}) 已存在")
 
-        self.id_counter += 1
-        new_id = f"TC-{self.id_counter:04d}"
+        new_id = await self.id_allocator.next_id()
+        new_test_case = self._build_test_case(request, new_id)
 
-        # 构建metadata结构
+        # 写入存储，索引同步更新
+        self.store.put(new_test_case.model_dump(mode="json"))
+
+        logger.info("Test case created", test_case_id=new_id, name=request.name, source_session=new_test_case.metadata.source_session)
+        return new_test_case
+
+    @staticmethod
+    def _build_test_case(request: TestCaseCreate, new_id: str) -> TestCase:
+        """根据创建请求构建完整的测试用例"""
         from app.models.test_case import TestCaseMetadata
         metadata = TestCaseMetadata(
             status=TestCaseStatus.DRAFT,
@@ -180,7 +160,7 @@ class MockTestCaseService(BaseTestCaseService):
             source_session=getattr(request.metadata, 'source_session', 'import') if hasattr(request, 'metadata') else 'import'
         )
 
-        new_test_case = TestCase(
+        return TestCase(
             id=new_id,
             name=request.name,
             description=request.description,
@@ -193,31 +173,49 @@ class MockTestCaseService(BaseTestCaseService):
             analysis=request.analysis
         )
 
-        # 添加到DataFrame
-        new_row = new_test_case.model_dump()
-        new_df = pd.DataFrame([new_row])
-        self.df = pd.concat([self.df, new_df], ignore_index=True)
-
-        logger.info("Test case created", test_case_id=new_id, name=request.name, source_session=metadata.source_session)
-        return new_test_case
+    async def create_test_cases_bulk(self, requests: List[TestCaseCreate]) -> List[Union[TestCase, Exception]]:
+        """批量创建测试用例：重复检查直接查索引，同批次内的重复同样拦截"""
+        # 先一次性分配ID，之后的检查和写入之间不再让出事件循环
+        new_ids = iter(await self.id_allocator.allocate(len(requests)))
+
+        results: List[Union[TestCase, Exception]] = []
+        created_count = 0
+        for request in requests:
+            source_session = getattr(request.metadata, 'source_session', None) if request.metadata else None
+            existing_id = self.store.id_for_source_session(source_session) if source_session else None
+            if existing_id:
+                results.append(ValueError(
+                    f"测试用例已存在：源会话ID '{source_session}' 对应的测试用例 (ID: {existing_id}) 已存在"
+                ))
+                continue
+
+            new_test_case = self._build_test_case(request, next(new_ids))
+            self.store.put(new_test_case.model_dump(mode="json"))
+            results.append(new_test_case)
+            created_count += 1
+
+        logger.info("Test cases created in bulk",
+                   requested_count=len(requests),
+                   created_count=created_count)
+        return results
 
     async def update_test_case(self, test_case_id: str, request: TestCaseUpdate) -> Optional[TestCase]:
         """更新测试用例"""
         logger.info("Updating test case", test_case_id=test_case_id)
 
         # 查找测试用例
-        idx = self.df[self.df['id'] == test_case_id].index
-        if len(idx) == 0:
+        record = self.store.get(test_case_id)
+        if record is None:
             logger.warning("Test case not found for update", test_case_id=test_case_id)
             return None
 
-        # 更新字段
-        update_data = request.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            self.df.at[idx[0], field] = value
+        # 更新字段（写入新记录，存储据此重建索引）
+        updated = dict(record)
+        updated.update(request.model_dump(mode="json", exclude_unset=True))
 
         # 更新修改时间
-        self.df.at[idx[0], 'updated_date'] = datetime.now()
+        updated['metadata'] = dict(updated.get('metadata') or {}, updated_date=datetime.now().isoformat())
+        self.store.put(updated)
 
         # 返回更新后的测试用例
         return await self.get_test_case_by_id(test_case_id)
@@ -226,9 +224,7 @@ class MockTestCaseService(BaseTestCaseService):
         """删除测试用例"""
         logger.info("Deleting test case", test_case_id=test_case_id)
 
-        initial_count = len(self.df)
-        self.df = self.df[self.df['id'] != test_case_id]
-        deleted = len(self.df) < initial_count
+        deleted = self.store.remove(test_case_id)
 
         if deleted:
             logger.info("Test case deleted", test_case_id=test_case_id)
@@ -246,17 +242,19 @@ class MockTestCaseService(BaseTestCaseService):
         affected_count = 0
 
         if request.action == "delete":
-            initial_count = len(self.df)
-            self.df = self.df[~self.df['id'].isin(request.ids)]
-            affected_count = initial_count - len(self.df)
+            affected_count = sum(1 for test_case_id in request.ids if self.store.remove(test_case_id))
 
         elif request.action == "update_status" and request.data:
             new_status = request.data.get("status")
             if new_status:
-                mask = self.df['id'].isin(request.ids)
-                self.df.loc[mask, 'status'] = new_status
-                self.df.loc[mask, 'updated_date'] = datetime.now()
-                affected_count = mask.sum()
+                now = datetime.now().isoformat()
+                for test_case_id in request.ids:
+                    record = self.store.get(test_case_id)
+                    if record is None:
+                        continue
+                    metadata = dict(record.get('metadata') or {}, status=new_status, updated_date=now)
+                    self.store.put(dict(record, metadata=metadata))
+                    affected_count += 1
 
         logger.info("Batch operation completed",
                    action=request.action,
@@ -268,33 +266,15 @@ class MockTestCaseService(BaseTestCaseService):
         }
 
     async def get_statistics(self) -> Dict[str, Any]:
-        """获取测试用例统计信息"""
+        """获取测试用例统计信息（直接读取索引大小）"""
         logger.info("Getting test case statistics")
 
-        # 提取统计信息，兼容字典和对象两种格式
-        def get_status_value(metadata):
-            if hasattr(metadata, 'status'):
-                return getattr(metadata, 'status', None)
-            elif isinstance(metadata, dict):
-                return metadata.get('status')
-            return None
-
-        def get_priority_value(metadata):
-            if hasattr(metadata, 'priority'):
-                return getattr(metadata, 'priority', None)
-            elif isinstance(metadata, dict):
-                return metadata.get('priority')
-            return None
-
-        status_list = self.df['metadata'].apply(get_status_value)
-        priority_list = self.df['metadata'].apply(get_priority_value)
-
         stats = {
-            "total_count": len(self.df),
-            "status_distribution": status_list.value_counts().to_dict(),
-            "priority_distribution": priority_list.value_counts().to_dict(),
-            "difficulty_distribution": self.df['difficulty'].value_counts().to_dict(),
-            "domain_distribution": self.df['domain'].value_counts().to_dict(),
+            "total_count": len(self.store),
+            "status_distribution": self.store.distribution("status"),
+            "priority_distribution": self.store.distribution("priority"),
+            "difficulty_distribution": self.store.distribution("difficulty"),
+            "domain_distribution": self.store.distribution("domain"),
         }
 
         logger.info("Statistics retrieved", total_count=stats["total_count"])
@@ -304,24 +284,7 @@ class MockTestCaseService(BaseTestCaseService):
         """获取所有标签"""
         logger.info("Getting all tags")
 
-        all_tags = []
-        for metadata in self.df['metadata']:
-            # 兼容字典和对象两种格式获取tags
-            if hasattr(metadata, 'tags'):
-                tags = getattr(metadata, 'tags', [])
-            elif isinstance(metadata, dict):
-                tags = metadata.get('tags', [])
-            else:
-                tags = []
-
-            if isinstance(tags, list):
-                for tag in tags:
-                    if hasattr(tag, 'name'):
-                        all_tags.append(tag.name)
-                    elif isinstance(tag, dict) and 'name' in tag:
-                        all_tags.append(tag['name'])
-
-        unique_tags = sorted(list(set(all_tags)))
+        unique_tags = sorted(self.store.values("tags"))
 
         logger.info("Tags retrieved", tag_count=len(unique_tags))
         return unique_tags
@@ -331,31 +294,18 @@ class MockTestCaseService(BaseTestCaseService):
         logger.info("Getting test cases by source sessions", session_count=len(session_ids))
 
         session_mapping = {}
-
-        for _, row in self.df.iterrows():
-            metadata = row["metadata"]
-
-            # 兼容字典和对象两种格式获取source_session
-            def get_metadata_field(field_name):
-                if hasattr(metadata, field_name):
-                    return getattr(metadata, field_name, None)
-                elif isinstance(metadata, dict):
-                    return metadata.get(field_name)
-                return None
-
-            source_session = get_metadata_field('source_session')
-
-            if source_session in session_ids:
-                # 获取负责人信息
-                owner = get_metadata_field('owner') or 'unknown'
-                created_date = get_metadata_field('created_date') or 'unknown'
-
-                session_mapping[source_session] = {
-                    "test_case_id": row["id"],
-                    "test_case_name": row["name"],
-                    "owner": owner,
-                    "import_date": created_date
-                }
+        for session_id in session_ids:
+            test_case_id = self.store.id_for_source_session(session_id)
+            if test_case_id is None:
+                continue
+            record = self.store.get(test_case_id)
+            metadata = record.get("metadata") or {}
+            session_mapping[session_id] = {
+                "test_case_id": test_case_id,
+                "test_case_name": record["name"],
+                "owner": metadata.get('owner') or 'unknown',
+                "import_date": metadata.get('created_date') or 'unknown'
+            }
 
         logger.info("Found existing test cases for sessions",
                    found_count=len(session_mapping),
@@ -367,53 +317,49 @@ class MockTestCaseService(BaseTestCaseService):
         """根据源会话ID查找测试用例"""
         logger.info("Looking for test case by source session", source_session=source_session)
 
-        for _, row in self.df.iterrows():
-            metadata = row["metadata"]
-            # 兼容字典和对象两种格式获取source_session
-            def get_metadata_field(field_name):
-                if hasattr(metadata, field_name):
-                    return getattr(metadata, field_name, None)
-                elif isinstance(metadata, dict):
-                    return metadata.get(field_name)
-                return None
-
-            existing_source_session = get_metadata_field('source_session')
-            if existing_source_session == source_session:
-                logger.info("Found existing test case for source session",
-                           source_session=source_session,
-                           test_case_id=row["id"],
-                           test_case_name=row["name"])
-                return {
-                    "id": row["id"],
-                    "name": row["name"],
-                    "owner": get_metadata_field('owner') or 'unknown',
-                    "created_date": get_metadata_field('created_date') or 'unknown'
-                }
-
-        logger.info("No existing test case found for source session", source_session=source_session)
-        return None
+        test_case_id = self.store.id_for_source_session(source_session)
+        if test_case_id is None:
+            logger.info("No existing test case found for source session", source_session=source_session)
+            return None
+
+        record = self.store.get(test_case_id)
+        metadata = record.get("metadata") or {}
+        logger.info("Found existing test case for source session",
+                   source_session=source_session,
+                   test_case_id=test_case_id,
+                   test_case_name=record["name"])
+        return {
+            "id": test_case_id,
+            "name": record["name"],
+            "owner": metadata.get('owner') or 'unknown',
+            "created_date": metadata.get('created_date') or 'unknown'
+        }
+
+    async def find_near_duplicates(self, texts: Dict[str, str]) -> Dict[str, List[Dict[str, Any]]]:
+        """查找内容近似重复的已有测试用例（LSH分桶查找，不扫描全部用例）"""
+        matches = {}
+        for key, text in texts.items():
+            similar = self.store.near_duplicates(text)
+            if similar:
+                matches[key] = [
+                    {
+                        "test_case_id": test_case_id,
+                        "test_case_name": self.store.get(test_case_id)["name"],
+                        "similarity": similarity
+                    }
+                    for test_case_id, similarity in similar
+                ]
+
+        logger.info("Near-duplicate check completed",
+                   checked_count=len(texts),
+                   matched_count=len(matches))
+        return matches
 
     async def get_source_session_mapping(self) -> Dict[str, str]:
         """获取所有源会话ID到测试用例ID的映射"""
         logger.info("Getting all source session mappings")
 
-        session_mapping = {}
-
-        for _, row in self.df.iterrows():
-            metadata = row["metadata"]
-
-            # 兼容字典和对象两种格式获取source_session
-            def get_metadata_field(field_name):
-                if hasattr(metadata, field_name):
-                    return getattr(metadata, field_name, None)
-                elif isinstance(metadata, dict):
-                    return metadata.get(field_name)
-                return None
-
-            source_session = get_metadata_field('source_session')
-
-            if source_session and source_session != 'import':  # 排除默认值
-                session_mapping[source_session] = row["id"]
+        session_mapping = self.store.source_session_mapping()
 
         logger.info("Source session mappings retrieved", mapping_count=len(session_mapping))
         return session_mapping
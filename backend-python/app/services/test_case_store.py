@@ -0,0 +1,257 @@
+"""带二级索引的内存测试用例存储"""
+import bisect
+import heapq
+from datetime import datetime, timezone
+from enum import Enum
+from typing import AbstractSet, Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.utils.minhash import MinHashLSH
+from app.utils.text_index import InvertedIndex
+
+def _metadata(record: Dict[str, Any]) -> Dict[str, Any]:
+    return record.get("metadata") or {}
+
+def _tag_names(record: Dict[str, Any]) -> List[str]:
+    names = []
+    for tag in _metadata(record).get("tags") or []:
+        name = tag.get("name") if isinstance(tag, dict) else getattr(tag, "name", None)
+        if name:
+            names.append(name)
+    return names
+
+def near_duplicate_text(query: Optional[str], response: Optional[str]) -> str:
+    """近似重复比较的文本：当前用户问题 + AI回答"""
+    return "\n".join(part for part in (query, response) if part)
+
+def _record_text(record: Dict[str, Any]) -> str:
+    query = ((record.get("input") or {}).get("current_query") or {}).get("text")
+    response = ((record.get("execution") or {}).get("actual") or {}).get("response")
+    return near_duplicate_text(query, response)
+
+# 二级索引：字段名 -> 取值函数（返回该记录在此字段上的全部取值）
+INDEXED_FIELDS: Dict[str, Callable[[Dict[str, Any]], Iterable[Any]]] = {
+    "status": lambda record: [_metadata(record).get("status")],
+    "priority": lambda record: [_metadata(record).get("priority")],
+    "owner": lambda record: [_metadata(record).get("owner")],
+    "domain": lambda record: [record.get("domain")],
+    "difficulty": lambda record: [record.get("difficulty")],
+    "tags": _tag_names,
+}
+
+def _index_key(value: Any) -> Any:
+    # str枚举的哈希与其取值不同，统一转为取值
+    return value.value if isinstance(value, Enum) else value
+
+def _sort_key(record: Dict[str, Any]) -> float:
+    """created_date转为时间戳，不带时区的时间按UTC处理，无法解析时排在最后"""
+    created_date = _metadata(record).get("created_date")
+    if isinstance(created_date, datetime):
+        parsed = created_date
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(created_date).replace("Z", "+00:00"))
+        except ValueError:
+            return 0.0
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+class TestCaseStore:
+    """
+    测试用例内存存储
+
+    记录以字典形式按ID保存；status、priority、owner、domain、difficulty和标签维护
+    值 -> ID集合 的索引，另按created_date维护有序列表。筛选时对索引集合求交，
+    只对命中的记录排序分页，成本为 O(命中数 + 页大小)，不再复制和扫描全表；
+    关键词搜索走name/description的倒排索引，近似重复检测走问题+回答的MinHash LSH索引。
+    """
+
+    def __init__(
+        self,
+        records: Iterable[Dict[str, Any]] = (),
+        duplicate_threshold: float = 0.8,
+        duplicate_num_perm: int = 128
+    ):
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._indexes: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in INDEXED_FIELDS}
+        # (时间戳, ID) 升序，倒序读取即为最新优先
+        self._order: List[Tuple[float, str]] = []
+        self._sort_keys: Dict[str, float] = {}
+        # name + description 倒排索引，用于关键词搜索
+        self._text_index = InvertedIndex()
+        # source_session -> ID，用于导入去重
+        self._source_sessions: Dict[str, str] = {}
+        # 问题 + 回答的MinHash LSH索引，用于发现内容近似重复的会话
+        self._near_duplicates = MinHashLSH(threshold=duplicate_threshold, num_perm=duplicate_num_perm)
+
+        # 批量加载时先建索引，最后整体排序一次
+        for record in records:
+            self._add(record)
+            self._order.append((self._sort_keys[record["id"]], record["id"]))
+        self._order.sort()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, test_case_id: str) -> bool:
+        return test_case_id in self._records
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def put(self, record: Dict[str, Any]):
+        """新增或替换记录并更新所有索引"""
+        test_case_id = record["id"]
+        if test_case_id in self._records:
+            self._unindex(test_case_id)
+
+        self._add(record)
+        bisect.insort(self._order, (self._sort_keys[test_case_id], test_case_id))
+
+    def _add(self, record: Dict[str, Any]):
+        """写入记录及除有序列表外的索引"""
+        test_case_id = record["id"]
+        self._records[test_case_id] = record
+
+        for field, extract in INDEXED_FIELDS.items():
+            index = self._indexes[field]
+            for value in extract(record):
+                if value is not None:
+                    index.setdefault(_index_key(value), set()).add(test_case_id)
+
+        self._sort_keys[test_case_id] = _sort_key(record)
+
+        self._text_index.add(test_case_id, record.get('name'), record.get('description'))
+        self._near_duplicates.add(test_case_id, _record_text(record))
+
+        source_session = _metadata(record).get("source_session")
+        if source_session and source_session != "import":
+            self._source_sessions[source_session] = test_case_id
+
+    def remove(self, test_case_id: str) -> bool:
+        """删除记录，不存在时返回False"""
+        if test_case_id not in self._records:
+            return False
+        self._unindex(test_case_id)
+        del self._records[test_case_id]
+        return True
+
+    def _unindex(self, test_case_id: str):
+        record = self._records[test_case_id]
+
+        for field, extract in INDEXED_FIELDS.items():
+            index = self._indexes[field]
+            for value in extract(record):
+                if value is None:
+                    continue
+                key = _index_key(value)
+                ids = index.get(key)
+                if ids is not None:
+                    ids.discard(test_case_id)
+                    if not ids:
+                        del index[key]
+
+        entry = (self._sort_keys.pop(test_case_id), test_case_id)
+        position = bisect.bisect_left(self._order, entry)
+        if position < len(self._order) and self._order[position] == entry:
+            del self._order[position]
+
+        self._text_index.remove(test_case_id)
+        self._near_duplicates.remove(test_case_id)
+
+        source_session = _metadata(record).get("source_session")
+        if source_session and self._source_sessions.get(source_session) == test_case_id:
+            del self._source_sessions[source_session]
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def get(self, test_case_id: str) -> Optional[Dict[str, Any]]:
+        """根据ID获取记录"""
+        return self._records.get(test_case_id)
+
+    def query(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        search: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 20
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        按索引字段筛选并按created_date倒序分页
+
+        Args:
+            filters: 索引字段 -> 取值，值为None的条件忽略
+            search: name/description关键词，空格分隔的词之间为AND，双引号内为短语
+            offset: 跳过的记录数
+            limit: 返回的最大记录数
+
+        Returns:
+            (当前页记录, 命中总数)
+        """
+        conditions = {field: value for field, value in (filters or {}).items() if value is not None}
+        for field in conditions:
+            if field not in self._indexes:
+                raise ValueError(f"字段 {field} 没有索引")
+
+        end = offset + limit
+
+        if not conditions and not search:
+            total = len(self._order)
+            # 有序列表倒序切片
+            stop = max(total - end, 0)
+            start = total - offset
+            page_ids = [test_case_id for _, test_case_id in reversed(self._order[stop:start])] if start > stop else []
+            return [self._records[test_case_id] for test_case_id in page_ids], total
+
+        # 从最小的索引集合开始求交
+        candidate_sets = sorted(
+            (self._indexes[field].get(_index_key(value), set()) for field, value in conditions.items()),
+            key=len
+        )
+        if candidate_sets:
+            candidates: Iterable[str] = candidate_sets[0].intersection(*candidate_sets[1:])
+        else:
+            candidates = self._records.keys()
+
+        if search:
+            candidates = self._text_index.search(search, candidates if candidate_sets else None)
+
+        total = len(candidates)
+        if total * total > end * len(self._order):
+            # 命中比例高：沿有序列表倒序查找，期望只需走 end * N / 命中数 步
+            matched = candidates if isinstance(candidates, AbstractSet) else set(candidates)
+            ordered = []
+            for _, test_case_id in reversed(self._order):
+                if test_case_id in matched:
+                    ordered.append(test_case_id)
+                    if len(ordered) >= end:
+                        break
+        else:
+            keyed = [(self._sort_keys[test_case_id], test_case_id) for test_case_id in candidates]
+            top = heapq.nlargest(end, keyed) if end < total else sorted(keyed, reverse=True)
+            ordered = [test_case_id for _, test_case_id in top]
+
+        return [self._records[test_case_id] for test_case_id in ordered[offset:end]], total
+
+    def distribution(self, field: str) -> Dict[Any, int]:
+        """索引字段各取值的记录数"""
+        return {value: len(ids) for value, ids in self._indexes[field].items()}
+
+    def values(self, field: str) -> List[Any]:
+        """索引字段的全部取值"""
+        return list(self._indexes[field].keys())
+
+    def near_duplicates(self, text: str) -> List[Tuple[str, float]]:
+        """内容与text近似重复的测试用例 [(ID, 估计相似度)]，按相似度降序"""
+        return self._near_duplicates.query(text)
+
+    def id_for_source_session(self, source_session: str) -> Optional[str]:
+        """根据源会话ID获取测试用例ID"""
+        return self._source_sessions.get(source_session)
+
+    def source_session_mapping(self) -> Dict[str, str]:
+        """全部 源会话ID -> 测试用例ID 映射（副本）"""
+        return dict(self._source_sessions)
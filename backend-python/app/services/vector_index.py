@@ -0,0 +1,175 @@
+"""本地向量索引：float32矩阵上的精确检索与IVF近似检索"""
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.logger import logger
+
+# 向量数超过该值时相似检索改用IVF近似索引
+SIMILARITY_IVF_THRESHOLD = 20000
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """按行L2归一化（零向量保持为零），返回float32矩阵"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """得分最高的k个下标（按得分降序）"""
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+def group_sums(vectors: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+    """按组号对向量求和，返回 (n_groups, d)；排序后用reduceat，比np.add.at快一个数量级"""
+    sums = np.zeros((n_groups, vectors.shape[1]), dtype=np.float32)
+    if len(groups) == 0:
+        return sums
+    order = np.argsort(groups, kind="stable")
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    sums[sorted_groups[starts]] = np.add.reduceat(vectors[order], starts, axis=0)
+    return sums
+
+class VectorIndex:
+    """
+    余弦相似度向量索引
+
+    向量归一化后按行存放在一个连续的float32矩阵中，精确检索为一次矩阵-向量乘
+    （BLAS的SIMD实现），复杂度O(N·d)。调用train_ivf后改为IVF近似检索：k-means将
+    向量划分为n_lists个簇，查询只扫描与查询最接近的nprobe个簇。
+    """
+
+    def __init__(self, ids: Sequence[str], vectors: np.ndarray):
+        """
+        初始化索引
+
+        Args:
+            ids: 向量对应的ID，与vectors的行一一对应
+            vectors: (N, d) 矩阵
+        """
+        if len(ids) != len(vectors):
+            raise ValueError("ids and vectors must have the same length")
+
+        self.ids = list(ids)
+        self.matrix = normalize_rows(vectors)
+        self._positions = {item_id: position for position, item_id in enumerate(self.ids)}
+
+        # IVF结构：簇中心、按簇排列的行号及每个簇在其中的起止位置
+        self.centroids: Optional[np.ndarray] = None
+        self._list_rows: Optional[np.ndarray] = None
+        self._list_offsets: Optional[np.ndarray] = None
+        self.default_nprobe = 1
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1] if self.matrix.ndim == 2 else 0
+
+    def vector(self, item_id: str) -> Optional[np.ndarray]:
+        """获取ID对应的（归一化）向量视图"""
+        position = self._positions.get(item_id)
+        return self.matrix[position] if position is not None else None
+
+    def train_ivf(
+        self,
+        n_lists: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        iterations: int = 10,
+        sample_size: int = 50000,
+        seed: int = 0
+    ):
+        """
+        训练IVF划分
+
+        Args:
+            n_lists: 簇数，默认约为 sqrt(N)
+            nprobe: 默认查询的簇数，默认约为 n_lists / 16
+            iterations: k-means迭代次数
+            sample_size: 训练样本数上限，训练后再将全部向量分配到最近的簇
+            seed: 随机种子
+        """
+        count = len(self.ids)
+        if count == 0:
+            return
+
+        rng = np.random.default_rng(seed)
+        sample = self.matrix[rng.choice(count, min(sample_size, count), replace=False)]
+        n_lists = max(1, min(n_lists or int(np.sqrt(count)), len(sample)))
+
+        # 球面k-means：按内积分配，中心取均值后重新归一化
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            sums = group_sums(sample, self._assign(sample, centroids), n_lists)
+            empty = ~sums.any(axis=1)
+            # 空簇保留原中心
+            sums[empty] = centroids[empty]
+            centroids = normalize_rows(sums)
+
+        assignment = self._assign(self.matrix, centroids)
+        order = np.argsort(assignment, kind="stable")
+        self.centroids = centroids
+        self._list_rows = order
+        self._list_offsets = np.searchsorted(assignment[order], np.arange(n_lists + 1))
+        self.default_nprobe = max(1, nprobe or n_lists // 16)
+
+        logger.info("IVF index trained", vectors=count, n_lists=n_lists, nprobe=self.default_nprobe)
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+        """分批计算每个向量最近的簇，避免 N x n_lists 的得分矩阵占用过多内存"""
+        assignment = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), batch_size):
+            assignment[start:start + batch_size] = np.argmax(vectors[start:start + batch_size] @ centroids.T, axis=1)
+        return assignment
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        nprobe: Optional[int] = None,
+        exact: bool = False,
+        exclude: Sequence[str] = ()
+    ) -> List[Tuple[str, float]]:
+        """
+        查询与query最相似的k个向量
+
+        Args:
+            query: 查询向量，无需预先归一化
+            k: 返回数量
+            nprobe: IVF查询的簇数，默认使用训练时的设置
+            exact: 为True时即使已训练IVF也做精确检索
+            exclude: 不参与返回的ID（如查询自身）
+
+        Returns:
+            [(ID, 余弦相似度)]，按相似度降序
+        """
+        if len(self.ids) == 0 or k <= 0:
+            return []
+
+        query = normalize_rows(query)
+        wanted = k + len(exclude)
+
+        if self.centroids is None or exact:
+            rows = None
+            scores = self.matrix @ query
+        else:
+            probes = _top_k(self.centroids @ query, min(nprobe or self.default_nprobe, len(self.centroids)))
+            rows = np.concatenate([
+                self._list_rows[self._list_offsets[probe]:self._list_offsets[probe + 1]] for probe in probes
+            ])
+            scores = self.matrix[rows] @ query
+
+        excluded = set(exclude)
+        results = []
+        for index in _top_k(scores, wanted):
+            item_id = self.ids[rows[index] if rows is not None else index]
+            if item_id in excluded:
+                continue
+            results.append((item_id, float(scores[index])))
+            if len(results) >= k:
+                break
+        return results
@@ -0,0 +1,171 @@
+"""MinHash签名与LSH分桶索引，用于近似重复文本检测"""
+import re
+import zlib
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+# 2^31-1：32位分片哈希乘以系数后仍在uint64范围内
+_PRIME = np.uint64((1 << 31) - 1)
+# 去除空白、标点和下划线，只保留文字和数字
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+def normalize_text(text: Optional[str]) -> str:
+    """统一小写并去除空白和标点，使仅格式不同的文本得到相同的分片"""
+    return _NON_WORD.sub("", (text or "").lower())
+
+def shingles(text: Optional[str], size: int = 3) -> Set[str]:
+    """字符n-gram分片（中英文通用），短于size的文本整体作为一个分片"""
+    normalized = normalize_text(text)
+    if len(normalized) <= size:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    选择 (band数, 每band行数)
+
+    取相似度拐点 (1/b)^(1/r) 不超过阈值的最大者：拐点偏低时多出的候选会被签名相似度过滤掉，
+    偏高则会漏掉相似度刚过阈值的文档（如128维、阈值0.8时，8x16在0.8处的召回约20%，16x8约95%）。
+    """
+    candidates = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+
+    def knee(pair: Tuple[int, int]) -> float:
+        return (1 / pair[0]) ** (1 / pair[1])
+
+    below = [pair for pair in candidates if knee(pair) <= threshold]
+    return max(below, key=knee) if below else min(candidates, key=knee)
+
+class MinHashLSH:
+    """
+    MinHash + LSH 近似重复索引
+
+    每个文档取字符分片的MinHash签名（num_perm个哈希函数的最小值），签名切成若干band，
+    每个band的取值作为分桶键。查询只比较至少有一个band完全相同的候选文档，
+    再用签名估计的Jaccard相似度过滤，单次查询成本与索引规模无关。支持增量增删。
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        """
+        初始化索引
+
+        Args:
+            threshold: 判定为近似重复的Jaccard相似度下限
+            num_perm: 签名长度（哈希函数数量）
+            shingle_size: 字符分片长度
+            seed: 哈希函数的随机种子，相同种子的签名可以互相比较
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+
+        self._buckets: List[Dict[bytes, Set[Hashable]]] = [{} for _ in range(self.bands)]
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._signatures
+
+    def signature(self, text: Optional[str]) -> Optional[np.ndarray]:
+        """计算MinHash签名，文本没有可用分片时返回None"""
+        grams = shingles(text, self.shingle_size)
+        if not grams:
+            return None
+        hashes = np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams))
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        rows = self.rows
+        return [signature[band * rows:(band + 1) * rows].tobytes() for band in range(self.bands)]
+
+    def add(self, key: Hashable, text: Optional[str] = None, signature: Optional[np.ndarray] = None) -> bool:
+        """索引文档（可直接提供已计算的签名），已存在的键先移除；文本为空时不索引并返回False"""
+        self.remove(key)
+        if signature is None:
+            signature = self.signature(text)
+        if signature is None:
+            return False
+
+        self._signatures[key] = signature
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            buckets.setdefault(band_key, set()).add(key)
+        return True
+
+    def remove(self, key: Hashable) -> bool:
+        """移除文档，不存在时返回False"""
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return False
+
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            keys = buckets.get(band_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del buckets[band_key]
+        return True
+
+    def query(
+        self,
+        text: Optional[str] = None,
+        signature: Optional[np.ndarray] = None,
+        exclude: Iterable[Hashable] = ()
+    ) -> List[Tuple[Hashable, float]]:
+        """
+        查找近似重复的文档
+
+        Args:
+            text: 查询文本
+            signature: 已计算的签名，提供时忽略text
+            exclude: 不参与返回的键
+
+        Returns:
+            [(键, 估计的Jaccard相似度)]，相似度不低于阈值，按相似度降序
+        """
+        if signature is None:
+            signature = self.signature(text)
+        if signature is None:
+            return []
+
+        candidates: Set[Hashable] = set()
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(buckets.get(band_key, ()))
+        candidates.difference_update(exclude)
+
+        matches = []
+        for key in candidates:
+            similarity = float(np.mean(self._signatures[key] == signature))
+            if similarity >= self.threshold:
+                matches.append((key, similarity))
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
+
+def first_occurrences(index: MinHashLSH, texts: Dict[Hashable, str]) -> Dict[Hashable, Tuple[Hashable, float]]:
+    """
+    按顺序找出一批文本中的近似重复
+
+    Args:
+        index: 空的临时索引（决定阈值和签名长度），扫描过程中写入未重复的文本
+        texts: 键 -> 文本，按顺序处理
+
+    Returns:
+        近似重复的键 -> (排在前面的近似键, 相似度)；同一组近似文本都指向组内第一个
+    """
+    duplicates = {}
+    for key, text in texts.items():
+        signature = index.signature(text)
+        if signature is None:
+            continue
+        similar = index.query(signature=signature)
+        if similar:
+            duplicates[key] = similar[0]
+        else:
+            index.add(key, signature=signature)
+    return duplicates
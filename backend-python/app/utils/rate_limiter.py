@@ -0,0 +1,49 @@
+"""异步令牌桶限流器"""
+import asyncio
+import time
+from typing import Callable, Optional
+
+class RateLimiter:
+    """令牌桶限流器，rate为每秒允许的操作数，rate<=0时不限流"""
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        初始化限流器
+
+        Args:
+            rate: 每秒补充的令牌数
+            burst: 桶容量（允许的突发数），默认等于rate
+            clock: 单调时钟，便于替换
+        """
+        self.rate = rate
+        self.capacity = max(1.0, float(burst if burst is not None else rate))
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated_at = clock()
+        # 锁保证等待者按到达顺序获取令牌
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self):
+        """获取一个令牌，令牌不足时等待"""
+        if self.rate <= 0:
+            return
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
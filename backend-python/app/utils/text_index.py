@@ -0,0 +1,140 @@
+"""
+支持中英文混合文本的增量倒排索引
+
+所有关键词检索后端使用同一语义：不区分大小写的子串匹配，空格分隔的词之间为AND，
+双引号内为短语。与真实BigQuery的 LIKE '%词%' 及大数据量Mock的列上子串匹配一致。
+"""
+import re
+from typing import Dict, Hashable, Iterable, List, Optional, Set
+
+# 中日韩统一表意文字及扩展A、兼容区、假名、谚文
+_CJK = "぀-ヿ㐀-䶿一-鿿가-힯豈-﫿"
+_TOKEN_PATTERN = re.compile(f"[{_CJK}]+|[^\\W_{_CJK}]+", re.UNICODE)
+_CJK_PATTERN = re.compile(f"[{_CJK}]")
+# 双引号内为短语，其余按空白切分
+_QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+# 拉丁字母/数字切分的字符n-gram长度，短于该长度的词无法用索引缩小候选
+_NGRAM = 3
+
+def normalize(text: Optional[str]) -> str:
+    """统一小写，便于大小写不敏感匹配"""
+    return (text or "").lower()
+
+def tokenize(text: str) -> List[str]:
+    """
+    切分词元：中日韩文本切为单字和相邻二字组合，拉丁字母/数字切为三字符组合
+
+    单字保证单个汉字的查询可以命中，二字组合使多字词的查询只需对少量候选做校验；
+    拉丁文按n-gram而不是整词索引，单词内部的子串（如 act 之于 react）同样可以命中。
+    """
+    tokens = []
+    for run in _TOKEN_PATTERN.findall(normalize(text)):
+        if _CJK_PATTERN.match(run):
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            # 短于n-gram的拉丁词不产生词元，查询时同样不使用索引
+            tokens.extend(run[i:i + _NGRAM] for i in range(len(run) - _NGRAM + 1))
+    return tokens
+
+def _query_tokens(term: str) -> List[str]:
+    """
+    查询词元：中日韩部分只取二字组合（单字查询除外），拉丁部分取三字符组合
+
+    短于三个字符的拉丁词可能是更长单词的一部分，不产生词元，只在候选文档上做子串校验。
+    """
+    tokens = []
+    for run in _TOKEN_PATTERN.findall(term):
+        if _CJK_PATTERN.match(run) and len(run) > 1:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        elif _CJK_PATTERN.match(run):
+            tokens.append(run)
+        elif len(run) >= _NGRAM:
+            tokens.extend(run[i:i + _NGRAM] for i in range(len(run) - _NGRAM + 1))
+    return tokens
+
+def parse_query(query: str) -> List[str]:
+    """解析查询：双引号内为短语，其余空白分隔的词之间为AND关系"""
+    terms = []
+    for phrase, word in _QUERY_PATTERN.findall(normalize(query)):
+        term = (phrase or word).strip()
+        if term:
+            terms.append(term)
+    return terms
+
+class InvertedIndex:
+    """
+    增量倒排索引
+
+    每个文档保存 词元 -> 文档ID集合 的倒排表及归一化后的原文。查询时每个词或短语
+    先对其词元的倒排表求交（从最短的开始），再在候选文档原文上做子串校验，
+    因此结果与逐行 contains（LIKE '%词%'）一致，耗时只与候选文档数相关。
+    没有可用词元的查询（如两个字母的词、纯符号）退化为对全部候选逐个校验。
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[Hashable]] = {}
+        self._texts: Dict[Hashable, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def __contains__(self, doc_id: Hashable) -> bool:
+        return doc_id in self._texts
+
+    def add(self, doc_id: Hashable, *fields: Optional[str]):
+        """索引文档，多个字段以换行分隔，已存在的文档先移除再重新索引"""
+        if doc_id in self._texts:
+            self.remove(doc_id)
+
+        text = "\n".join(normalize(field) for field in fields)
+        self._texts[doc_id] = text
+        for token in set(tokenize(text)):
+            self._postings.setdefault(token, set()).add(doc_id)
+
+    def remove(self, doc_id: Hashable) -> bool:
+        """移除文档，不存在时返回False"""
+        text = self._texts.pop(doc_id, None)
+        if text is None:
+            return False
+
+        for token in set(tokenize(text)):
+            doc_ids = self._postings.get(token)
+            if doc_ids is not None:
+                doc_ids.discard(doc_id)
+                if not doc_ids:
+                    del self._postings[token]
+        return True
+
+    def search(self, query: str, candidates: Optional[Iterable[Hashable]] = None) -> Set[Hashable]:
+        """
+        查询同时包含所有词/短语的文档
+
+        Args:
+            query: 查询字符串，如 `投资 风险` 或 `"react router"`
+            candidates: 限定的候选文档，为None时在全部文档中查询
+
+        Returns:
+            命中的文档ID集合；查询为空时返回空集合
+        """
+        terms = parse_query(query)
+        if not terms:
+            return set()
+
+        # 所有词的词元合并求交，词元越少的倒排表越先参与
+        tokens = {token for term in terms for token in _query_tokens(term)}
+        if tokens:
+            postings = sorted((self._postings.get(token, set()) for token in tokens), key=len)
+            result = set(postings[0])
+            if candidates is not None:
+                result.intersection_update(candidates)
+            for doc_ids in postings[1:]:
+                if not result:
+                    break
+                result.intersection_update(doc_ids)
+        else:
+            result = set(self._texts if candidates is None else candidates) & self._texts.keys()
+
+        # 词元只说明各片段出现过，子串校验排除片段分散出现的文档
+        texts = self._texts
+        return {doc_id for doc_id in result if all(term in texts[doc_id] for term in terms)}
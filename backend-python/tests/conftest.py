@@ -0,0 +1,56 @@
+"""测试公共配置：使用Mock服务，SQLite任务库和ID计数器写入临时目录"""
+import copy
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+# 须在导入app之前设置，Settings在导入时读取环境变量
+_DATA_DIR = tempfile.mkdtemp(prefix="talktrace-tests-")
+os.environ["BIGQUERY_USE_MOCK"] = "true"
+os.environ["BIGQUERY_USE_REAL_TEST_CASES"] = "false"
+os.environ["IMPORT_TASK_DB_PATH"] = os.path.join(_DATA_DIR, "import_tasks.db")
+os.environ["TEST_CASE_ID_COUNTER_PATH"] = os.path.join(_DATA_DIR, "test_case_id.counter")
+
+def iso_z(value: datetime) -> str:
+    """与前端相同的时间格式：UTC毫秒精度，以Z结尾"""
+    return value.astimezone(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+@pytest.fixture
+def search_window():
+    """覆盖全部Mock数据的时间范围（Z结尾的ISO字符串）"""
+    now = datetime.now(timezone.utc)
+    return {"startTime": iso_z(now - timedelta(days=365)), "endTime": iso_z(now + timedelta(days=1))}
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def make_test_case():
+    """以演示用例为模板构造TestCaseCreate，可替换问题、回答和源会话"""
+    from app.models.test_case import TestCaseCreate
+    from app.services.demo_data import MOCK_TEST_CASES
+
+    def make(name="测试用例", query=None, response=None, source_session=None):
+        template = copy.deepcopy(MOCK_TEST_CASES[0])
+        if query is not None:
+            template["input"]["current_query"]["text"] = query
+        if response is not None:
+            template["execution"]["actual"]["response"] = response
+        return TestCaseCreate(
+            name=name,
+            owner=template["metadata"]["owner"],
+            domain=template["domain"],
+            test_config=template["test_config"],
+            input=template["input"],
+            execution=template["execution"],
+            metadata=dict(template["metadata"], source_session=source_session) if source_session else None
+        )
+
+    return make
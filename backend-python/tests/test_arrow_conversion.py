@@ -0,0 +1,62 @@
+"""Arrow会话汇总测试：列上分组的结果与逐行构建对象后汇总一致"""
+import numpy as np
+import pyarrow as pa
+
+from app.services.arrow_conversion import conversations_from_arrow, session_summaries_from_arrow
+from app.services.synthetic_data import SyntheticDataConfig, generate_conversations
+
+def _naive_summaries(table, session_ids):
+    """逐行构建ConversationRow后按会话汇总"""
+    rows = conversations_from_arrow(table)
+    summaries = []
+    for session_id in session_ids:
+        messages = [row for row in rows if row.session_id == session_id]
+        if not messages:
+            continue
+        user_messages = [row for row in messages if row.message_type == "user"]
+        ai_messages = [row for row in messages if row.message_type == "assistant"]
+        last_response = ai_messages[-1] if ai_messages else None
+        summaries.append({
+            "session_id": session_id,
+            "model_id": last_response.model_id if last_response else messages[0].model_id,
+            "user_query": user_messages[0].content if user_messages else "",
+            "ai_response": last_response.content if last_response else "",
+            "user_rating": last_response.user_rating if last_response else None,
+            "created_at": messages[0].timestamp,
+            "last_message_at": messages[-1].timestamp,
+            "message_count": len(messages),
+            "retrieval_chunk_ids": list(dict.fromkeys(
+                chunk_id for row in messages for chunk_id in row.retrieval_chunk_ids
+            )),
+        })
+    return summaries
+
+def _table():
+    return generate_conversations(SyntheticDataConfig(sessions=20, chunks=30, max_chunks_per_reply=4, seed=3))
+
+def test_summaries_match_row_based_summaries():
+    table = _table()
+    session_ids = [str(session_id) for session_id in table.column("session_id").unique().to_pylist()[:6]]
+    # 会话交错存放，并混入不在本页的会话
+    rows = np.flatnonzero(np.isin(np.asarray(table.column("session_id").to_pylist()), session_ids[:8]))
+    rng = np.random.default_rng(0)
+    shuffled = np.sort(rng.permutation(np.arange(table.num_rows))[:table.num_rows // 2])
+    page = table.take(pa.array(np.union1d(rows, shuffled)))
+
+    summaries = session_summaries_from_arrow(page, session_ids)
+    assert [summary.model_dump() for summary in summaries] == _naive_summaries(page, session_ids)
+
+def test_session_without_user_message_or_reply():
+    table = _table()
+    session_id = table.column("session_id")[0].as_py()
+    positions = np.flatnonzero(np.asarray(table.column("session_id").to_pylist()) == session_id)
+    is_ai = np.asarray(table.column("message_type").to_pylist())[positions] == "assistant"
+
+    for subset in (positions[is_ai], positions[~is_ai]):
+        page = table.take(pa.array(subset))
+        summaries = session_summaries_from_arrow(page, [session_id, "missing"])
+        assert [summary.model_dump() for summary in summaries] == _naive_summaries(page, [session_id, "missing"])
+
+def test_empty_page():
+    table = _table()
+    assert session_summaries_from_arrow(table.slice(0, 0), ["s1"]) == []
@@ -0,0 +1,58 @@
+"""EmbeddingStore测试：按ID存取、原地覆盖、扩容和只读视图"""
+import numpy as np
+import pytest
+
+from app.services.embedding_store import EmbeddingStore
+
+def test_add_and_take_vectors():
+    store = EmbeddingStore(capacity=1)
+    store.add(["a", "b"], np.array([[1, 2], [3, 4]]))
+    store.add(["c"], np.array([[5, 6]]))
+
+    assert len(store) == 3
+    assert store.dim == 2
+    assert store.matrix.dtype == np.float32
+    np.testing.assert_array_equal(store.get("b"), [3, 4])
+
+    ids, matrix = store.take(["c", "missing", "a"])
+    assert ids == ["c", "a"]
+    np.testing.assert_array_equal(matrix, [[5, 6], [1, 2]])
+    np.testing.assert_array_equal(store.rows(["a", "missing"]), [0, -1])
+
+def test_existing_ids_are_overwritten_in_place():
+    store = EmbeddingStore()
+    store.add(["a", "b"], np.zeros((2, 3)))
+    store.add(["b", "c"], np.ones((2, 3)))
+
+    assert store.ids == ["a", "b", "c"]
+    np.testing.assert_array_equal(store.matrix, [[0, 0, 0], [1, 1, 1], [1, 1, 1]])
+    assert store.nbytes == 3 * 3 * 4
+
+def test_dimension_mismatch_is_rejected():
+    store = EmbeddingStore()
+    store.add(["a"], np.zeros((1, 4)))
+    with pytest.raises(ValueError):
+        store.add(["b"], np.zeros((1, 3)))
+
+def test_views_are_read_only():
+    store = EmbeddingStore()
+    store.add(["a"], np.zeros((1, 2)))
+    with pytest.raises(ValueError):
+        store.get("a")[0] = 1
+    with pytest.raises(ValueError):
+        store.matrix[0, 0] = 1
+
+def test_from_matrix_shares_memory_and_copies_on_growth():
+    matrix = np.arange(6, dtype=np.float32).reshape(3, 2)
+    store = EmbeddingStore.from_matrix(["a", "b", "c"], matrix)
+
+    assert np.shares_memory(store.matrix, matrix)
+    store.add(["d"], np.array([[9, 9]]))
+    np.testing.assert_array_equal(store.get("c"), [4, 5])
+    np.testing.assert_array_equal(store.get("d"), [9, 9])
+    # 扩容后写入新矩阵，原矩阵不变
+    np.testing.assert_array_equal(matrix, np.arange(6).reshape(3, 2))
+
+def test_from_matrix_requires_matching_ids():
+    with pytest.raises(ValueError):
+        EmbeddingStore.from_matrix(["a"], np.zeros((2, 2)))
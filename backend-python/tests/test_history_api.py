@@ -0,0 +1,132 @@
+"""历史记录API测试（时间参数使用前端发送的Z结尾ISO格式）"""
+import asyncio
+import json
+
+def test_sample_accepts_utc_timestamps(client, search_window):
+    response = client.get("/api/v1/history/search", params={**search_window, "sample": 5})
+
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert 0 < len(data["items"]) <= 5
+    assert data["sampling"]["strategy"] == "stratified"
+
+def test_sample_is_reproducible_with_seed(client, search_window):
+    params = {**search_window, "sample": 5, "seed": 7}
+    first = client.get("/api/v1/history/search", params=params).json()["data"]
+    second = client.get("/api/v1/history/search", params=params).json()["data"]
+
+    assert [item["session_id"] for item in first["items"]] == [item["session_id"] for item in second["items"]]
+
+def test_export_streams_ndjson(client, search_window):
+    response = client.get("/api/v1/history/export", params={**search_window, "limit": 7})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.splitlines()
+    assert 0 < len(lines) <= 7
+    assert all(json.loads(line)["conversation_id"] for line in lines)
+
+def test_export_failure_returns_error_status(client, search_window, monkeypatch):
+    from app.api.v1 import history
+
+    async def failing_stream(request, page_size=None):
+        raise RuntimeError("backend unavailable")
+        yield  # pragma: no cover
+
+    monkeypatch.setattr(history.history_service.bigquery_service, "stream_conversations", failing_stream)
+    response = client.get("/api/v1/history/export", params=search_window)
+
+    assert response.status_code == 500
+
+def test_search_paginates_sessions_with_cursor(client, search_window):
+    params = {**search_window, "pageSize": 10}
+    page = client.get("/api/v1/history/search", params=params).json()["data"]
+    total = page["total"]
+    assert page["next_cursor"] is not None
+
+    session_ids = [item["session_id"] for item in page["items"]]
+    while page["next_cursor"]:
+        response = client.get("/api/v1/history/search", params={**params, "cursor": page["next_cursor"]})
+        assert response.status_code == 200
+        page = response.json()["data"]
+        assert page["total"] == total
+        session_ids.extend(item["session_id"] for item in page["items"])
+
+    # 每个会话只出现在一页上，总数按会话计
+    assert len(session_ids) == len(set(session_ids)) == total
+
+def test_cursor_page_does_not_fall_back_to_demo_data(client, search_window, monkeypatch):
+    from app.api.v1 import history
+
+    first_page = client.get("/api/v1/history/search", params={**search_window, "pageSize": 5}).json()["data"]
+
+    async def failing_query(request):
+        raise RuntimeError("backend unavailable")
+
+    monkeypatch.setattr(history.history_service.bigquery_service, "query_sessions_with_total", failing_query)
+    response = client.get(
+        "/api/v1/history/search",
+        params={**search_window, "pageSize": 5, "cursor": first_page["next_cursor"]}
+    )
+
+    assert response.status_code == 500
+
+def test_invalid_cursor_is_rejected(client, search_window):
+    response = client.get("/api/v1/history/search", params={**search_window, "cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
+
+def test_sample_over_scan_limit_covers_whole_window(client, search_window, monkeypatch):
+    from app.api.v1 import history
+    from app.config import settings
+    from app.services.bigquery_service import ConversationQueryRequest
+
+    service = history.history_service.bigquery_service
+    full = ConversationQueryRequest(message_types=["assistant"], limit=100000)
+    total = asyncio.run(service.count_conversations(full))
+    monkeypatch.setattr(settings, "history_sample_max_messages", total // 4)
+
+    data = client.get("/api/v1/history/search", params={**search_window, "sample": 5, "seed": 3}).json()["data"]
+    assert 0 < data["sampling"]["messages_scanned"] < total
+    assert 0 < len(data["items"]) <= 5
+
+    # 哈希抽取的会话分布在整个时间范围内，而不是最早的一段
+    subset = full.model_copy(update={"session_sample_rate": 0.25, "session_sample_seed": 3})
+    kept = asyncio.run(service.query_conversations(subset))
+    everything = asyncio.run(service.query_conversations(full))
+    kept_times = sorted(conv.timestamp for conv in kept)
+    all_times = sorted(conv.timestamp for conv in everything)
+    assert kept_times[-1] > all_times[len(all_times) * 3 // 4]
+
+def test_near_duplicate_filter_reports_removed_sessions(client, search_window):
+    params = {**search_window, "pageSize": 20}
+    unfiltered = client.get("/api/v1/history/search", params=params).json()["data"]
+    filtered = client.get("/api/v1/history/search", params={**params, "excludeNearDuplicates": True}).json()["data"]
+
+    # total和游标按过滤前的会话计，本页去掉的会话数单独返回
+    assert unfiltered["filtered_count"] == 0
+    assert filtered["total"] == unfiltered["total"]
+    assert filtered["next_cursor"] == unfiltered["next_cursor"]
+    assert filtered["filtered_count"] > 0
+    assert len(filtered["items"]) + filtered["filtered_count"] == len(unfiltered["items"])
+
+def test_sample_refills_sessions_dropped_as_near_duplicates(client, search_window):
+    from app.api.v1 import history
+
+    params = {**search_window, "sample": 8, "seed": 5}
+    plain = client.get("/api/v1/history/search", params=params).json()["data"]
+    deduplicated = client.get("/api/v1/history/search", params={**params, "excludeNearDuplicates": True}).json()["data"]
+
+    # 时间范围内互不近似的会话数：样本应达到 min(8, 该数量)
+    sessions, page = [], client.get("/api/v1/history/search", params={**search_window, "pageSize": 100}).json()["data"]
+    sessions.extend(page["items"])
+    while page["next_cursor"]:
+        page = client.get(
+            "/api/v1/history/search", params={**search_window, "pageSize": 100, "cursor": page["next_cursor"]}
+        ).json()["data"]
+        sessions.extend(page["items"])
+    distinct = len(asyncio.run(history.history_service._drop_near_duplicates(sessions)))
+
+    texts = [(item["user_query"], item["ai_response"]) for item in deduplicated["items"]]
+    assert len(plain["items"]) == 8
+    assert len(texts) == len(set(texts)) == min(8, distinct)
@@ -0,0 +1,62 @@
+"""IdAllocator测试：块内分配、计数器文件初始化和多进程互斥"""
+import asyncio
+import multiprocessing
+
+import pytest
+
+from app.services.id_allocator import IdAllocator
+
+def _allocate_in_process(counter_path, count, results):
+    allocator = IdAllocator(block_size=10, counter_path=counter_path)
+    results.put(asyncio.run(allocator.allocate(count)))
+
+def test_ids_within_block_do_not_touch_counter(tmp_path):
+    counter_path = tmp_path / "ids.counter"
+    allocator = IdAllocator(block_size=100, counter_path=str(counter_path), seed=lambda: 41)
+
+    async def allocate():
+        return [await allocator.next_id() for _ in range(3)] + await allocator.allocate(2)
+
+    assert asyncio.run(allocate()) == ["TC-0042", "TC-0043", "TC-0044", "TC-0045", "TC-0046"]
+    # 只预留了一个块：计数器指向块末尾
+    assert counter_path.read_text() == "142"
+
+def test_seed_is_only_used_without_counter_file(tmp_path):
+    counter_path = tmp_path / "ids.counter"
+    counter_path.write_text("500")
+    seed_calls = []
+    allocator = IdAllocator(block_size=10, counter_path=str(counter_path), seed=lambda: seed_calls.append(1) or 0)
+
+    assert asyncio.run(allocator.next_id()) == "TC-0500"
+    assert seed_calls == []
+
+def test_requests_larger_than_block_reserve_enough(tmp_path):
+    allocator = IdAllocator(block_size=4, counter_path=str(tmp_path / "ids.counter"))
+
+    ids = asyncio.run(allocator.allocate(10))
+
+    assert ids == [f"TC-{number:04d}" for number in range(1, 11)]
+
+def test_concurrent_allocations_are_unique():
+    allocator = IdAllocator(block_size=5)
+
+    async def allocate():
+        return await asyncio.gather(*[allocator.allocate(3) for _ in range(20)])
+
+    ids = [test_case_id for batch in asyncio.run(allocate()) for test_case_id in batch]
+    assert len(ids) == len(set(ids)) == 60
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="requires fork")
+def test_processes_sharing_counter_get_disjoint_blocks(tmp_path):
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    counter_path = str(tmp_path / "ids.counter")
+    processes = [context.Process(target=_allocate_in_process, args=(counter_path, 25, results)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    batches = [results.get(timeout=30) for _ in processes]
+    for process in processes:
+        process.join(timeout=30)
+
+    ids = [test_case_id for batch in batches for test_case_id in batch]
+    assert len(ids) == len(set(ids)) == 100
@@ -0,0 +1,35 @@
+"""导入API测试：执行导入并通过SSE进度流等待完成"""
+import json
+
+def _events(body):
+    """解析SSE响应为 [(事件名, 数据)]"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+def test_progress_stream_follows_import_to_completion(client, search_window):
+    search = client.get("/api/v1/history/search", params={**search_window, "pageSize": 3}).json()["data"]
+    session_ids = [item["session_id"] for item in search["items"]]
+    assert session_ids
+
+    task = client.post(
+        "/api/v1/import/execute",
+        json={"session_ids": session_ids, "skipDuplicates": False, "concurrency": 2}
+    ).json()["data"]
+
+    response = client.get(f"/api/v1/import/progress/{task['task_id']}/stream")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    assert events[-1] == ("end", {})
+    final = events[-2][1]
+    assert final["status"] == "completed"
+    assert final["processed"] + final["failed"] == len(session_ids)
+    assert all(name == "progress" for name, _ in events[:-1])
+
+def test_progress_stream_for_unknown_task_returns_404(client):
+    response = client.get("/api/v1/import/progress/IMPORT-missing/stream")
+    assert response.status_code == 404
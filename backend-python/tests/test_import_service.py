@@ -0,0 +1,112 @@
+"""ImportService测试：租约丢失后停止写入，任务存储的写入不阻塞事件循环"""
+import asyncio
+import sqlite3
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.config import settings
+from app.models.import_models import ImportTask, ImportTaskStatus
+from app.services.bigquery_service import ConversationQueryRequest
+from app.services.import_service import ImportService
+
+def test_import_stops_writing_after_lease_is_lost(monkeypatch):
+    service = ImportService()
+    created = []
+
+    async def create_test_cases_bulk(test_cases):
+        created.extend(test_cases)
+        return [SimpleNamespace(id=f"TC-{len(created) - i:04d}") for i in range(len(test_cases))]
+
+    monkeypatch.setattr(service.test_case_service, "create_test_cases_bulk", create_test_cases_bulk)
+    monkeypatch.setattr(settings, "import_flush_batch_size", 1)
+
+    async def scenario():
+        sessions, _ = await service.bigquery_service.query_sessions_with_total(ConversationQueryRequest(limit=3))
+        task = ImportTask(
+            task_id="IMPORT-lease-lost",
+            session_ids=[session.session_id for session in sessions],
+            total=len(sessions),
+            start_time=datetime.now(),
+            config={"concurrency": 2}
+        )
+        # 另一个进程持有租约
+        service.store.create_task(task, lease_owner="other-worker", lease_seconds=60)
+
+        service._start_task(task.task_id)
+        await service._running[task.task_id]
+
+    asyncio.run(scenario())
+
+    task = service.store.get_task("IMPORT-lease-lost")
+    assert created == []
+    assert task.processed == 0
+    assert task.status != ImportTaskStatus.COMPLETED
+
+def test_checkpoints_wait_for_database_lock_off_the_event_loop():
+    service = ImportService()
+    task = ImportTask(task_id="IMPORT-locked", session_ids=["s1"], total=1, start_time=datetime.now())
+    service.store.create_task(task)
+
+    # 另一个进程持有写锁
+    other = sqlite3.connect(settings.import_task_db_path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+
+    async def scenario():
+        record = asyncio.create_task(service._record_session_result(task, "s1", True, "TC-0001"))
+        # 检查点等待写锁期间事件循环照常调度其他协程
+        await asyncio.sleep(0.1)
+        waiting = not record.done()
+        other.execute("COMMIT")
+        await record
+        return waiting
+
+    waiting = asyncio.run(scenario())
+    other.close()
+
+    assert waiting
+    assert task.processed == 1
+    assert service.store.get_task("IMPORT-locked").processed == 1
+
+def test_progress_events_are_removed_when_tasks_end(monkeypatch):
+    service = ImportService()
+
+    async def create_test_cases_bulk(test_cases):
+        return [SimpleNamespace(id=f"TC-{i:04d}") for i in range(len(test_cases))]
+
+    monkeypatch.setattr(service.test_case_service, "create_test_cases_bulk", create_test_cases_bulk)
+
+    async def scenario():
+        sessions, _ = await service.bigquery_service.query_sessions_with_total(ConversationQueryRequest(limit=2))
+        task_ids = []
+        for name in ("unwatched", "abandoned"):
+            task = ImportTask(
+                task_id=f"IMPORT-events-{name}",
+                session_ids=[session.session_id for session in sessions],
+                total=len(sessions),
+                start_time=datetime.now(),
+                config={"concurrency": 1}
+            )
+            service.store.create_task(task, lease_owner=service.worker_id, lease_seconds=60)
+            task_ids.append(task.task_id)
+
+        # 没有订阅者的任务
+        service._start_task(task_ids[0])
+        await service._running[task_ids[0]]
+
+        # 订阅者在任务结束前断开
+        service._start_task(task_ids[1])
+        watcher = service.watch_import_progress(task_ids[1], min_interval=0)
+        await watcher.__anext__()
+        await watcher.aclose()
+        await service._running[task_ids[1]]
+
+        # 订阅已结束的任务和不存在的任务
+        async for _ in service.watch_import_progress(task_ids[0], min_interval=0):
+            pass
+        async for _ in service.watch_import_progress("IMPORT-missing", min_interval=0):
+            pass
+        return task_ids
+
+    task_ids = asyncio.run(scenario())
+    assert service.store.get_task(task_ids[0]).status == ImportTaskStatus.COMPLETED
+    assert not set(task_ids + ["IMPORT-missing"]) & set(service._progress_events)
@@ -0,0 +1,73 @@
+"""ImportTaskStore测试：租约互斥、过期接管和会话检查点"""
+import time
+
+import pytest
+
+from app.models.import_models import ImportTask, ImportTaskStatus
+from app.services.import_task_store import ImportTaskStore
+
+@pytest.fixture
+def store(tmp_path):
+    store = ImportTaskStore(str(tmp_path / "tasks.db"))
+    yield store
+    store.close()
+
+def _task(task_id="IMPORT-1", session_ids=("s1", "s2", "s3")):
+    return ImportTask(task_id=task_id, session_ids=list(session_ids), total=len(session_ids))
+
+def test_lease_is_exclusive_until_it_expires(store, monkeypatch):
+    store.create_task(_task(), lease_owner="worker-a", lease_seconds=60)
+
+    assert store.acquire_lease("IMPORT-1", "worker-a", 60)
+    assert not store.acquire_lease("IMPORT-1", "worker-b", 60)
+    assert store.find_orphaned_tasks() == []
+
+    # 租约过期后任务变为孤儿，可被其他进程接管
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert store.find_orphaned_tasks() == ["IMPORT-1"]
+    assert store.acquire_lease("IMPORT-1", "worker-b", 60)
+    assert not store.acquire_lease("IMPORT-1", "worker-a", 60)
+    assert store.find_orphaned_tasks() == []
+
+def test_task_without_lease_is_orphaned(store):
+    store.create_task(_task())
+    assert store.find_orphaned_tasks() == ["IMPORT-1"]
+
+def test_finished_task_releases_lease_and_is_not_resumed(store):
+    store.create_task(_task(), lease_owner="worker-a", lease_seconds=60)
+    store.update_status("IMPORT-1", ImportTaskStatus.COMPLETED)
+
+    assert store.find_orphaned_tasks() == []
+    assert not store.acquire_lease("IMPORT-1", "worker-b", 60)
+
+def test_session_checkpoints_are_recorded_once(store):
+    store.create_task(_task(), lease_owner="worker-a", lease_seconds=60)
+
+    assert store.record_session("IMPORT-1", "s1", True, "TC-0001")
+    assert store.record_session("IMPORT-1", "s2", False)
+    # 接管的进程重复处理同一会话时计数不变
+    assert not store.record_session("IMPORT-1", "s1", True, "TC-0002")
+
+    task = store.get_task("IMPORT-1")
+    assert (task.processed, task.failed) == (1, 1)
+    assert store.finished_sessions("IMPORT-1") == {"s1", "s2"}
+
+def test_delete_removes_checkpoints(store):
+    store.create_task(_task(), lease_owner="worker-a", lease_seconds=60)
+    store.record_session("IMPORT-1", "s1", True, "TC-0001")
+
+    assert store.delete_task("IMPORT-1")
+    assert store.get_task("IMPORT-1") is None
+    assert store.finished_sessions("IMPORT-1") == set()
+    assert not store.acquire_lease("IMPORT-1", "worker-a", 60)
+
+def test_session_batch_is_recorded_in_one_transaction(store):
+    store.create_task(_task(), lease_owner="worker-a", lease_seconds=60)
+    store.record_session("IMPORT-1", "s1", True, "TC-0001")
+
+    recorded = store.record_sessions("IMPORT-1", [("s1", True, "TC-0009"), ("s2", True, "TC-0002"), ("s3", False, None)])
+
+    assert recorded == [False, True, True]
+    task = store.get_task("IMPORT-1")
+    assert (task.processed, task.failed) == (2, 1)
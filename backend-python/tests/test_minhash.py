@@ -0,0 +1,70 @@
+"""MinHashLSH测试：近似重复召回、阈值过滤和增量删除"""
+import random
+
+from app.utils.minhash import MinHashLSH, choose_bands, first_occurrences
+
+BASE_TEXTS = [
+    "请问信用卡账单分期后提前还款是否需要支付剩余期数的手续费，以及如何在手机银行办理",
+    "How do I reset the password of my online banking account if I no longer have access to my phone",
+    "基金定投适合哪些人群，每月投入多少比较合适，遇到市场大幅下跌时是否应该暂停定投",
+    "What documents are required to open a business account and how long does the verification take",
+]
+
+def _perturb(text, rng, edits=2):
+    """随机替换少量字符，模拟仅措辞略有不同的文本"""
+    chars = list(text)
+    for _ in range(edits):
+        chars[rng.randrange(len(chars))] = rng.choice("的了是在有和")
+    return "".join(chars)
+
+def test_choose_bands_knee_is_below_threshold():
+    bands, rows = choose_bands(128, 0.8)
+    assert bands * rows == 128
+    assert (1 / bands) ** (1 / rows) <= 0.8
+
+def test_lsh_recalls_near_duplicates():
+    rng = random.Random(0)
+    index = MinHashLSH(threshold=0.6, num_perm=128)
+    for position, text in enumerate(BASE_TEXTS):
+        index.add(f"doc{position}", text)
+
+    found = 0
+    trials = 0
+    for position, text in enumerate(BASE_TEXTS):
+        for _ in range(25):
+            trials += 1
+            if f"doc{position}" in [key for key, _ in index.query(_perturb(text, rng, edits=1))]:
+                found += 1
+    assert found / trials >= 0.9
+
+def test_lsh_rejects_unrelated_text():
+    index = MinHashLSH(threshold=0.8, num_perm=128)
+    for position, text in enumerate(BASE_TEXTS):
+        index.add(f"doc{position}", text)
+
+    assert index.query("今天天气晴朗，适合出去散步") == []
+    assert [key for key, _ in index.query(BASE_TEXTS[0])] == ["doc0"]
+
+def test_remove_and_re_add():
+    index = MinHashLSH(threshold=0.8, num_perm=64)
+    index.add("doc0", BASE_TEXTS[0])
+    assert index.remove("doc0")
+    assert "doc0" not in index
+    assert index.query(BASE_TEXTS[0]) == []
+    assert not index.remove("doc0")
+
+    # 同一键重新添加时替换旧签名
+    index.add("doc0", BASE_TEXTS[1])
+    index.add("doc0", BASE_TEXTS[2])
+    assert len(index) == 1
+    assert index.query(BASE_TEXTS[1]) == []
+
+def test_empty_text_is_not_indexed():
+    index = MinHashLSH()
+    assert not index.add("empty", "  ，。 ")
+    assert len(index) == 0
+
+def test_first_occurrences_points_to_first_in_group():
+    texts = {"a": BASE_TEXTS[0], "b": BASE_TEXTS[1], "c": BASE_TEXTS[0] + "。", "d": BASE_TEXTS[0]}
+    duplicates = first_occurrences(MinHashLSH(threshold=0.8, num_perm=128), texts)
+    assert {key: match[0] for key, match in duplicates.items()} == {"c": "a", "d": "a"}
@@ -0,0 +1,69 @@
+"""QueryCache测试：TTL过期、按字节LRU淘汰和失效"""
+from app.services.query_cache import QueryCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def _cache(ttl_seconds=10, max_bytes=10):
+    clock = FakeClock()
+    return QueryCache(ttl_seconds=ttl_seconds, max_bytes=max_bytes, sizeof=len, clock=clock), clock
+
+def test_entry_expires_after_ttl():
+    cache, clock = _cache()
+    cache.set("a", "xx")
+
+    clock.now = 9.9
+    assert cache.get("a") == (True, "xx")
+    clock.now = 10
+    assert cache.get("a") == (False, None)
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["current_bytes"] == 0
+
+def test_rewrite_restarts_ttl():
+    cache, clock = _cache()
+    cache.set("a", "x")
+    clock.now = 8
+    cache.set("a", "y")
+    clock.now = 15
+    assert cache.get("a") == (True, "y")
+
+def test_least_recently_used_entries_are_evicted_by_bytes():
+    cache, _ = _cache(max_bytes=10)
+    cache.set("a", "aaaa")
+    cache.set("b", "bbbb")
+    # 读取a使b成为最久未使用
+    cache.get("a")
+    cache.set("c", "cccc")
+
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, "aaaa")
+    assert cache.get("c") == (True, "cccc")
+    assert cache.stats()["current_bytes"] == 8
+    assert cache.stats()["evictions"] == 1
+
+def test_entry_larger_than_limit_is_not_cached():
+    cache, _ = _cache(max_bytes=4)
+    cache.set("a", "aaa")
+    cache.set("big", "bbbbb")
+
+    assert cache.get("big") == (False, None)
+    assert cache.get("a") == (True, "aaa")
+
+def test_invalidate_by_predicate_and_stats():
+    cache, _ = _cache(max_bytes=100)
+    cache.set(("query", 1), "x")
+    cache.set(("query", 2), "y")
+    cache.set(("count", 1), "z")
+
+    assert cache.invalidate(lambda key: key[0] == "query") == 2
+    assert cache.get(("count", 1)) == (True, "z")
+    assert cache.get(("query", 1)) == (False, None)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+    assert cache.invalidate() == 1
+    assert cache.stats()["current_bytes"] == 0
@@ -0,0 +1,92 @@
+"""StratifiedSessionSampler测试：按seed复现、与输入顺序无关"""
+import random
+from datetime import datetime
+
+import numpy as np
+
+from app.services.bigquery_service import ConversationRow
+from app.services.session_sampler import StratifiedSessionSampler, k_center, session_priority
+
+def _messages(sessions=200, per_session=3):
+    messages = []
+    for number in range(sessions):
+        for turn in range(per_session):
+            messages.append(ConversationRow(
+                conversation_id=f"c{number}-{turn}",
+                session_id=f"s{number}",
+                message_id=f"m{number}-{turn}",
+                message_type="assistant",
+                content="回复",
+                model_id=f"model-{number % 2}",
+                timestamp=datetime(2026, 1, 1),
+                user_rating=number % 5 + 1,
+                retrieval_chunk_ids=[f"chunk{number}"],
+                metadata={"topic": f"topic-{number % 3}"}
+            ))
+    return messages
+
+def _sample(messages, seed, n=20):
+    sampler = StratifiedSessionSampler(capacity=n, seed=seed)
+    for message in messages:
+        sampler.add(message)
+    return [session_id for session_id, _ in sampler.sample(n)]
+
+def test_same_seed_gives_same_sample():
+    messages = _messages()
+    assert _sample(messages, seed=3) == _sample(messages, seed=3)
+    assert _sample(messages, seed=3) != _sample(messages, seed=4)
+
+def test_sample_does_not_depend_on_message_order():
+    messages = _messages()
+    shuffled = list(messages)
+    random.Random(0).shuffle(shuffled)
+
+    assert sorted(_sample(messages, seed=1)) == sorted(_sample(shuffled, seed=1))
+
+def test_sample_has_unique_sessions_and_covers_strata():
+    sampler = StratifiedSessionSampler(capacity=30, seed=0)
+    for message in _messages():
+        sampler.add(message)
+
+    sample = sampler.sample(30)
+    assert len(sample) == 30
+    assert len({session_id for session_id, _ in sample}) == 30
+    assert len({key for _, key in sample}) == len(sampler.strata)
+    assert sampler.messages_seen == 600
+
+def test_session_priority_is_deterministic_and_seeded():
+    assert session_priority("s1", 5) == session_priority("s1", 5)
+    assert session_priority("s1", 5) != session_priority("s1", 6)
+    assert 0 <= session_priority("s1") < 1
+
+def test_k_center_picks_spread_out_vectors():
+    vectors = np.array([[1, 0], [0.99, 0.01], [0, 1], [-1, 0]], dtype=np.float32)
+    assert k_center(vectors, 3) == [0, 3, 2]
+
+def test_excluded_sessions_are_replaced_from_the_same_strata():
+    sampler = StratifiedSessionSampler(capacity=40, seed=0)
+    for message in _messages():
+        sampler.add(message)
+
+    first = dict(sampler.sample(12))
+    excluded = set(list(first)[:4])
+    second = dict(sampler.sample(12, exclude=excluded))
+
+    assert len(second) == 12
+    assert not excluded & set(second)
+    # 未被排除的会话保持入样，补足的会话来自被排除会话所在的分层
+    assert set(first) - excluded <= set(second)
+    assert sorted(second[session_id] for session_id in set(second) - set(first)) == sorted(first[session_id] for session_id in excluded)
+
+def test_sessions_spanning_strata_do_not_leave_quotas_unfilled():
+    # 每个会话的两条回复评分不同，落在两个分层中
+    messages = [
+        message.model_copy(update={"user_rating": index % 5 + 1})
+        for index, message in enumerate(_messages(sessions=30, per_session=2))
+    ]
+    sampler = StratifiedSessionSampler(capacity=10, seed=2)
+    for message in messages:
+        sampler.add(message)
+
+    for n in (5, 10, 20):
+        assert len(sampler.sample(n)) == n
@@ -0,0 +1,240 @@
+"""测试用例服务测试：每个进程共享一个服务实例、ID分配器和近似重复索引"""
+import asyncio
+import copy
+
+import pytest
+from google.cloud import bigquery
+
+from app.config import settings
+from app.models import test_case as test_case_models
+from app.services import bigquery_test_case_service
+from app.services.bigquery_test_case_service import BigQueryTestCaseService
+from app.services.test_case_service import TestCaseService
+from app.services.test_case_store import near_duplicate_text
+
+class FakeQueryJob:
+    def __init__(self, rows, num_dml_affected_rows=None):
+        self._rows = rows
+        self.num_dml_affected_rows = num_dml_affected_rows
+
+    def result(self):
+        return iter(self._rows)
+
+class FakeTable:
+    def __init__(self, schema):
+        self.schema = schema
+
+# 表结构的一部分：覆盖嵌套STRUCT、可空STRUCT、REPEATED STRUCT、JSON和TIMESTAMP列
+SCHEMA = [
+    bigquery.SchemaField("id", "STRING", mode="REQUIRED"),
+    bigquery.SchemaField("name", "STRING"),
+    bigquery.SchemaField("metadata", "RECORD", mode="REQUIRED", fields=[
+        bigquery.SchemaField("status", "STRING"),
+        bigquery.SchemaField("updated_date", "TIMESTAMP"),
+        bigquery.SchemaField("tags", "RECORD", mode="REPEATED", fields=[
+            bigquery.SchemaField("name", "STRING"),
+            bigquery.SchemaField("color", "STRING"),
+        ]),
+    ]),
+    bigquery.SchemaField("test_config", "RECORD", mode="REQUIRED", fields=[
+        bigquery.SchemaField("model", "RECORD", mode="REQUIRED", fields=[
+            bigquery.SchemaField("name", "STRING"),
+            bigquery.SchemaField("params", "JSON"),
+        ]),
+    ]),
+    bigquery.SchemaField("input", "RECORD", mode="REQUIRED", fields=[
+        bigquery.SchemaField("current_query", "RECORD", mode="REQUIRED", fields=[
+            bigquery.SchemaField("text", "STRING"),
+        ]),
+    ]),
+    bigquery.SchemaField("analysis", "RECORD", mode="NULLABLE", fields=[
+        bigquery.SchemaField("notes", "STRING"),
+        bigquery.SchemaField("optimization_suggestions", "STRING", mode="REPEATED"),
+    ]),
+]
+
+class FakeBigQueryClient:
+    """在内存中保存写入的行，支持服务用到的几类查询"""
+
+    def __init__(self, project=None):
+        self.rows = []
+        self.index_loads = 0
+        self.updates = []
+        # 为True时UPDATE语句失败，模拟流式缓冲区内的行或临时错误
+        self.fail_dml = False
+        # 下一次流式写入中失败的行号
+        self.fail_insert_indexes = set()
+
+    def get_table(self, table_id):
+        return FakeTable(SCHEMA)
+
+    def query(self, query, job_config=None):
+        if query.startswith("UPDATE"):
+            if self.fail_dml:
+                raise RuntimeError("UPDATE or DELETE statement over table would affect rows in the streaming buffer")
+            parameters = {parameter.name: parameter for parameter in job_config.query_parameters}
+            self.updates.append((query, parameters))
+            test_case_id = parameters["test_case_id"].value
+            return FakeQueryJob([], num_dml_affected_rows=sum(row["id"] == test_case_id for row in self.rows))
+        if query.startswith("DELETE"):
+            test_case_id = job_config.query_parameters[0].value
+            remaining = [row for row in self.rows if row["id"] != test_case_id]
+            deleted = len(self.rows) - len(remaining)
+            self.rows = remaining
+            return FakeQueryJob([], num_dml_affected_rows=deleted)
+        if "IN UNNEST(@source_sessions)" in query:
+            source_sessions = set(job_config.query_parameters[0].values)
+            return FakeQueryJob([
+                {"source_session": row["metadata"]["source_session"], "id": row["id"]}
+                for row in self.rows
+                if row["metadata"]["source_session"] in source_sessions
+            ])
+        if query.startswith("SELECT *"):
+            test_case_id = job_config.query_parameters[0].value
+            return FakeQueryJob([copy.deepcopy(row) for row in self.rows if row["id"] == test_case_id])
+        if "AS response" in query:
+            self.index_loads += 1
+            return FakeQueryJob([
+                {
+                    "id": row["id"],
+                    "name": row["name"],
+                    "query": row["input"]["current_query"]["text"],
+                    "response": row["execution"]["actual"]["response"],
+                }
+                for row in self.rows
+            ])
+        return FakeQueryJob([{"max_number": None}])
+
+    def insert_rows_json(self, table_id, rows, row_ids=None):
+        failed, self.fail_insert_indexes = self.fail_insert_indexes, set()
+        self.rows.extend(row for index, row in enumerate(rows) if index not in failed)
+        return [{"index": index, "errors": ["backendError"]} for index in sorted(failed)]
+
+def test_factory_returns_shared_mock_service():
+    assert TestCaseService() is TestCaseService()
+
+@pytest.fixture
+def bigquery_service(tmp_path, monkeypatch):
+    """使用内存假客户端的BigQuery测试用例服务，每个测试一个新实例"""
+    monkeypatch.setattr(bigquery_test_case_service.bigquery, "Client", FakeBigQueryClient)
+    monkeypatch.setattr(settings, "bigquery_use_real_test_cases", True)
+    monkeypatch.setattr(settings, "test_case_id_counter_path", str(tmp_path / "ids.counter"))
+    monkeypatch.setattr(BigQueryTestCaseService, "_instance", None)
+    monkeypatch.setattr(BigQueryTestCaseService, "_initialized", False)
+    return TestCaseService()
+
+def test_bigquery_service_is_shared_across_callers(bigquery_service, make_test_case):
+
+    async def create_three():
+        # 每次调用都像API路由一样重新获取服务
+        return [(await TestCaseService().create_test_case(make_test_case(name=f"case {i}"))).id for i in range(3)]
+
+    assert TestCaseService() is TestCaseService()
+    assert asyncio.run(create_three()) == ["TC-0001", "TC-0002", "TC-0003"]
+
+def test_bigquery_near_duplicate_index_follows_update_and_delete(bigquery_service, make_test_case):
+    query = "如何申请退货退款，需要提供哪些材料"
+    response = "请在订单页面点击申请退货，上传商品照片和购买凭证，审核通过后退款原路返回。"
+
+    async def scenario():
+        created = await bigquery_service.create_test_case(make_test_case(query=query, response=response))
+        text = near_duplicate_text(query, response)
+        before = await bigquery_service.find_near_duplicates({"s1": text})
+
+        changed = make_test_case(query="今天天气怎么样", response="今天晴，最高气温二十五度。")
+        await bigquery_service.update_test_case(
+            created.id,
+            test_case_models.TestCaseUpdate(input=changed.input, execution=changed.execution)
+        )
+        after_update = await bigquery_service.find_near_duplicates({"s1": text})
+
+        await bigquery_service.update_test_case(
+            created.id,
+            test_case_models.TestCaseUpdate(input=make_test_case(query=query).input, execution=make_test_case(response=response).execution)
+        )
+        restored = await bigquery_service.find_near_duplicates({"s1": text})
+
+        assert await bigquery_service.delete_test_case(created.id)
+        after_delete = await bigquery_service.find_near_duplicates({"s1": text})
+        return created.id, before, after_update, restored, after_delete
+
+    test_case_id, before, after_update, restored, after_delete = asyncio.run(scenario())
+    assert before["s1"][0]["test_case_id"] == test_case_id
+    assert after_update == {}
+    assert restored["s1"][0]["test_case_id"] == test_case_id
+    assert after_delete == {}
+    # 索引每个进程只从表中加载一次
+    assert bigquery_service.client.index_loads == 1
+
+def test_bigquery_update_binds_nested_columns_in_one_statement(bigquery_service, make_test_case):
+
+    async def scenario():
+        created = await bigquery_service.create_test_case(make_test_case(query="原问题"))
+        changed = make_test_case(query="新问题")
+        updated = await bigquery_service.update_test_case(created.id, test_case_models.TestCaseUpdate(input=changed.input))
+        return created, updated
+
+    created, updated = asyncio.run(scenario())
+    assert updated.input.current_query.text == "新问题"
+    assert len(bigquery_service.client.updates) == 1
+
+    query, parameters = bigquery_service.client.updates[0]
+    values = {name: parameter.value for name, parameter in parameters.items() if hasattr(parameter, "value")}
+    assert "id =" not in query.split("WHERE")[0]
+    assert "新问题" in values.values()
+    assert any(getattr(parameter, "type_", None) == "TIMESTAMP" and parameter.value for parameter in parameters.values())
+    assert "PARSE_JSON(@" in query
+    assert "ARRAY<STRUCT<name STRING, color STRING>>[" in query
+    assert "analysis = CAST(NULL AS STRUCT<notes STRING, optimization_suggestions ARRAY<STRING>>)" in query
+    # 每个参数都被语句引用
+    assert all(f"@{name}" in query for name in parameters)
+
+def test_bigquery_failed_update_keeps_original_row(bigquery_service, make_test_case):
+    query = "如何申请退货退款，需要提供哪些材料"
+    response = "请在订单页面点击申请退货，上传商品照片和购买凭证，审核通过后退款原路返回。"
+
+    async def scenario():
+        created = await bigquery_service.create_test_case(make_test_case(query=query, response=response))
+        await bigquery_service.find_near_duplicates({})
+        bigquery_service.client.fail_dml = True
+        changed = make_test_case(query="今天天气怎么样", response="今天晴，最高气温二十五度。")
+        with pytest.raises(RuntimeError):
+            await bigquery_service.update_test_case(
+                created.id,
+                test_case_models.TestCaseUpdate(input=changed.input, execution=changed.execution)
+            )
+        return created, await bigquery_service.get_test_case_by_id(created.id), await bigquery_service.find_near_duplicates(
+            {"s1": near_duplicate_text(query, response)}
+        )
+
+    created, row, matches = asyncio.run(scenario())
+    assert row["input"]["current_query"]["text"] == query
+    assert len(bigquery_service.client.rows) == 1
+    assert matches["s1"][0]["test_case_id"] == created.id
+
+def test_bigquery_bulk_retry_skips_sessions_already_written(bigquery_service, make_test_case):
+    requests = [make_test_case(name=f"case {i}", source_session=f"s{i}") for i in range(3)]
+
+    async def flush_twice():
+        # 第一次写入时第二行失败，之后整批重放
+        bigquery_service.client.fail_insert_indexes = {1}
+        first = await bigquery_service.create_test_cases_bulk(requests)
+        second = await bigquery_service.create_test_cases_bulk(requests)
+        return first, second
+
+    first, second = asyncio.run(flush_twice())
+    assert [isinstance(result, Exception) for result in first] == [False, True, False]
+    assert [isinstance(result, ValueError) for result in second] == [True, False, True]
+    assert second[1].metadata.source_session == "s1"
+    assert sorted(row["metadata"]["source_session"] for row in bigquery_service.client.rows) == ["s0", "s1", "s2"]
+
+def test_bigquery_bulk_rejects_repeated_session_in_batch(bigquery_service, make_test_case):
+    results = asyncio.run(bigquery_service.create_test_cases_bulk([
+        make_test_case(name="first", source_session="s1"),
+        make_test_case(name="again", source_session="s1"),
+        make_test_case(name="manual"),
+    ]))
+    assert isinstance(results[0], test_case_models.TestCase)
+    assert isinstance(results[1], ValueError)
+    assert isinstance(results[2], test_case_models.TestCase)
+    assert len(bigquery_service.client.rows) == 2
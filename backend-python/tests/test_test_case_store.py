@@ -0,0 +1,102 @@
+"""TestCaseStore测试：索引筛选、按创建时间分页与重新索引，结果与逐条扫描一致"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import test_case_store
+
+STATUSES = ["draft", "active", "archived"]
+PRIORITIES = ["low", "medium", "high"]
+DOMAINS = ["finance", "tech", "health"]
+
+def _record(number, rng):
+    created = datetime(2026, 1, 1) + timedelta(minutes=rng.randrange(100000))
+    return {
+        "id": f"TC-{number:04d}",
+        "name": f"用例 {number} {rng.choice(['投资基金', 'React性能', '健康饮食'])}",
+        "description": rng.choice(["风险控制", "性能优化", None]),
+        "domain": rng.choice(DOMAINS),
+        "difficulty": "medium",
+        "metadata": {
+            "status": rng.choice(STATUSES),
+            "priority": rng.choice(PRIORITIES),
+            "owner": "owner@example.com",
+            "tags": [{"name": rng.choice(["a", "b"])}],
+            "created_date": created.isoformat() + rng.choice(["", "Z"]),
+            "source_session": f"session_{number}",
+        },
+    }
+
+@pytest.fixture
+def records():
+    rng = random.Random(0)
+    return [_record(number, rng) for number in range(300)]
+
+def _naive(records, status=None, domain=None, search=None):
+    matched = [
+        record for record in records
+        if (status is None or record["metadata"]["status"] == status)
+        and (domain is None or record["domain"] == domain)
+        and (search is None or search.lower() in f"{record['name']}\n{record['description'] or ''}".lower())
+    ]
+    return sorted(matched, key=lambda record: (datetime.fromisoformat(record["metadata"]["created_date"].rstrip("Z")), record["id"]), reverse=True)
+
+@pytest.mark.parametrize("filters,search", [
+    ({}, None),
+    ({"status": "active"}, None),
+    ({"status": "active", "domain": "tech"}, None),
+    ({"domain": "health"}, "投资"),
+    ({}, "性能"),
+    ({"status": None}, None),
+])
+@pytest.mark.parametrize("offset,limit", [(0, 20), (40, 20), (0, 300)])
+def test_query_matches_full_scan(records, filters, search, offset, limit):
+    store = test_case_store.TestCaseStore(records)
+    page, total = store.query(filters, search=search, offset=offset, limit=limit)
+
+    expected = _naive(records, filters.get("status"), filters.get("domain"), search)
+    assert total == len(expected)
+    assert [record["id"] for record in page] == [record["id"] for record in expected[offset:offset + limit]]
+
+def test_put_reindexes_and_remove_unindexes(records):
+    store = test_case_store.TestCaseStore(records[:10])
+    record = dict(records[0], metadata=dict(records[0]["metadata"], status="archived", created_date="2030-01-01T00:00:00"))
+    store.put(record)
+
+    page, _ = store.query({"status": "archived"})
+    assert page[0]["id"] == record["id"]
+    assert store.query()[0][0]["id"] == record["id"]
+    assert len(store) == 10
+
+    assert store.remove(record["id"])
+    assert not store.remove(record["id"])
+    assert record["id"] not in [item["id"] for item in store.query({"status": "archived"}, limit=100)[0]]
+    assert len(store) == 9
+
+def test_distribution_counts_indexed_values(records):
+    store = test_case_store.TestCaseStore(records)
+    distribution = store.distribution("status")
+
+    assert sum(distribution.values()) == len(records)
+    assert distribution["active"] == sum(1 for record in records if record["metadata"]["status"] == "active")
+
+def test_unindexed_field_is_rejected(records):
+    with pytest.raises(ValueError):
+        test_case_store.TestCaseStore(records).query({"name": "x"})
+
+def test_source_session_index_follows_writes(records):
+    store = test_case_store.TestCaseStore(records[:3])
+    assert store.id_for_source_session("session_1") == "TC-0001"
+
+    # 源会话改变后旧映射移除
+    store.put(dict(records[1], metadata=dict(records[1]["metadata"], source_session="session_99")))
+    assert store.id_for_source_session("session_1") is None
+    assert store.id_for_source_session("session_99") == "TC-0001"
+
+    # "import" 为占位值，不参与去重
+    store.put(dict(records[2], metadata=dict(records[2]["metadata"], source_session="import")))
+    assert store.id_for_source_session("import") is None
+
+    store.remove("TC-0000")
+    assert store.source_session_mapping() == {"session_99": "TC-0001"}
@@ -0,0 +1,63 @@
+"""InvertedIndex测试：中日韩二字组合切分，结果与逐行子串匹配（LIKE）一致"""
+import pytest
+
+from app.services import real_bigquery_service
+from app.services.real_bigquery_service import RealBigQueryService
+from app.utils.text_index import InvertedIndex, parse_query, tokenize
+
+DOCS = {
+    1: "投资基金的风险如何控制？",
+    2: "React性能优化有哪些技巧？使用React.memo和useMemo",
+    3: "基金定投适合长期投资",
+    4: "How to configure react-router in a React app",
+    5: "100% 保本的理财产品不存在，snake_case 命名",
+}
+
+@pytest.fixture
+def index():
+    index = InvertedIndex()
+    for doc_id, text in DOCS.items():
+        index.add(doc_id, text)
+    return index
+
+def _naive(query):
+    """与LIKE '%词%' 相同的语义：每个词都是原文（小写）的子串"""
+    terms = parse_query(query)
+    return {doc_id for doc_id, text in DOCS.items() if terms and all(term in text.lower() for term in terms)}
+
+def test_cjk_text_is_split_into_characters_and_bigrams():
+    assert tokenize("投资基金") == ["投", "资", "基", "金", "投资", "资基", "基金"]
+
+def test_latin_text_is_split_into_trigrams():
+    assert tokenize("React app") == ["rea", "eac", "act", "app"]
+
+@pytest.mark.parametrize("query", [
+    "基金", "投资", "资基", "投", "风险 控制", "react", "act", "REACT", "usememo", "memo",
+    '"react router"', "react-router", "ap", "r", "100%", "snake_case", "长期 react", "不存在的词",
+])
+def test_search_matches_substring_semantics(index, query):
+    assert index.search(query) == _naive(query)
+
+def test_search_within_candidates(index):
+    assert index.search("基金", candidates=[3, 4]) == {3}
+    assert index.search("ap", candidates=[2, 4]) == {4}
+
+def test_removed_and_replaced_documents(index):
+    index.remove(1)
+    assert index.search("风险") == set()
+
+    index.add(3, "风险提示")
+    assert index.search("风险") == {3}
+    assert index.search("基金") == set()
+
+def test_real_backend_like_escapes_wildcards(monkeypatch):
+    monkeypatch.setattr(real_bigquery_service.bigquery, "Client", lambda project=None: object())
+    service = RealBigQueryService("project", "dataset", "conversations", fetch_mode="rows")
+    params = {}
+
+    conditions = service._keyword_conditions(["content"], '100% snake_case "React Router"', params)
+
+    assert conditions == [
+        f"(LOWER(content) LIKE @keyword_{i})" for i in range(3)
+    ]
+    assert params == {"keyword_0": "%100\\%%", "keyword_1": "%snake\\_case%", "keyword_2": "%react router%"}
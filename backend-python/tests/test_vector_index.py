@@ -0,0 +1,92 @@
+"""VectorIndex测试：IVF近似检索与精确检索一致，会话向量索引按TTL复用"""
+import asyncio
+
+import numpy as np
+
+from app.services import bigquery_factory, real_bigquery_service
+from app.services.real_bigquery_service import RealBigQueryService
+from app.services.vector_index import VectorIndex, group_sums
+
+def _clustered_vectors(n_clusters=8, per_cluster=50, dim=16, seed=0):
+    """簇间分离良好的数据集"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim)) * 10
+    vectors = np.repeat(centers, per_cluster, axis=0) + rng.normal(size=(n_clusters * per_cluster, dim))
+    return [f"v{i}" for i in range(len(vectors))], vectors
+
+def test_ivf_matches_brute_force_when_probing_all_lists():
+    ids, vectors = _clustered_vectors()
+    index = VectorIndex(ids, vectors)
+    index.train_ivf(n_lists=8)
+
+    for item_id in ["v0", "v123", "v399"]:
+        query = index.vector(item_id)
+        exact = index.search(query, k=10, exact=True)
+        approximate = index.search(query, k=10, nprobe=8)
+        assert [i for i, _ in approximate] == [i for i, _ in exact]
+
+def test_ivf_recall_with_default_nprobe():
+    ids, vectors = _clustered_vectors()
+    index = VectorIndex(ids, vectors)
+    index.train_ivf(n_lists=8, nprobe=2)
+
+    hits = 0
+    for item_id in ids[::20]:
+        query = index.vector(item_id)
+        exact = {i for i, _ in index.search(query, k=10, exact=True)}
+        hits += len(exact & {i for i, _ in index.search(query, k=10)})
+    assert hits / (10 * len(ids[::20])) >= 0.9
+
+def test_search_excludes_ids():
+    ids, vectors = _clustered_vectors(n_clusters=2, per_cluster=5)
+    index = VectorIndex(ids, vectors)
+
+    results = index.search(index.vector("v0"), k=3, exclude=["v0"])
+    assert len(results) == 3
+    assert "v0" not in [i for i, _ in results]
+
+def test_group_sums_matches_naive_sum():
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(30, 4)).astype(np.float32)
+    groups = rng.integers(0, 5, size=30)
+
+    expected = np.zeros((6, 4), dtype=np.float32)
+    for vector, group in zip(vectors, groups):
+        expected[group] += vector
+    np.testing.assert_allclose(group_sums(vectors, groups, 6), expected, rtol=1e-5, atol=1e-5)
+
+def test_similar_sessions_reuse_cached_session_index(monkeypatch):
+    monkeypatch.setattr(real_bigquery_service.bigquery, "Client", lambda project=None: object())
+    service = RealBigQueryService("project", "dataset", "conversations", fetch_mode="rows")
+    queries = []
+
+    async def run_query(query, params, timeout=30):
+        queries.append(query)
+        return [
+            {"session_id": "s1", "embedding": [1.0, 0.0]},
+            {"session_id": "s2", "embedding": [0.9, 0.1]},
+            {"session_id": "s3", "embedding": [0.0, 1.0]},
+        ]
+
+    monkeypatch.setattr(service, "_run_query", run_query)
+
+    async def search_twice():
+        return await service.find_similar_sessions("s1", limit=2), await service.find_similar_sessions("s3", limit=1)
+
+    first, second = asyncio.run(search_twice())
+    assert [item["session_id"] for item in first] == ["s2", "s3"]
+    assert [item["session_id"] for item in second] == ["s2"]
+    assert len(queries) == 1
+
+def test_factory_passes_similarity_index_ttl(monkeypatch):
+    monkeypatch.setattr(real_bigquery_service.bigquery, "Client", lambda project=None: object())
+    monkeypatch.setattr(bigquery_factory.settings, "bigquery_use_mock", False)
+    monkeypatch.setattr(bigquery_factory.settings, "gcp_project_id", "project")
+    monkeypatch.setattr(bigquery_factory.settings, "gcp_dataset_id", "dataset")
+    monkeypatch.setattr(bigquery_factory.settings, "google_application_credentials", None)
+    monkeypatch.setattr(bigquery_factory.settings, "bigquery_fetch_mode", "rows")
+    monkeypatch.setattr(bigquery_factory.settings, "similarity_index_ttl_seconds", 120)
+
+    service = bigquery_factory.BigQueryServiceFactory._create_backend_service()
+    assert isinstance(service, RealBigQueryService)
+    assert service.similarity_index_ttl_seconds == 120
@@ -197,8 +197,8 @@ const ImportPage: React.FC = () => {
       setCurrentStep(2)
       message.success(t('import.importStarted'))
 
-      // 开始轮询进度
-      pollProgress(response.data.data.task_id)
+      // 订阅进度推送
+      watchProgress(response.data.data.task_id)
     } catch (error) {
       message.error(t('import.importStartFailed'))
       console.error('Failed to start import:', error)
@@ -207,31 +207,58 @@ const ImportPage: React.FC = () => {
     }
   }
 
+  const applyProgress = (task: any) => {
+    setCurrentTask({
+      taskId: task.task_id,
+      status: task.status,
+      total: task.total,
+      processed: task.processed,
+      failed: task.failed,
+      skipped: task.skipped,
+      startTime: task.start_time,
+      endTime: task.end_time,
+    })
+
+    const finished = task.status === 'completed' || task.status === 'failed'
+    if (finished) {
+      message.success(task.status === 'completed' ? t('import.importCompleted') : t('import.importFailed'))
+      loadImportTasks()
+    }
+    return finished
+  }
+
+  // 订阅导入进度推送，连接失败时退回轮询
+  const watchProgress = (taskId: string) => {
+    if (typeof EventSource === 'undefined') {
+      pollProgress(taskId)
+      return
+    }
+
+    const source = new EventSource(importService.progressStreamUrl(taskId))
+    let finished = false
+
+    source.addEventListener('progress', (event) => {
+      finished = applyProgress(JSON.parse((event as MessageEvent).data))
+      if (finished) {
+        source.close()
+      }
+    })
+    source.addEventListener('end', () => source.close())
+    source.onerror = () => {
+      source.close()
+      if (!finished) {
+        console.warn('Progress stream disconnected, falling back to polling')
+        pollProgress(taskId)
+      }
+    }
+  }
+
   // 轮询导入进度
   const pollProgress = async (taskId: string) => {
     const poll = async () => {
       try {
         const response = await importService.getProgress(taskId)
-        const task = response.data.data
-
-        console.log('Progress response:', response.data)
-        console.log('Task data:', task)
-
-        setCurrentTask({
-          taskId: task.task_id,
-          status: task.status,
-          total: task.total,
-          processed: task.processed,
-          failed: task.failed,
-          skipped: task.skipped,
-          startTime: task.start_time,
-          endTime: task.end_time,
-        })
-
-        if (task.status === 'completed' || task.status === 'failed') {
-          message.success(task.status === 'completed' ? t('import.importCompleted') : t('import.importFailed'))
-          loadImportTasks()
-        } else {
+        if (!applyProgress(response.data.data)) {
           setTimeout(poll, 2000) // 2秒后继续轮询
         }
       } catch (error) {
@@ -54,6 +54,9 @@ export const importService = {
     apiClient.post<ApiResponse>('/v1/import/execute', data),
   getProgress: (taskId: string) =>
     apiClient.get<ApiResponse>(`/v1/import/progress/${taskId}`),
+  // 进度推送（Server-Sent Events）
+  progressStreamUrl: (taskId: string) =>
+    `${API_BASE_URL}/v1/import/progress/${taskId}/stream`,
   getTasks: (params?: { page?: number; pageSize?: number }) =>
     apiClient.get<ApiResponse>('/v1/import/tasks', { params }),
 }
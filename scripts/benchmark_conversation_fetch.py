@@ -0,0 +1,98 @@
+"""
+对比对话结果的逐行转换与Arrow列式转换的吞吐量（rows/sec）
+
+用法:
+    # 合成数据，仅测量结果转换开销（不需要GCP凭证）
+    python scripts/benchmark_conversation_fetch.py --rows 100000
+
+    # 连接真实BigQuery，测量 stream_conversations 在两种下载方式下的端到端吞吐
+    python scripts/benchmark_conversation_fetch.py --live --rows 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend-python"))
+
+import pyarrow as pa
+from google.cloud.bigquery.table import Row
+
+from app.config import settings
+from app.services.arrow_conversion import conversations_from_arrow
+from app.services.bigquery_service import ConversationQueryRequest
+from app.services.real_bigquery_service import CONVERSATION_COLUMNS, RealBigQueryService
+
+def synthetic_columns(num_rows: int) -> dict:
+    """生成与conversations表结构一致的列数据"""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    models = ["gpt-4", "gpt-3.5-turbo", "claude-3", "gemini-pro"]
+    return {
+        "conversation_id": [f"conv_{i:08d}" for i in range(num_rows)],
+        "session_id": [f"session_{i // 8:06d}" for i in range(num_rows)],
+        "message_id": [f"msg_{i:08d}" for i in range(num_rows)],
+        "message_type": ["user" if i % 2 == 0 else "assistant" for i in range(num_rows)],
+        "content": [f"message content {i} " * 8 for i in range(num_rows)],
+        "model_id": [random.choice(models) for _ in range(num_rows)],
+        "timestamp": [start + timedelta(seconds=i) for i in range(num_rows)],
+        "metadata": [json.dumps({"source": "benchmark", "index": i}) for i in range(num_rows)],
+        "user_rating": [random.choice([None, 1, 2, 3, 4, 5]) for _ in range(num_rows)],
+        "feedback_text": [None] * num_rows,
+        "token_count": [random.randint(10, 500) for _ in range(num_rows)],
+        "processing_time_ms": [random.randint(100, 3000) for _ in range(num_rows)],
+        "retrieval_chunk_ids": [[f"CH-{i % 1000:04d}"] for i in range(num_rows)],
+    }
+
+def report(label: str, num_rows: int, elapsed: float):
+    print(f"{label:<12} {num_rows:>10,} rows  {elapsed:8.3f}s  {num_rows / elapsed:>12,.0f} rows/sec")
+
+def run_synthetic(num_rows: int):
+    columns = synthetic_columns(num_rows)
+
+    # 逐行路径：模拟BigQuery Row对象（客户端已将JSON列解析为字典），逐个构建经过校验的ConversationRow
+    row_columns = dict(columns, metadata=[json.loads(value) for value in columns["metadata"]])
+    field_to_index = {name: i for i, name in enumerate(CONVERSATION_COLUMNS)}
+    rows = [Row(values, field_to_index) for values in zip(*(row_columns[name] for name in CONVERSATION_COLUMNS))]
+    started = time.perf_counter()
+    row_results = [RealBigQueryService._row_to_conversation(row) for row in rows]
+    report("rows", len(row_results), time.perf_counter() - started)
+
+    # Arrow路径：整页RecordBatch按列转换
+    table = pa.table(columns)
+    started = time.perf_counter()
+    arrow_results = conversations_from_arrow(table)
+    report("arrow", len(arrow_results), time.perf_counter() - started)
+
+async def run_live(num_rows: int):
+    request = ConversationQueryRequest(limit=num_rows)
+    for fetch_mode in ("rows", "arrow"):
+        service = RealBigQueryService(
+            project_id=settings.gcp_project_id,
+            dataset_id=settings.gcp_dataset_id,
+            table_id=settings.gcp_table_id,
+            credentials_path=settings.google_application_credentials,
+            fetch_mode=fetch_mode
+        )
+        started = time.perf_counter()
+        count = 0
+        async for _ in service.stream_conversations(request):
+            count += 1
+        report(fetch_mode, count, time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark conversation result fetch modes")
+    parser.add_argument("--rows", type=int, default=100000, help="number of rows to fetch or generate")
+    parser.add_argument("--live", action="store_true", help="query the configured BigQuery table")
+    args = parser.parse_args()
+
+    if args.live:
+        asyncio.run(run_live(args.rows))
+    else:
+        run_synthetic(args.rows)
+
+if __name__ == "__main__":
+    main()
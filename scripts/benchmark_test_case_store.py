@@ -0,0 +1,115 @@
+"""
+测量测试用例列表查询在索引存储上的耗时，可选与原DataFrame实现对比
+
+用法:
+    python scripts/benchmark_test_case_store.py --cases 100000
+
+    # 同时运行原pandas实现（copy + apply + sort_values + iterrows）作为基线
+    python scripts/benchmark_test_case_store.py --cases 100000 --baseline
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend-python"))
+
+from app.services.test_case_store import TestCaseStore
+
+STATUSES = ["draft", "approved", "archived"]
+PRIORITIES = ["high", "medium", "low"]
+DOMAINS = ["finance", "technology", "healthcare", "education", "legal"]
+TAGS = ["multi-turn", "regression", "edge-case", "citation", "long-context"]
+
+# 查询场景：(名称, 筛选条件, 搜索关键词, 页码)
+SCENARIOS = [
+    ("first page", {}, None, 1),
+    ("deep page", {}, None, 2000),
+    ("status", {"status": "approved"}, None, 1),
+    ("status+prio", {"status": "approved", "priority": "high"}, None, 1),
+    ("domain+prio", {"domain": "legal", "priority": "low"}, None, 50),
+    ("search", {}, "case 4242", 1),
+]
+
+def synthetic_test_cases(num_cases: int) -> list:
+    """生成与演示数据结构一致的测试用例记录（省略与列表查询无关的嵌套字段）"""
+    random.seed(42)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    records = []
+    for i in range(num_cases):
+        created = start + timedelta(seconds=random.randint(0, 365 * 86400))
+        records.append({
+            "id": f"TC-{i + 1:06d}",
+            "name": f"test case {i}",
+            "description": f"synthetic description for case {i}",
+            "metadata": {
+                "status": random.choice(STATUSES),
+                "owner": f"owner{i % 50}@company.com",
+                "priority": random.choice(PRIORITIES),
+                "tags": [{"name": tag} for tag in random.sample(TAGS, 2)],
+                "version": "1.0",
+                "created_date": created.isoformat(),
+                "updated_date": created.isoformat(),
+                "source_session": f"session_{i:08d}",
+            },
+            "domain": random.choice(DOMAINS),
+            "difficulty": "medium",
+        })
+    return records
+
+def report(label: str, elapsed: float, total: int, returned: int):
+    print(f"{label:<22} {elapsed * 1000:10.3f} ms  total={total:<8} returned={returned}")
+
+def run_store(records: list, page_size: int, repeat: int):
+    started = time.perf_counter()
+    store = TestCaseStore(records)
+    print(f"store build: {time.perf_counter() - started:.3f}s for {len(store):,} cases")
+
+    for name, filters, search, page in SCENARIOS:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            items, total = store.query(filters, search, offset=(page - 1) * page_size, limit=page_size)
+        report(f"store {name}", (time.perf_counter() - started) / repeat, total, len(items))
+
+def run_baseline(records: list, page_size: int, repeat: int):
+    import pandas as pd
+
+    df = pd.DataFrame(records)
+    df["created_date"] = pd.to_datetime(df["metadata"].apply(lambda x: x.get("created_date")), format="ISO8601")
+
+    for name, filters, search, page in SCENARIOS:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            filtered = df.copy()
+            for field in ("status", "priority"):
+                if field in filters:
+                    filtered = filtered[filtered["metadata"].apply(lambda x, f=field: x.get(f)) == filters[field]]
+            if "domain" in filters:
+                filtered = filtered[filtered["domain"] == filters["domain"]]
+            if search:
+                filtered = filtered[
+                    filtered["name"].str.lower().str.contains(search, na=False) |
+                    filtered["description"].str.lower().str.contains(search, na=False)
+                ]
+            filtered = filtered.sort_values("created_date", ascending=False)
+            start_idx = (page - 1) * page_size
+            items = [row["id"] for _, row in filtered.iloc[start_idx:start_idx + page_size].iterrows()]
+        report(f"pandas {name}", (time.perf_counter() - started) / repeat, len(filtered), len(items))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark test case list queries")
+    parser.add_argument("--cases", type=int, default=100000, help="number of synthetic test cases")
+    parser.add_argument("--page-size", type=int, default=20, help="page size")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per scenario")
+    parser.add_argument("--baseline", action="store_true", help="also run the DataFrame implementation")
+    args = parser.parse_args()
+
+    records = synthetic_test_cases(args.cases)
+    run_store(records, args.page_size, args.repeat)
+    if args.baseline:
+        run_baseline(records, args.page_size, max(1, args.repeat // 10))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+测量倒排索引在大规模消息语料上的关键词查询耗时，并与逐行子串匹配对比
+
+用法:
+    python scripts/benchmark_text_index.py --messages 1000000
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend-python"))
+
+from app.utils.text_index import InvertedIndex
+
+# 常用字组成的中文词及英文词，按Zipf分布抽样，接近真实对话的词频
+_CHARS = "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所民得经"
+_LATIN = ["react", "router", "python", "query", "index", "model", "token", "cache", "vector", "stream"]
+
+def build_vocabulary(size: int) -> list:
+    random.seed(7)
+    words = set()
+    while len(words) < size:
+        if random.random() < 0.8:
+            words.add("".join(random.choices(_CHARS, k=random.randint(2, 4))))
+        else:
+            words.add(random.choice(_LATIN) + str(random.randint(0, 999)))
+    return sorted(words)
+
+def synthetic_messages(num_messages: int, vocabulary: list, words_per_message: int) -> list:
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(vocabulary))))
+    messages = []
+    for _ in range(num_messages):
+        words = random.choices(vocabulary, cum_weights=cum_weights, k=words_per_message)
+        messages.append("".join(word if random.random() < 0.7 else f" {word} " for word in words))
+    return messages
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark inverted index keyword search")
+    parser.add_argument("--messages", type=int, default=1000000, help="number of synthetic messages")
+    parser.add_argument("--vocabulary", type=int, default=50000, help="distinct words in the corpus")
+    parser.add_argument("--words", type=int, default=20, help="words per message")
+    parser.add_argument("--queries", type=int, default=200, help="queries per scenario")
+    args = parser.parse_args()
+
+    vocabulary = build_vocabulary(args.vocabulary)
+    messages = synthetic_messages(args.messages, vocabulary, args.words)
+
+    index = InvertedIndex()
+    started = time.perf_counter()
+    for doc_id, message in enumerate(messages):
+        index.add(doc_id, message)
+    print(f"index build: {time.perf_counter() - started:.1f}s for {len(index):,} messages")
+
+    # 查询取自词表的中低频区间，接近用户实际输入的关键词
+    sample = vocabulary[len(vocabulary) // 10:]
+    scenarios = [
+        ("single term", lambda: random.choice(sample)),
+        ("two terms AND", lambda: f"{random.choice(sample)} {random.choice(vocabulary[:200])}"),
+        ("phrase", lambda: f'"{random.choice(sample)}{random.choice(sample)}"'),
+    ]
+    for name, make_query in scenarios:
+        queries = [make_query() for _ in range(args.queries)]
+        started = time.perf_counter()
+        hits = sum(len(index.search(query)) for query in queries)
+        elapsed = (time.perf_counter() - started) / len(queries)
+        print(f"{name:<16} {elapsed * 1000:8.3f} ms/query  avg hits={hits / len(queries):.1f}")
+
+    # 基线：逐行子串匹配（原 str.contains 的做法）
+    keyword = random.choice(sample)
+    started = time.perf_counter()
+    hits = sum(1 for message in messages if keyword in message.lower())
+    print(f"{'linear scan':<16} {(time.perf_counter() - started) * 1000:8.3f} ms/query  hits={hits}")
+
+if __name__ == "__main__":
+    main()
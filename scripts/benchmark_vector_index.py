@@ -0,0 +1,64 @@
+"""
+测量向量索引精确检索与IVF近似检索的查询耗时及召回率
+
+用法:
+    python scripts/benchmark_vector_index.py --vectors 200000 --dim 768
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend-python"))
+
+from app.services.vector_index import VectorIndex
+
+def clustered_vectors(count: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """围绕若干主题中心生成向量，接近真实embedding的分布"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    assignment = rng.integers(0, clusters, count)
+    return centers[assignment] + 0.8 * rng.standard_normal((count, dim), dtype=np.float32)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark brute-force vs IVF vector search")
+    parser.add_argument("--vectors", type=int, default=200000, help="number of indexed vectors")
+    parser.add_argument("--dim", type=int, default=768, help="vector dimension")
+    parser.add_argument("--clusters", type=int, default=500, help="topic clusters in the synthetic data")
+    parser.add_argument("--queries", type=int, default=200, help="number of queries")
+    parser.add_argument("--k", type=int, default=10, help="neighbours per query")
+    parser.add_argument("--lists", type=int, default=None, help="IVF lists (default sqrt(N))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 32], help="IVF lists probed per query")
+    args = parser.parse_args()
+
+    vectors = clustered_vectors(args.vectors, args.dim, args.clusters, seed=7)
+    index = VectorIndex([str(i) for i in range(args.vectors)], vectors)
+    print(f"matrix: {index.matrix.nbytes / 2**20:.0f} MiB float32")
+
+    rng = np.random.default_rng(11)
+    queries = index.matrix[rng.integers(0, args.vectors, args.queries)] + \
+        0.05 * rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+
+    started = time.perf_counter()
+    truth = [{item_id for item_id, _ in index.search(query, args.k, exact=True)} for query in queries]
+    elapsed = (time.perf_counter() - started) / args.queries
+    print(f"{'brute force':<16} {elapsed * 1000:8.3f} ms/query  recall@{args.k}=1.000")
+
+    started = time.perf_counter()
+    index.train_ivf(n_lists=args.lists)
+    print(f"IVF training: {time.perf_counter() - started:.1f}s, {len(index.centroids)} lists")
+
+    for nprobe in args.nprobe:
+        started = time.perf_counter()
+        results = [index.search(query, args.k, nprobe=nprobe) for query in queries]
+        elapsed = (time.perf_counter() - started) / args.queries
+        recall = np.mean([
+            len(expected & {item_id for item_id, _ in found}) / args.k
+            for expected, found in zip(truth, results)
+        ])
+        print(f"{f'IVF nprobe={nprobe}':<16} {elapsed * 1000:8.3f} ms/query  recall@{args.k}={recall:.3f}")
+
+if __name__ == "__main__":
+    main()
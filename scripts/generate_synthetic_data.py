@@ -0,0 +1,57 @@
+"""
+生成可复现的大规模合成对话数据，供Mock服务内存映射加载做本地压测
+
+用法:
+    # 约1000万条消息（125万会话 x 平均4轮 x 2条）
+    python scripts/generate_synthetic_data.py --output backend-python/data/synthetic --sessions 1250000
+
+    # 然后在 backend-python/.env 中设置
+    MOCK_DATA_DIR=data/synthetic
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend-python"))
+
+from app.services.synthetic_data import SyntheticDataConfig, load_dataset, write_dataset
+
+def main():
+    defaults = SyntheticDataConfig()
+    parser = argparse.ArgumentParser(description="Generate a synthetic conversation dataset")
+    parser.add_argument("--output", required=True, help="dataset directory")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--sessions", type=int, default=defaults.sessions)
+    parser.add_argument("--min-turns", type=int, default=defaults.min_turns)
+    parser.add_argument("--max-turns", type=int, default=defaults.max_turns)
+    parser.add_argument("--chunks", type=int, default=defaults.chunks)
+    parser.add_argument("--max-chunks-per-reply", type=int, default=defaults.max_chunks_per_reply)
+    parser.add_argument("--embedding-dim", type=int, default=defaults.embedding_dim)
+    parser.add_argument("--unrated-ratio", type=float, default=defaults.unrated_ratio)
+    parser.add_argument("--span-days", type=int, default=defaults.span_days)
+    args = parser.parse_args()
+
+    config = SyntheticDataConfig(
+        seed=args.seed,
+        sessions=args.sessions,
+        min_turns=args.min_turns,
+        max_turns=args.max_turns,
+        chunks=args.chunks,
+        max_chunks_per_reply=args.max_chunks_per_reply,
+        embedding_dim=args.embedding_dim,
+        unrated_ratio=args.unrated_ratio,
+        span_days=args.span_days,
+    )
+
+    started = time.perf_counter()
+    messages, chunks = write_dataset(args.output, config)
+    elapsed = time.perf_counter() - started
+    print(f"generated {messages:,} messages and {chunks:,} chunks in {elapsed:.1f}s ({messages / elapsed:,.0f} messages/sec)")
+
+    started = time.perf_counter()
+    conversations, _ = load_dataset(args.output)
+    print(f"memory-mapped {conversations.num_rows:,} messages in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()